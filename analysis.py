@@ -1,87 +1,231 @@
+import json
 import streamlit as st
+import numpy as np
 import pandas as pd
-import time
-import io
 import google.generativeai as genai
-
-def analyze_with_gemini(df, gemini_api_key, product_name, user_prompt):
-    """Gemini AI를 사용한 논문 분석"""
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    df_copy = df.copy()
+from google.api_core import exceptions as google_exceptions
+from resources import get_gemini_model
+from cache import cached_excel_bytes
+from result_table import with_overlay, screening_columns
+from metrics import span, incr
+from rate_limit import get_limiter, parse_retry_info
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from document_utils import tables_to_markdown
+from config import RATE_LIMITS, FULLTEXT_SETTINGS
+
+def record_gemini_usage(response, stage):
+    """Gemini 응답의 토큰 사용량을 카운터에 기록"""
+    incr("gemini_requests_total", stage=stage)
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        incr("gemini_prompt_tokens_total", usage.prompt_token_count, stage=stage)
+        incr("gemini_output_tokens_total", usage.candidates_token_count, stage=stage)
+        if getattr(usage, 'cached_content_token_count', 0):
+            incr("gemini_cached_tokens_total", usage.cached_content_token_count, stage=stage)
+
+def gemini_generate(model, prompt, gemini_api_key, stage, **kwargs):
+    """속도 조절과 재시도를 적용한 Gemini 호출 (429/쿼터 초과 시 AIMD 감속, RetryInfo 대기 시간 준수)"""
+    limiter = get_limiter("gemini", gemini_api_key)
+    max_retries = RATE_LIMITS["max_retries"]
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            with span(f"{stage}.gemini_call"):
+                response = model.generate_content(prompt, **kwargs)
+        except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests,
+                google_exceptions.ServiceUnavailable) as e:
+            # 서버가 알려 준 대기 시간 동안 같은 키의 모든 호출을 멈춘 뒤 재시도 (다음 acquire에서 대기)
+            limiter.on_throttle(parse_retry_info(e))
+            if attempt == max_retries:
+                raise
+            incr("retries_total", kind="gemini")
+            continue
+        limiter.on_success()
+        record_gemini_usage(response, stage)
+        return response
+
+def analyze_with_gemini(df, gemini_api_key, product_name, user_prompt, max_workers=1):
+    """Gemini AI를 사용한 논문 분석 (max_workers개 호출을 동시에 진행)"""
+    model = get_gemini_model(gemini_api_key)
+    titles = df['Title'].astype(str)
+    abstracts = df['Abstract'].astype(str)
+
+    # 제품명이 제목이나 초록에 포함된 논문만 Gemini 호출 (벡터 연산으로 판별)
+    product = product_name.lower()
+    matched = (titles.str.lower().str.contains(product, regex=False) |
+               abstracts.str.lower().str.contains(product, regex=False)).to_numpy()
+    positions = matched.nonzero()[0]
+    select_col = np.where(matched, 'Y', '')
+    reason_col = [''] * len(df)
 
     progress_bar = st.progress(0)
     status_text = st.empty()
-
-    with st.spinner("🤖 AI 분석 중..."):
-        for idx, row in df_copy.iterrows():
-            progress = (idx + 1) / len(df_copy)
-            progress_bar.progress(progress)
-            status_text.text(f"처리 중... {idx + 1}/{len(df_copy)}")
-
-            # 제품명이 제목이나 초록에 포함되는지 확인
-            if (product_name.lower() in str(row['Title']).lower() or 
-                product_name.lower() in str(row['Abstract']).lower()):
-                df_copy.at[idx, 'Select'] = 'Y'
-
-                # Gemini로 이유 생성
-                prompt = user_prompt.format(
-                    title=str(row['Title'])[:300],
-                    abstract=str(row['Abstract'])[:1000],
-                    product=product_name
-                )
-                try:
-                    response = model.generate_content(prompt)
-                    if response and response.text:
-                        df_copy.at[idx, 'Reason'] = response.text.strip()
-                    else:
-                        df_copy.at[idx, 'Reason'] = "응답 없음"
-                except Exception as e:
-                    df_copy.at[idx, 'Reason'] = f"Gemini 오류: {e}"
-            else: 
-                df_copy.at[idx, 'Select'] = ''
-                df_copy.at[idx, 'Reason'] = ''
-
-            # API 요청 제한
-            time.sleep(0.5)
+    live_results = st.empty()  # 관련 논문이 나오는 대로 표시
+
+    def reason(pos):
+        # Gemini로 이유 생성
+        prompt = user_prompt.format(
+            title=titles.iat[pos][:300],
+            abstract=abstracts.iat[pos][:1000],
+            product=product_name
+        )
+        try:
+            response = gemini_generate(model, prompt, gemini_api_key, "screening")
+            return response.text.strip() if response and response.text else "응답 없음"
+        except Exception as e:
+            incr("gemini_errors_total", stage="screening")
+            return f"Gemini 오류: {e}"
+
+    finished = []
+    with st.spinner("🤖 AI 분석 중..."), span("analysis.screening"), ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(reason, pos): pos for pos in positions}
+        for done, future in enumerate(as_completed(futures), 1):
+            pos = futures[future]
+            reason_col[pos] = future.result()
+            finished.append(pos)
+            progress_bar.progress(done / len(positions))
+            status_text.text(f"처리 중... {done}/{len(positions)} (제품명 포함 논문)")
+
+            shown = finished[-20:]  # 최근 20개만 전송
+            live_results.dataframe(pd.DataFrame({
+                'PMID': df['PMID'].to_numpy()[shown],
+                'Title': titles.to_numpy()[shown],
+                'Reason': [reason_col[i] for i in shown]
+            }), use_container_width=True)
 
     progress_bar.empty()
     status_text.empty()
+    live_results.empty()
 
-    # 결과 저장 및 표시
-    st.session_state.df = df_copy
+    # 결과 저장 및 표시 (컬럼 단위 일괄 할당, 기본 데이터는 공유)
+    df_result = with_overlay(df, Select=select_col, Reason=reason_col)
+    st.session_state.df = df_result
     st.success("✅ AI 분석 완료!")
 
-    selected_count = len(df_copy[df_copy['Select'] == 'Y'])
-    st.info(f"📊 전체 {len(df_copy)}개 중 {selected_count}개가 관련 있음으로 분석")
-
-    st.dataframe(df_copy, use_container_width=True)
+    selected_count = len(positions)
+    st.info(f"📊 전체 {len(df_result)}개 중 {selected_count}개가 관련 있음으로 분석")
 
     # 결과 다운로드
-    excel_bytes = io.BytesIO()
-    df_copy.to_excel(excel_bytes, index=False, engine='openpyxl')
+    with span("analysis.excel"):
+        excel_data = cached_excel_bytes(df_result)
     st.download_button(
         label="📥 분석 결과 다운로드",
-        data=excel_bytes.getvalue(),
+        data=excel_data,
         file_name=f"gemini_analysis_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True
     )
 
-def get_meddev_analysis_prompt(text, product_name):
-    """MEDDEV 2.7/1 Rev. 4 분석 프롬프트"""
-    return f"""
-아래는 의료기기 임상 논문의 본문입니다.
+# 구조화 스크리닝 응답 스키마 (JSON 모드)
+SCREENING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "include": {"type": "boolean"},
+        "confidence": {"type": "number"},
+        "matched_pico": {"type": "array", "items": {"type": "string", "enum": ["P", "I", "C", "O"]}},
+        "rationale": {"type": "string"}
+    },
+    "required": ["include", "confidence", "matched_pico", "rationale"]
+}
+
+SCREENING_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=SCREENING_SCHEMA,
+    max_output_tokens=128,
+    temperature=0
+)
+
+def build_screening_prompt(title, abstract, product_name, pico_text):
+    """구조화 스크리닝 프롬프트 (짧은 영어 지시문)"""
+    return f"""Screen this paper for a clinical evaluation of the device '{product_name}'.
+PICO criteria:
+{pico_text}
+
+Title: {title}
+Abstract: {abstract}
+
+Return include (relevant to the device and PICO), confidence (0-1), matched_pico (subset of P, I, C, O) and a rationale of at most 20 English words."""
+
+def parse_screening_response(text):
+    """JSON 응답을 타입이 정해진 값으로 변환 - (include, confidence, matched, rationale)
+
+    잘리거나 include가 없는 응답은 ValueError (json.JSONDecodeError 포함)입니다.
+    """
+    data = json.loads(text)
+    include = data.get('include')
+    if not isinstance(include, bool):
+        raise ValueError(f"include 값이 없습니다: {text[:80]}")
+    try:
+        confidence = min(1.0, max(0.0, float(data.get('confidence', 0.0))))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    matched = ','.join(sorted({str(x).strip().upper() for x in data.get('matched_pico', []) or []} & set('PICO')))
+    rationale = str(data.get('rationale', '')).strip()
+    return include, confidence, matched, rationale
+
+def screen_record(model, gemini_api_key, title, abstract, product_name, pico_text, stage="structured_screening"):
+    """논문 한 편의 구조화 스크리닝 - (include, confidence, matched, rationale)
+
+    오류(Gemini 호출 실패, 잘린/잘못된 JSON) 시 include와 confidence는 None이고 rationale에
+    오류를 기록합니다. 제외(False)와 구분해 다시 스크리닝할 수 있습니다.
+    """
+    prompt = build_screening_prompt(str(title)[:300], str(abstract)[:1000], product_name, pico_text)
+    try:
+        response = gemini_generate(model, prompt, gemini_api_key, stage,
+                                   generation_config=SCREENING_GENERATION_CONFIG)
+        return parse_screening_response(response.text)
+    except Exception as e:
+        incr("gemini_errors_total", stage=stage)
+        return None, None, '', f"Gemini 오류: {e}"
+
+def screen_with_gemini_structured(df, gemini_api_key, product_name, pico_text, max_workers=1):
+    """JSON 스키마 출력으로 논문 스크리닝 - 포함 여부를 모델이 판단 (max_workers개 호출을 동시에 진행)
+
+    결과는 Include(True/False, 오류는 <NA>), Confidence(float), Matched_PICO(str),
+    Rationale(str) 컬럼에 저장되고, 기존 화면/엑셀과의 호환을 위해 Select/Reason도 채웁니다.
+    """
+    model = get_gemini_model(gemini_api_key)
+    total = len(df)
+
+    include_col = [None] * total
+    confidence_col = [None] * total
+    matched_col = [''] * total
+    rationale_col = [''] * total
 
-분석 대상 기기명: {product_name}
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    with st.spinner("🤖 구조화 스크리닝 중..."), span("analysis.structured_screening"), \
+            ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(screen_record, model, gemini_api_key, title, abstract, product_name, pico_text): pos
+                   for pos, (title, abstract) in enumerate(zip(df['Title'].astype(str), df['Abstract'].astype(str)))}
+        for done, future in enumerate(as_completed(futures), 1):
+            pos = futures[future]
+            include_col[pos], confidence_col[pos], matched_col[pos], rationale_col[pos] = future.result()
+            progress_bar.progress(done / total)
+            status_text.text(f"처리 중... {done}/{total}")
+
+    progress_bar.empty()
+    status_text.empty()
+
+    # 컬럼 단위 일괄 저장 (기본 데이터는 복사하지 않음)
+    columns = screening_columns(include_col, confidence_col, matched_col, rationale_col, index=df.index)
+    st.session_state.df = with_overlay(df, **columns)
+    st.success("✅ 구조화 스크리닝 완료!")
+    st.info(f"📊 전체 {total}개 중 {int(columns['Include'].sum())}개 포함으로 판단")
+    failed = int(columns['Include'].isna().sum())
+    if failed:
+        st.warning(f"⚠️ {failed}개는 Gemini 오류로 판정하지 못했습니다 (Include 비어 있음, Rationale 참고)")
+
+# MEDDEV 프롬프트의 고정 앞부분 (논문/기기와 무관)
+MEDDEV_PROMPT_PREFIX = """
+아래 지시문 뒤에 의료기기 임상 논문의 본문과 분석 대상 기기명이 주어집니다.
 
 1. 논문 전체에 대한 평가(방법론, 일반적 관련성, 기여도, 종합평가)는 논문 자체 기준으로 MEDDEV 2.7/1 Rev.4에 따라 분석하세요.
-2. 단, 'STEP 3: Relevance Suitability' 표만 '{product_name}'(우리 기기)와의 적합성/관련성 기준으로 분석하세요.
+2. 단, 'STEP 3: Relevance Suitability' 표만 분석 대상 기기(우리 기기)와의 적합성/관련성 기준으로 분석하세요.
 **All Remarks, Comments, and explanations in the tables must be written in English.**
 
-논문 내용:
-{text[:10000]}
-
 다음 형식으로 분석해주세요:
 
 ## 논문 정보
@@ -210,3 +354,56 @@ The overall result should be Very Good or Excellent.
 
 위 형식을 정확히 따라 분석해주세요. 표 구분자(TABLE_START/TABLE_END)를 반드시 포함해주세요.
 """
+
+def get_meddev_prompt_suffix(text, product_name, tables_text=''):
+    """MEDDEV 프롬프트의 논문별 뒷부분 - 기기명, 표 데이터, 본문
+
+    PDF/JATS에서 추출한 표(환자 수, 추적 기간, 이상반응 등)는 잘리지 않도록 본문보다
+    앞에 두고, 본문은 남은 길이(전체 10000자)만큼만 넣습니다.
+    """
+    tables_section = f"""
+논문 표 데이터 (환자 수, 추적 기간, 이상반응 비율 등은 이 표를 우선 참고):
+{tables_text}
+""" if tables_text else ""
+    text_limit = max(0, 10000 - len(tables_text))
+    return f"""
+분석 대상 기기명: {product_name}
+{tables_section}
+논문 내용:
+{text[:text_limit]}
+
+위 MEDDEV 2.7/1 Rev. 4 형식을 정확히 따라 분석해주세요.
+"""
+
+def get_meddev_analysis_prompt(text, product_name, tables_text=''):
+    """MEDDEV 2.7/1 Rev. 4 분석 전체 프롬프트 (고정 앞부분 + 논문별 뒷부분)"""
+    return MEDDEV_PROMPT_PREFIX + get_meddev_prompt_suffix(text, product_name, tables_text)
+
+def build_meddev_request(gemini_api_key, text, product_name, tables_text=''):
+    """MEDDEV 호출용 (모델, 전체 프롬프트)"""
+    return get_gemini_model(gemini_api_key), get_meddev_analysis_prompt(text, product_name, tables_text)
+
+def appraise_meddev_batch(docs, gemini_api_key, product_name, max_workers=None):
+    """전문 목록을 MEDDEV 프롬프트로 동시에 분석 - 완료되는 순서대로 (PMID, 분석 결과, 오류) yield
+
+    docs는 {PMID: fulltext.fetch_fulltexts 전문 dict}입니다. Gemini 호출은 스레드에서
+    실행되며 속도 조절기(gemini_generate)를 공유합니다.
+    """
+    max_chars = FULLTEXT_SETTINGS["max_chars"]
+
+    def appraise(doc):
+        model, prompt = build_meddev_request(gemini_api_key, doc['text'][:max_chars], product_name,
+                                             tables_to_markdown(doc['tables']))
+        response = gemini_generate(model, prompt, gemini_api_key, "meddev_batch")
+        if not (response and response.text):
+            raise RuntimeError("Gemini 분석 응답을 받지 못했습니다")
+        return response.text
+
+    with ThreadPoolExecutor(max_workers or FULLTEXT_SETTINGS["meddev_workers"]) as pool:
+        futures = {pool.submit(appraise, doc): pmid for pmid, doc in docs.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                incr("gemini_errors_total", stage="meddev_batch")
+                yield futures[future], '', str(e)
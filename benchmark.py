@@ -0,0 +1,310 @@
+"""오프라인 엔드투엔드 벤치마크
+
+fake_services.py의 대체 서버를 띄우고 검색 → 상세 수집 → DataFrame → Gemini 분석 →
+MEDDEV 분석 → 엑셀 생성 단계(및 스캔 PDF OCR)를 반복 실행하여 단계별 p50/p99 지연, 요청 수,
+논문 처리량(papers/sec), 최대 RSS를 보고합니다. 네트워크가 필요 없습니다.
+
+    python benchmark.py --papers 200 --repeat 3 --json bench_output.json
+
+--replay를 주면 가짜 서버 대신 replay.py로 기록한 실제 작업량(검색어, Gemini
+프롬프트)과 응답을 기록된 응답 시간(--replay-speed배)으로 재생합니다.
+
+    python benchmark.py --replay rnd4.jsonl.gz --replay-speed 10 --repeat 3
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from fake_services import start_eutils_server, start_gemini_server
+
+
+def percentile(values, pct):
+    """정렬 기반 백분위수 (선형 보간)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS (MB, Linux 기준 ru_maxrss는 KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_sample_pdf(lines, table_rows=None):
+    """텍스트 줄(과 괘선 표)로 최소한의 PDF 바이트 생성 (외부 라이브러리 없이)"""
+    def esc(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    stream = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(f"({esc(line)}) '" for line in lines) + " ET"
+    if table_rows:
+        # 본문 아래쪽에 괘선 표 그리기 (pdfplumber 표 탐지용)
+        col_width, row_height = 120, 18
+        left, top = 50, 20 + row_height * len(table_rows)
+        right = left + col_width * len(table_rows[0])
+        for i in range(len(table_rows) + 1):
+            y = top - i * row_height
+            stream += f" {left} {y} m {right} {y} l S"
+        for j in range(len(table_rows[0]) + 1):
+            x = left + j * col_width
+            stream += f" {x} {top} m {x} {top - row_height * len(table_rows)} l S"
+        for i, row in enumerate(table_rows):
+            for j, cell in enumerate(row):
+                stream += f" BT /F1 9 Tf {left + j * col_width + 4} {top - (i + 1) * row_height + 5} Td ({esc(cell)}) Tj ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+def make_scanned_pdf(lines, pages):
+    """텍스트를 이미지로만 담은 스캔 PDF 생성 (OCR 벤치마크용, Pillow 사용)"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    for page in range(pages):
+        image = Image.new("L", (1275, 1650), 255)
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(lines):
+            draw.text((80, 80 + i * 24), f"{line} (page {page + 1})", fill=0)
+        images.append(image)
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+class StageRecorder:
+    """단계별 소요 시간과 서버 요청 수 기록"""
+
+    def __init__(self, servers):
+        self.servers = servers
+        self.timings = {}
+        self.requests = {}
+
+    def run(self, name, func, *args, **kwargs):
+        before = sum(s.stats["requests"] for s in self.servers)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings.setdefault(name, []).append(time.perf_counter() - start)
+        after = sum(s.stats["requests"] for s in self.servers)
+        self.requests[name] = self.requests.get(name, 0) + after - before
+        return result
+
+    def summary(self):
+        """단계별 실행 횟수, p50/p99 지연, 서버 요청 수"""
+        return {
+            name: {
+                "runs": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "requests": self.requests.get(name, 0),
+            }
+            for name, values in self.timings.items()
+        }
+
+
+def run_benchmark(args):
+    profile = {"latency": args.latency, "jitter": args.latency / 4,
+               "rate_limit": args.rate_limit, "error_rate": args.error_rate}
+    eutils = start_eutils_server(profile=profile, corpus_size=args.papers)
+    gemini = start_gemini_server(profile=profile)
+    os.environ["EUTILS_BASE_URL"] = f"{eutils.base_url}/entrez/eutils"
+    os.environ["GEMINI_API_ENDPOINT"] = gemini.base_url
+
+    # 엔드포인트 환경변수 설정 후 앱 모듈 import
+    import pandas as pd
+    from pubmed_api import pubmed_search_all, pubmed_details
+    from analysis import analyze_with_gemini, screen_with_gemini_structured, get_meddev_analysis_prompt
+    from components import parse_meddev_to_excel, create_meddev_excel_file
+    from document_utils import extract_pdf_text, extract_pdf_tables, tables_to_markdown, dataframe_to_excel_bytes
+    from ocr import ocr_available
+    from resources import get_gemini_model
+    import metrics
+
+    query = "(transcatheter pulmonary valve) AND (Melody OR SAPIEN)"
+    user_prompt = "논문 제목: {title}\n초록: {abstract}\n\n이 논문이 '{product}'와 관련이 있는지 분석해주세요."
+    product = "pulmonary valve"
+    pdf_bytes = make_sample_pdf([f"Line {i}: Melody valve outcomes in {i * 3} patients, follow-up {i % 7} years."
+                                 for i in range(50)],
+                                table_rows=[["Outcome", "Melody (n=120)", "Control (n=98)"],
+                                            ["Follow-up (months)", "36", "34"],
+                                            ["Endocarditis", "4 (3.3%)", "2 (2.0%)"],
+                                            ["Stent fracture", "7 (5.8%)", "-"]])
+
+    recorder = StageRecorder([eutils, gemini])
+    papers_processed = 0
+    wall_start = time.perf_counter()
+    for _ in range(args.repeat):
+        ids = recorder.run("esearch", pubmed_search_all, query, "bench@example.com",
+                           retmax_per_call=args.papers, api_key="bench")
+        details = recorder.run("efetch", pubmed_details, ids, "bench@example.com", "bench")
+        df = recorder.run("dataframe", pd.DataFrame, details)
+        papers_processed += len(df)
+        recorder.run("excel", dataframe_to_excel_bytes, df)
+        if args.screen_rows:
+            recorder.run("gemini_screening", analyze_with_gemini,
+                         df.head(args.screen_rows).reset_index(drop=True), "bench", product, user_prompt)
+            recorder.run("structured_screening", screen_with_gemini_structured,
+                         df.head(args.screen_rows).reset_index(drop=True), "bench", product, query)
+        if args.meddev:
+            def meddev_flow():
+                text, _ = extract_pdf_text(pdf_bytes)
+                tables_text = tables_to_markdown(extract_pdf_tables(pdf_bytes))
+                response = get_gemini_model("bench").generate_content(
+                    get_meddev_analysis_prompt(text, product, tables_text))
+                data = parse_meddev_to_excel(response.text)
+                return create_meddev_excel_file(data, text, text, response.text)
+            recorder.run("meddev", meddev_flow)
+    wall = time.perf_counter() - wall_start
+
+    # 스트리밍 파이프라인: 첫 스크리닝 결과까지의 시간과 전체 시간
+    if args.pipeline_papers:
+        from pipeline import run_streaming_screening
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            first = []
+            recorder.run("pipeline_stream", run_streaming_screening, query, "bench@example.com", "bench", "bench",
+                         product, query, retmax=args.pipeline_papers,
+                         on_result=lambda item, count: first or first.append(time.perf_counter() - start))
+            recorder.timings.setdefault("pipeline_first_result", []).append(first[0] if first else 0.0)
+
+    # 스캔 PDF OCR: 첫 실행(프로세스 풀)과 페이지 캐시 재사용을 따로 측정
+    if args.ocr_pages and ocr_available():
+        scanned = make_scanned_pdf([f"Melody valve: {i * 3} patients, follow-up {i % 7} years, "
+                                    f"adverse events {i % 5}" for i in range(40)], args.ocr_pages)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            from config import OCR_SETTINGS
+            OCR_SETTINGS["cache_dir"] = cache_dir
+            for _ in range(args.repeat):
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                recorder.run("ocr_cold", extract_pdf_text, scanned)
+                recorder.run("ocr_cached", extract_pdf_text, scanned)
+    elif args.ocr_pages:
+        print("tesseract가 없어 OCR 단계를 건너뜁니다")
+
+    report = {
+        "papers_processed": papers_processed,
+        "wall_seconds": round(wall, 3),
+        "papers_per_sec": round(papers_processed / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "server_requests": {"eutils": dict(eutils.stats), "gemini": dict(gemini.stats)},
+        "app_metrics": metrics.snapshot(),
+        "stages": recorder.summary(),
+    }
+    eutils.shutdown()
+    gemini.shutdown()
+    return report
+
+
+def run_replay_benchmark(args):
+    """기록된 아카이브의 검색/상세 수집/Gemini 호출을 재생 서버에 다시 실행"""
+    from replay import start_replay_servers, load_archive, recorded_workload
+    from config import API_ENDPOINTS
+
+    eutils, gemini, header = start_replay_servers(args.replay, args.replay_speed)
+    # replay가 config를 먼저 import하므로 환경변수 대신 엔드포인트 설정을 직접 변경
+    API_ENDPOINTS["eutils_base"] = f"{eutils.base_url}/entrez/eutils"
+    API_ENDPOINTS["gemini_endpoint"] = gemini.base_url
+
+    from pubmed_api import pubmed_search_all, pubmed_details
+    from analysis import gemini_generate
+    from resources import get_gemini_model
+    import metrics
+
+    workload = recorded_workload(load_archive(args.replay)[1])
+    recorder = StageRecorder([eutils, gemini])
+    papers_processed = 0
+    wall_start = time.perf_counter()
+    for _ in range(args.repeat):
+        for term, retmax in workload['searches']:
+            ids = recorder.run("replay_esearch", pubmed_search_all, term, "bench@example.com",
+                               retmax_per_call=retmax, api_key="bench")
+            details = recorder.run("replay_efetch", pubmed_details, ids, "bench@example.com", "bench")
+            papers_processed += len(details)
+        for model_name, prompt, mime_type in workload['prompts']:
+            config = {'response_mime_type': mime_type} if mime_type else None
+            recorder.run("replay_gemini", gemini_generate, get_gemini_model("bench", f"models/{model_name}"),
+                         prompt, "bench", "replay", generation_config=config)
+    wall = time.perf_counter() - wall_start
+
+    report = {
+        "archive": {"path": args.replay, "created": header.get("created"), "entries": header.get("entries"),
+                    "searches": len(workload['searches']), "prompts": len(workload['prompts']),
+                    "speed": args.replay_speed},
+        "papers_processed": papers_processed,
+        "wall_seconds": round(wall, 3),
+        "papers_per_sec": round(papers_processed / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "server_requests": {"eutils": dict(eutils.stats), "gemini": dict(gemini.stats)},
+        "app_metrics": metrics.snapshot(),
+        "stages": recorder.summary(),
+    }
+    eutils.shutdown()
+    gemini.shutdown()
+    return report
+
+
+def print_report(report):
+    print(f"논문 처리량: {report['papers_per_sec']} papers/sec "
+          f"({report['papers_processed']}개 / {report['wall_seconds']}초)")
+    print(f"최대 RSS: {report['peak_rss_mb']} MB")
+    print(f"{'stage':<22}{'runs':>6}{'p50 ms':>12}{'p99 ms':>12}{'requests':>10}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<22}{stage['runs']:>6}{stage['p50_ms']:>12}{stage['p99_ms']:>12}{stage['requests']:>10}")
+    for server, stats in report["server_requests"].items():
+        print(f"{server}: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 엔드투엔드 벤치마크")
+    parser.add_argument("--papers", type=int, default=200, help="검색 결과 논문 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (p50/p99 계산용)")
+    parser.add_argument("--screen-rows", type=int, default=10, help="Gemini 분석 대상 행 수 (0이면 생략)")
+    parser.add_argument("--no-meddev", dest="meddev", action="store_false", help="MEDDEV 단계 생략")
+    parser.add_argument("--pipeline-papers", type=int, default=20,
+                        help="스트리밍 파이프라인(검색→수집→스크리닝) 논문 수 (0이면 생략)")
+    parser.add_argument("--ocr-pages", type=int, default=4, help="OCR 벤치마크용 스캔 PDF 페이지 수 (0이면 생략)")
+    parser.add_argument("--latency", type=float, default=0.05, help="대체 서버 요청당 지연 (초)")
+    parser.add_argument("--rate-limit", type=int, default=10, help="대체 서버 초당 요청 제한")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="대체 서버 오류 주입 비율")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장할 경로")
+    parser.add_argument("--replay", help="replay.py로 기록한 아카이브 (가짜 서버 대신 실제 작업량 재생)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="재생 속도 배율 (1=기록 속도, 0=지연 없음)")
+    args = parser.parse_args()
+
+    # Streamlit bare mode 경고 숨기기
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+    report = run_replay_benchmark(args) if args.replay else run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
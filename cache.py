@@ -0,0 +1,176 @@
+import json
+import streamlit as st
+from config import CACHE_SETTINGS
+from pubmed_api import pubmed_search_all, pubmed_details, pubmed_expand
+from document_utils import extract_pdf_text, extract_pdf_tables, tables_to_markdown, dataframe_to_excel_bytes
+from resources import get_gemini_model
+from metrics import incr
+from result_table import build_base_table, with_full_abstracts
+from records import article_store
+import state_store
+from fulltext import fetch_fulltexts
+
+# 캐시 적중률 집계: 호출마다 cache_requests_total, 실제 계산 시 cache_misses_total 증가
+# 이메일/API 키는 결과에 영향이 없으므로 '_' 접두사로 캐시 키에서 제외 (팀 간 캐시 공유)
+# 요청 오류가 있었던 결과는 _Uncached로 빠져나가 캐시되지 않음 (일시적 오류가 TTL 동안 남지 않도록)
+
+class _Uncached(Exception):
+    """캐시하지 않고 그대로 돌려줄 결과 (st.cache_data는 예외로 끝난 호출을 저장하지 않음)"""
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+@st.cache_data(ttl=CACHE_SETTINGS["search_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _search(query, retmax_per_call, mindate, maxdate, _email, _api_key):
+    incr("cache_misses_total", cache="search")
+    # 공유 상태 저장소 - 다른 프로세스가 같은 검색을 했으면 그 결과 사용
+    key = json.dumps([query, retmax_per_call, mindate, maxdate])
+    if state_store.enabled():
+        pmids = state_store.load_search(key)
+        if pmids is not None:
+            incr("state_search_hits_total")
+            return pmids
+
+    errors = []
+    pmids = pubmed_search_all(query, _email, retmax_per_call=retmax_per_call,
+                              api_key=_api_key, mindate=mindate, maxdate=maxdate, errors=errors)
+    if errors:
+        raise _Uncached(pmids)
+    if pmids and state_store.enabled():
+        state_store.save_search(key, pmids, CACHE_SETTINGS["search_ttl"])
+    return pmids
+
+@st.cache_data(ttl=CACHE_SETTINGS["search_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _expand(seed_tuple, link_names, max_per_seed, _email, _api_key):
+    incr("cache_misses_total", cache="expand")
+    errors = []
+    result = pubmed_expand(seed_tuple, _email, _api_key, link_names, max_per_seed, errors=errors)
+    if errors:
+        raise _Uncached(result)
+    return result
+
+@st.cache_data(ttl=CACHE_SETTINGS["details_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _fulltexts(id_tuple, _email, _api_key):
+    incr("cache_misses_total", cache="fulltext")
+    errors = []
+    docs = fetch_fulltexts(list(id_tuple), _email, _api_key, errors=errors)
+    for e in errors:
+        st.error(f"전문 수집 오류: {e}")
+    if errors:
+        raise _Uncached(docs)  # 실패한 묶음이 'PMC 전문 없음'으로 캐시되지 않도록
+    return docs
+
+@st.cache_data(ttl=CACHE_SETTINGS["pdf_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _pdf_text(pdf_bytes):
+    incr("cache_misses_total", cache="pdf")
+    return extract_pdf_text(pdf_bytes)
+
+@st.cache_data(ttl=CACHE_SETTINGS["pdf_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _pdf_tables(pdf_bytes):
+    incr("cache_misses_total", cache="pdf_tables")
+    tables = extract_pdf_tables(pdf_bytes)
+    return tables_to_markdown(tables), len(tables)
+
+@st.cache_data(ttl=CACHE_SETTINGS["excel_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _excel_bytes(df):
+    incr("cache_misses_total", cache="excel")
+    # 캐시 키는 잘린 초록 표로 계산하고, 파일에는 전체 초록을 씀 (PMID별 초록은 바뀌지 않음)
+    return dataframe_to_excel_bytes(with_full_abstracts(df))
+
+@st.cache_resource(ttl=CACHE_SETTINGS["details_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def _base_table(id_tuple, _email, _api_key):
+    incr("cache_misses_total", cache="base_table")
+    records = cached_pubmed_details(id_tuple, _email, _api_key)
+    table = build_base_table(records)
+    if len(records) < len(set(id_tuple)):
+        raise _Uncached(table)  # 빠진 PMID는 다음 호출에서 다시 efetch
+    return table
+
+def cached_pubmed_search(query, email, retmax_per_call=100, api_key=None, mindate=None, maxdate=None):
+    """쿼리/날짜 범위별로 캐시되는 PMID 검색"""
+    incr("cache_requests_total", cache="search")
+    try:
+        return _search(query, retmax_per_call, mindate, maxdate, email, api_key)
+    except _Uncached as e:
+        incr("cache_skipped_errors_total", cache="search")
+        return e.value
+
+def cached_pubmed_details(id_tuple, email, api_key=None):
+    """PMID 묶음의 상세 정보 - 논문 저장소(records.article_store)에 없는 PMID만 efetch
+
+    efetch가 실패했거나 PubMed에 없는 PMID는 결과에서 빠지므로 호출하는 쪽은 입력
+    개수와 비교해 안내합니다 (빠진 개수는 details_dropped_total).
+    """
+    incr("cache_requests_total", cache="details")
+    records = {record['PMID']: record for record in article_store.records(id_tuple)}
+    missing = [pmid for pmid in id_tuple if pmid not in records]
+    if missing:
+        incr("cache_misses_total", cache="details")
+        # 저장소를 다시 읽지 않고 받은 레코드를 바로 사용 (저장소 한도를 넘는 묶음도 빠지지 않도록)
+        records.update((record['PMID'], record) for record in pubmed_details(missing, email, api_key))
+    result = [records[pmid] for pmid in dict.fromkeys(id_tuple) if pmid in records]
+    dropped = len(set(id_tuple)) - len(result)
+    if dropped:
+        incr("details_dropped_total", dropped)
+    return result
+
+def cached_pubmed_expand(seed_tuple, link_names, email, api_key=None, max_per_seed=None):
+    """시드 묶음/링크 종류별로 캐시되는 인용·유사 논문 확장 - (새 PMID 목록, 출처 dict)"""
+    incr("cache_requests_total", cache="expand")
+    try:
+        return _expand(seed_tuple, tuple(link_names), max_per_seed, email, api_key)
+    except _Uncached as e:
+        incr("cache_skipped_errors_total", cache="expand")
+        return e.value
+
+def cached_pmc_fulltexts(id_tuple, email, api_key=None):
+    """PMID 묶음별로 캐시되는 PMC 오픈 액세스 전문 - {PMID: 전문 dict 또는 None}"""
+    incr("cache_requests_total", cache="fulltext")
+    try:
+        return _fulltexts(id_tuple, email, api_key)
+    except _Uncached as e:
+        incr("cache_skipped_errors_total", cache="fulltext")
+        return e.value
+
+def shared_base_table(id_tuple, email, api_key=None):
+    """PMID 묶음별 기본 테이블 - 복사본이 아닌 같은 객체를 모든 세션이 공유 (수정 금지)"""
+    incr("cache_requests_total", cache="base_table")
+    try:
+        return _base_table(id_tuple, email, api_key)
+    except _Uncached as e:
+        incr("cache_skipped_errors_total", cache="base_table")
+        return e.value
+
+def cached_pdf_text(pdf_bytes):
+    """PDF 내용(바이트)별로 캐시되는 텍스트 추출 - (텍스트, 페이지 수) 반환"""
+    incr("cache_requests_total", cache="pdf")
+    return _pdf_text(pdf_bytes)
+
+def cached_pdf_tables(pdf_bytes):
+    """PDF 내용별로 캐시되는 표 추출 - (Markdown 표 블록, 표 수) 반환"""
+    incr("cache_requests_total", cache="pdf_tables")
+    return _pdf_tables(pdf_bytes)
+
+def cached_excel_bytes(df):
+    """DataFrame 내용별로 캐시되는 엑셀 바이트 생성"""
+    incr("cache_requests_total", cache="excel")
+    return _excel_bytes(df)
+
+@st.cache_data(ttl=CACHE_SETTINGS["gemini_check_ttl"], max_entries=CACHE_SETTINGS["max_entries"], show_spinner=False)
+def check_gemini_connection(gemini_api_key):
+    """Gemini API 키 연결 확인 (rerun마다 호출하지 않도록 캐시)"""
+    model = get_gemini_model(gemini_api_key)
+    response = model.generate_content("안녕하세요")
+    return bool(response and response.text)
+
+def clear_data_caches():
+    """검색/상세/PDF/엑셀 캐시 전체 비우기"""
+    _search.clear()
+    _expand.clear()
+    _fulltexts.clear()
+    article_store.clear()
+    _base_table.clear()
+    _pdf_text.clear()
+    _pdf_tables.clear()
+    _excel_bytes.clear()
+    check_gemini_connection.clear()
@@ -2,16 +2,43 @@ import streamlit as st
 import pandas as pd
 import io
 import time
-import google.generativeai as genai
 import re  
-from ui import render_pico_inputs, render_search_options
-from pubmed_api import pubmed_search_all, pubmed_details, build_query, build_filters
-from analysis import analyze_with_gemini, get_meddev_analysis_prompt
+from ui import render_pico_inputs, render_search_options, render_result_table
+from pubmed_api import build_filters
+from query import compile_query
+from analysis import (analyze_with_gemini, screen_with_gemini_structured, get_meddev_analysis_prompt, gemini_generate,
+                      appraise_meddev_batch, build_meddev_request)
+from cache import (cached_pubmed_search, shared_base_table, cached_pdf_text, cached_pdf_tables,
+                   cached_excel_bytes, check_gemini_connection, clear_data_caches,
+                   cached_pubmed_details, cached_pubmed_expand, cached_pmc_fulltexts)
+from resources import get_gemini_model
+import metrics
+from metrics import span, incr
+from rate_limit import limiter_status
+from singleflight import pubmed_search_flight
+from search_index import search_local, index_articles
+from dedup import deduplicate, merge_results
+from ranking import rank_by_relevance
+from result_table import (session_table, build_base_table, with_overlay, carry_overlay, screening_columns,
+                          mark_skipped, with_full_abstracts)
+from pipeline import run_streaming_screening
+import planner
+from config import PLANNER_SETTINGS, OCR_SETTINGS, EXPANSION_SETTINGS, SEARCH_SETTINGS, FULLTEXT_SETTINGS
+from ocr import ocr_available
+from document_utils import tables_to_markdown
+from facets import build_facet_index, selected_facets, facet_mask, facet_counts, FACET_LABELS
+from records import article_store
+import state_store
+from jobs import job_summary
+
+# 워커 큐 작업은 API 키를 대기열에 저장하지 않음 (jobs.job_credentials)
+QUEUE_CREDENTIALS_HELP = "입력한 API 키는 대기열에 저장되지 않으며, 워커가 팀 설정 또는 워커 환경 변수(NCBI_EMAIL, NCBI_API_KEY, GEMINI_API_KEY)의 키를 사용합니다"
 
 def render_pubmed_tab():
     """PubMed 검색 탭 렌더링"""
     # PICO 입력
     P, I, C, O = render_pico_inputs()
+    st.session_state.pico = {'P': P, 'I': I, 'C': C, 'O': O}
     
     # 검색 조합 선택
     st.markdown("### 🎯 검색 조합 선택")
@@ -41,11 +68,255 @@ def render_pubmed_tab():
     
     # 검색 필터 (검색기간 추가)
     filter_options = render_search_filters()
+    if filter_options.get('local_facets'):
+        apply_local_facets(filter_options)
     
     # 검색 실행
-    if st.button("🚀 검색 실행", use_container_width=True):
+    merge_previous = st.checkbox(
+        "🔗 기존 검색 결과에 병합",
+        value=False,
+        help="다른 PICO 조합/기간/팀 프리셋 검색 결과를 누적합니다 (중복은 AI 분석 전에 제거)"
+    )
+    stream_screening = st.checkbox(
+        "⚡ 검색과 동시에 구조화 스크리닝 (스트리밍)",
+        value=False,
+        help="상세 정보 묶음이 도착하는 대로 바로 Gemini 스크리닝을 시작합니다 (다운로드 완료를 기다리지 않음)"
+    )
+    stream_options = None
+    if stream_screening:
+        col1, col2 = st.columns(2)
+        with col1:
+            stream_gemini_key = st.text_input("🔑 Gemini API 키", value=st.session_state.get('team_gemini_api_key', ''),
+                                              type="password", key="stream_gemini_key")
+        with col2:
+            stream_product = st.text_input("🏷️ 제품/기술명", value=st.session_state.get('team_product', ''),
+                                           key="stream_product")
+        stream_options = {'gemini_api_key': stream_gemini_key, 'product_name': stream_product}
+    queue_search = False
+    if state_store.enabled() and not stream_screening:
+        queue_search = st.checkbox("🗂️ 워커 큐로 실행", value=False, key="queue_search",
+                                   help="worker.py 프로세스가 검색/상세 수집을 실행합니다. 결과는 아래 작업 목록에서 불러옵니다. "
+                                        + QUEUE_CREDENTIALS_HELP)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        run_search = st.button("🚀 검색 실행", use_container_width=True)
+    with col2:
+        if st.button("🧹 캐시 비우기", use_container_width=True,
+                     help="캐시된 검색/상세 정보를 지우고 PubMed에서 다시 가져옵니다"):
+            clear_data_caches()
+            st.success("✅ 캐시를 비웠습니다!")
+
+    if run_search:
         execute_pubmed_search(P, I, C, O, use_P, use_I, use_C, use_O, 
-                             email, api_key, filter_options)
+                             email, api_key, filter_options, merge_previous, stream_options, queue_search)
+
+    # 검색 결과 표 (페이지 단위 표시)
+    if filter_options.get('local_facets') and st.session_state.get('facet_index') is not None:
+        render_facet_counts(filter_options)
+    if st.session_state.get('df') is not None and not st.session_state.df.empty:
+        st.markdown("### 📄 검색 결과")
+        render_result_table(st.session_state.df, key="search_results")
+        render_citation_expansion(email, api_key, filter_options)
+
+    # 검색 결과 내 로컬 재검색
+    render_local_filter()
+
+    # 공유 작업 대기열 (SHARED_STATE=1)
+    if state_store.enabled():
+        render_shared_jobs()
+
+def render_citation_expansion(email, api_key, filter_options):
+    """인용/참고문헌/유사 논문으로 결과 확장 (스노볼링, ELink 묶음 요청)"""
+    link_labels = EXPANSION_SETTINGS["link_names"]
+    with st.expander("🔗 인용/유사 논문으로 확장 (스노볼링)"):
+        if st.session_state.get('expansion_message'):
+            st.success(st.session_state.pop('expansion_message'))
+        seed_text = st.text_area(
+            "시드 PMID",
+            placeholder="비워 두면 현재 검색 결과 전체를 시드로 사용 (쉼표/줄바꿈 구분)",
+            key="expand_seeds"
+        )
+        link_names = st.multiselect("링크 종류", list(link_labels), default=list(link_labels)[:2],
+                                    format_func=lambda name: link_labels[name], key="expand_links")
+        max_per_seed = st.number_input("시드당 최대 논문 수", min_value=1, max_value=200,
+                                       value=EXPANSION_SETTINGS["max_per_seed"], key="expand_max_per_seed")
+        if not st.button("🔗 1단계 확장 실행", use_container_width=True, key="expand_run"):
+            return
+
+        df = st.session_state.df
+        seeds = re.findall(r'\d+', seed_text) or df['PMID'].astype(str).tolist()
+        if not link_names:
+            st.error("❌ 링크 종류를 하나 이상 선택하세요!")
+            return
+        if not email:
+            st.error("❌ NCBI 이메일을 입력하세요!")
+            return
+
+        source_df = st.session_state.get('search_df')
+        if source_df is None:
+            source_df = df
+        with st.spinner(f"🔗 시드 {len(seeds)}개의 링크 수집 중..."), span("expansion.total"):
+            new_pmids, sources = cached_pubmed_expand(tuple(seeds), link_names, email, api_key or None,
+                                                      int(max_per_seed))
+            known = set(source_df['PMID'].astype(str))
+            new_pmids = [p for p in new_pmids if p not in known]
+            limit = EXPANSION_SETTINGS["max_new_articles"]
+            note = ""
+            if len(new_pmids) > limit:
+                note = f" (새 논문 {len(new_pmids)}개 중 시드 순서대로 {limit}개만 추가)"
+                new_pmids = new_pmids[:limit]
+            if not new_pmids:
+                st.info("ℹ️ 새로 추가할 논문이 없습니다")
+                return
+            records = cached_pubmed_details(tuple(new_pmids), email, api_key or None)
+            if len(records) < len(new_pmids):
+                st.warning(f"⚠️ 새 논문 {len(new_pmids) - len(records)}개는 상세 정보를 가져오지 못해 추가하지 않았습니다")
+
+        # 출처 표시: 링크 종류:시드 PMID (최대 3개)
+        short_names = {"pubmed_pubmed_citedin": "citedin", "pubmed_pubmed_refs": "refs", "pubmed_pubmed": "similar"}
+        expanded = with_overlay(session_table(build_base_table(records)), Expanded_From=[
+            '; '.join(f"{short_names.get(name, name)}:{seed}" for name, seed in sources[r['PMID']][:3])
+            for r in records])
+        incr("expansion_articles_total", len(expanded))
+        st.session_state.expansion_message = f"✅ 시드 {len(seeds)}개에서 새 논문 {len(expanded)}개를 추가했습니다{note}"
+
+        if st.session_state.get('search_df') is not None:
+            # 로컬 facet 모드 - 전체 결과에 추가하고 필터를 다시 적용
+            st.session_state.search_df = merge_results(source_df, expanded)
+            st.session_state.facet_index = build_facet_index(st.session_state.search_df['PMID'].tolist())
+            st.session_state.facet_selection = None
+            apply_local_facets(filter_options)
+        else:
+            st.session_state.df = merge_results(df, expanded)
+        st.rerun()
+
+def render_shared_jobs():
+    """공유 작업 대기열 - 현재 팀의 작업 목록과 완료 결과 불러오기"""
+    team = st.session_state.get('selected_team', '')
+    with st.expander("🗂️ 워커 작업 목록"):
+        if st.session_state.get('job_message'):
+            st.success(st.session_state.pop('job_message'))
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"{team} 팀 작업 - 다른 서버 프로세스나 재시작 전에 등록한 작업도 표시됩니다")
+        with col2:
+            st.button("🔄 새로고침", use_container_width=True, key="shared_jobs_refresh")
+        jobs = state_store.list_jobs(team)
+        if not jobs:
+            st.info("등록된 작업이 없습니다")
+            return
+        st.dataframe(pd.DataFrame([job_summary(job) for job in jobs]), use_container_width=True, hide_index=True)
+
+        done = [job for job in jobs if job['status'] == state_store.DONE]
+        if not done:
+            return
+        job_id = st.selectbox("완료된 작업", [job['id'] for job in done], key="shared_job_id",
+                              format_func=lambda i: next(f"#{j['id']} {job_summary(j)['작업']} - {job_summary(j)['대상']}"
+                                                         for j in done if j['id'] == i))
+        if st.button("📥 결과 불러오기", use_container_width=True, key="shared_job_load"):
+            job = next(j for j in done if j['id'] == job_id)
+            if load_job_result(job, state_store.load_result(job_id)):
+                st.rerun()
+
+def load_job_result(job, result):
+    """완료된 작업 결과를 세션에 반영 - 성공 여부 반환 (메시지는 다시 그린 뒤 표시)"""
+    if result is None:
+        st.error("❌ 작업 결과를 찾을 수 없습니다")
+        return False
+
+    if job['kind'] == 'meddev_batch':
+        st.session_state.meddev_batch_results = result['results']
+        st.session_state.job_message = f"✅ MEDDEV 일괄 분석 결과 {len(result['results'])}개를 불러왔습니다 (MEDDEV 탭)"
+        return True
+
+    pmids = result['pmids'] if job['kind'] == 'search' else [row['PMID'] for row in result['rows']]
+    records = [article.to_record() for article in article_store.get_many(pmids)]
+    if not records:
+        st.warning("⚠️ 결과 논문이 0개입니다")
+        return False
+    index_articles(records)
+    base = build_base_table(records)
+    st.session_state.search_df = None
+    st.session_state.facet_index = None
+
+    if job['kind'] == 'search':
+        st.session_state.df = session_table(base)
+        st.session_state.job_message = f"✅ 검색 결과 {len(records)}개를 불러왔습니다"
+        return True
+
+    rows = {row['PMID']: row for row in result['rows']}
+    rows = [rows[pmid] for pmid in base['PMID']]
+    columns = screening_columns(*([r[name] for r in rows] for name in ('Include', 'Confidence', 'Matched_PICO', 'Rationale')))
+    st.session_state.df = with_overlay(base, **columns)
+    st.session_state.job_message = (f"✅ 스크리닝 결과 {len(rows)}개를 불러왔습니다 (포함 {int(columns['Include'].sum())}개, "
+                                    f"오류 {int(columns['Include'].isna().sum())}개, AI 분석 탭)")
+    return True
+
+def render_local_filter():
+    """검색 결과 내 로컬 전문 검색 (네트워크 요청 없음)"""
+    df = st.session_state.get('df')
+    if df is None or df.empty:
+        return
+
+    st.markdown("### 🔎 결과 내 로컬 검색")
+    local_query = st.text_input(
+        "검색어",
+        placeholder='예: "stent fracture" AND Melody',
+        help="PubMed와 같은 AND/OR/NOT, \"구문\", 와일드카드(*), [ti]/[tiab]/[au]/[ta] 태그를 지원합니다",
+        key="local_filter_query"
+    )
+    if not local_query:
+        return
+
+    try:
+        start = time.perf_counter()
+        matched = search_local(local_query, pmids=df['PMID'].tolist())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+
+    order = {pmid: rank for rank, pmid in enumerate(matched)}
+    filtered = df[df['PMID'].isin(order)]
+    filtered = filtered.iloc[filtered['PMID'].map(order).argsort()]
+    st.success(f"🔎 {len(df)}개 중 {len(filtered)}개 일치 ({elapsed_ms:.1f}ms)")
+    render_result_table(filtered, key="local_results")
+
+def apply_local_facets(filter_options):
+    """보관된 전체 검색 결과에 유형/종/성별/연령 필터를 로컬 적용 (선택이 바뀐 경우에만)"""
+    source = st.session_state.get('search_df')
+    index = st.session_state.get('facet_index')
+    if source is None or index is None:
+        return
+    selection = selected_facets(filter_options)
+    if selection == st.session_state.get('facet_selection'):
+        return
+
+    with span("facets.filter"):
+        # 현재 표시 중인 결과의 Select/Reason·스크리닝 결과를 전체 결과에 먼저 반영 (필터 변경 시 유지)
+        current = st.session_state.get('df')
+        if current is not None and current is not source:
+            source = st.session_state.search_df = carry_overlay(source, current)
+        st.session_state.df = source[facet_mask(index, selection)].reset_index(drop=True)
+    st.session_state.facet_selection = selection
+    incr("facet_filter_applied_total")
+
+def render_facet_counts(filter_options):
+    """필터별 논문 수 표시 (다른 그룹 선택을 반영한 수)"""
+    index = st.session_state.facet_index
+    selection = selected_facets(filter_options)
+    counts = facet_counts(index, selection)
+    groups = {}
+    for facet, count in counts.items():
+        mark = "✅ " if facet in selection else ""
+        groups.setdefault(facet[0], []).append(f"{mark}{FACET_LABELS[facet]} {count}")
+
+    st.markdown("### 🧮 로컬 필터")
+    st.caption(f"전체 {index['size']}개 중 {len(st.session_state.df)}개 표시 (필터 변경 시 재검색 없음)")
+    st.caption(" · ".join(" / ".join(items) for items in groups.values()))
+    if index['missing']:
+        st.warning(f"⚠️ {index['missing']}개 논문은 MeSH/출판 유형 정보가 없어 필터에서 제외됩니다")
 
 def render_search_filters():
     """검색 필터 UI 렌더링 - 검색 기간 및 PubMed 주요 필터 추가"""
@@ -123,9 +394,16 @@ def render_search_filters():
     with col2:
         other_medline = st.checkbox("MEDLINE", value=False)
 
+    local_facets = st.checkbox(
+        "⚡ 유형/종/성별/연령 필터를 검색 결과에 로컬 적용",
+        value=False,
+        help="넓은 검색을 한 번만 실행하고 Article Type/Species/Sex/Age 필터는 받은 MeSH·출판 유형으로 바로 거릅니다 "
+             "(재검색 없음). 넓은 검색 결과가 최대 수집 수를 넘으면 서버 필터로 검색합니다"
+    )
 
     return {
         'period': period,
+        'local_facets': local_facets,
         'text_filters': {
             'abstract': filter_abstract,
             'free_full_text': filter_free_full_text,
@@ -161,8 +439,8 @@ def render_search_filters():
     }
 
 def execute_pubmed_search(P, I, C, O, use_P, use_I, use_C, use_O, 
-                         email, api_key, filter_options):
-    """PubMed 검색 실행"""
+                         email, api_key, filter_options, merge_previous=False, stream_options=None, queue=False):
+    """PubMed 검색 실행 (stream_options가 있으면 검색과 스크리닝을 겹쳐 실행, queue면 워커 큐에 등록)"""
     selected_components = []
     if use_P and P: selected_components.append("P")
     if use_I and I: selected_components.append("I") 
@@ -176,26 +454,6 @@ def execute_pubmed_search(P, I, C, O, use_P, use_I, use_C, use_O,
         st.error("❌ NCBI 이메일을 입력하세요!")
         return
     
-    # 쿼리 생성
-    query_components = []
-    if use_P and P: query_components.append(P)
-    if use_I and I: query_components.append(I)
-    if use_C and C: query_components.append(C)
-    if use_O and O: query_components.append(O)
-
-    query = build_query(query_components)
-    
-    # 필터 적용
-    filters = build_filters(filter_options)
-    
-    if filters:
-        filter_str = ' AND ' + ' AND '.join(filters)
-        final_query = query + filter_str
-    else:
-        final_query = query
-
-    st.info(f"🔍 **검색 쿼리**: {final_query}")
-    
     # 날짜 파싱 (필터 옵션에서 가져오기)
     period = filter_options.get('period', '')
     mindate = maxdate = None
@@ -204,35 +462,84 @@ def execute_pubmed_search(P, I, C, O, use_P, use_I, use_C, use_O,
             mindate, maxdate = period.split('-', 1)
             mindate = mindate.strip()
             maxdate = maxdate.strip()
-            st.success(f"📅 **날짜 범위**: {mindate} ~ {maxdate}")
         except:
             st.warning("⚠️ 날짜 형식: YYYY/MM/DD-YYYY/MM/DD")
 
+    # 필터 적용 (로컬 facet 모드에서는 유형/종/성별/연령 필터를 검색 후 적용)
+    local_facets = bool(filter_options.get('local_facets')) and not stream_options and not queue
+    filters = build_filters(filter_options, local_facets=local_facets)
+
+    # 쿼리 생성 - 네트워크 요청 전에 검증하고 정규화 (공백/순서/중복 필터가 달라도 같은 캐시 키)
+    components = {name: text for name, text, use in (('P', P, use_P), ('I', I, use_I), ('C', C, use_C), ('O', O, use_O))
+                  if use and text}
     try:
-        # PMID 검색 (논문수 제한 없이 모든 결과)
-        with st.spinner("🔍 PubMed에서 논문 검색 중..."):
-            pmids = pubmed_search_all(final_query, email, retmax_per_call=10000,  # 큰 수로 설정
-                                      api_key=api_key or None, mindate=mindate, maxdate=maxdate)
-        
-        if pmids:
-            st.success(f"✅ {len(pmids)}개의 논문을 찾았습니다!")
+        compiled = compile_query(components, filters, mindate, maxdate)
+    except ValueError as e:
+        st.error(f"❌ 검색식 오류 - {e}")
+        return
+    final_query = compiled.text
+    flight_key = compiled.key
+    server_query = None
+    if local_facets:
+        # 넓은 검색이 잘리면 대신 사용할 서버 필터 검색식 (같은 구성요소라 컴파일 오류 없음)
+        server_compiled = compile_query(components, build_filters(filter_options), mindate, maxdate)
+        server_query = server_compiled.text
+        flight_key = f"{compiled.key}:{server_compiled.key}"
+
+    previous_df = st.session_state.get('search_df')
+    if previous_df is None:
+        previous_df = st.session_state.df
+    st.session_state.search_df = None
+    st.session_state.facet_index = None
+
+    st.info(f"🔍 **검색 쿼리**: {final_query}")
+    if mindate and maxdate:
+        st.success(f"📅 **날짜 범위**: {mindate} ~ {maxdate}")
+
+    if stream_options:
+        execute_streaming_screening(final_query, mindate, maxdate, email, api_key, stream_options)
+        return
+
+    if queue:
+        job_id = state_store.enqueue_job("search", {'query': final_query, 'mindate': mindate, 'maxdate': maxdate},
+                                         st.session_state.get('selected_team', ''))
+        st.success(f"🗂️ 검색 작업 #{job_id}을 대기열에 등록했습니다")
+        return
 
-            # 상세 정보 수집
-            with st.spinner("📄 논문 상세 정보 수집 중..."):
-                details = pubmed_details(pmids, email, api_key or None)
+    try:
+        # 동시에 같은 검색(쿼리 + 날짜 범위)을 실행 중인 세션이 있으면 그 결과를 공유
+        with st.spinner("🔍 PubMed 검색 및 상세 정보 수집 중..."):
+            (pmids, base, local_facets), shared = pubmed_search_flight.do(
+                flight_key,
+                lambda: fetch_pubmed_results(final_query, email, api_key or None, mindate, maxdate, server_query)
+            )
+        if shared:
+            st.info(f"🤝 다른 사용자가 실행 중이던 동일 검색 결과를 공유했습니다 ({len(pmids)}개)")
 
-            if details:
-                # 결과 표시
-                df = pd.DataFrame(details)
+        if pmids:
+            if base is not None:
+                # 결과 표시 (기본 테이블은 공유, Select/Reason만 세션별)
+                with span("search.dataframe"):
+                    df = session_table(base)
+                if merge_previous:
+                    df = merge_results(previous_df, df)
+                    st.info(f"🔗 기존 결과와 병합: 총 {len(df)}개 (중복 포함)")
                 st.session_state.df = df
-                st.dataframe(df, use_container_width=True)
+
+                if local_facets:
+                    # 전체 결과는 보관하고 필터 비트맵으로 현재 선택만 표시
+                    st.session_state.search_df = df
+                    st.session_state.facet_index = build_facet_index(df['PMID'].tolist())
+                    st.session_state.facet_selection = None
+                    apply_local_facets(filter_options)
+                    df = st.session_state.df
 
                 # 엑셀 다운로드
-                excel_bytes = io.BytesIO()
-                df.to_excel(excel_bytes, index=False, engine='openpyxl')
+                with span("search.excel"):
+                    excel_data = cached_excel_bytes(df)
                 st.download_button(
                     label="📥 엑셀 다운로드",
-                    data=excel_bytes.getvalue(),
+                    data=excel_data,
                     file_name=f"pubmed_results_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True
@@ -241,6 +548,103 @@ def execute_pubmed_search(P, I, C, O, use_P, use_I, use_C, use_O,
     except Exception as e:
         st.error(f"❌ 검색 오류: {e}")
 
+def execute_streaming_screening(final_query, mindate, maxdate, email, api_key, stream_options):
+    """검색 → 상세 수집 → 구조화 스크리닝 스트리밍 실행 후 결과를 세션에 저장"""
+    gemini_api_key = stream_options['gemini_api_key']
+    product_name = stream_options['product_name']
+    if not gemini_api_key or not product_name:
+        st.error("❌ 스트리밍 스크리닝에는 Gemini API 키와 제품/기술명이 필요합니다!")
+        return
+
+    pico = st.session_state.get('pico', {})
+    pico_text = '\n'.join(f"{k}: {v}" for k, v in pico.items() if v)
+    status_text = st.empty()
+    live_results = st.empty()
+    start = time.perf_counter()
+    first_result = []
+    recent = []
+    errors = []
+    results = []
+    meta = {}
+    max_results = SEARCH_SETTINGS["max_results"]
+
+    def show(item, count):
+        if not first_result:
+            first_result.append(time.perf_counter() - start)
+        recent.append(item)
+        del recent[:-20]  # 최근 20개만 표시
+        status_text.text(f"⚡ 스크리닝 {count}개 완료 (첫 결과 {first_result[0]:.1f}초)")
+        if count % 5 == 1:  # 화면 갱신 횟수 제한
+            live_results.dataframe(pd.DataFrame(recent)[['PMID', 'Title', 'Include', 'Confidence']],
+                                   use_container_width=True, hide_index=True)
+
+    failed = False
+    try:
+        with st.spinner("⚡ 검색/수집/스크리닝 동시 진행 중..."):
+            run_streaming_screening(final_query, email, api_key or None, gemini_api_key, product_name,
+                                    pico_text, on_result=show, retmax=max_results, mindate=mindate,
+                                    maxdate=maxdate, errors=errors, meta=meta, collected=results)
+    except Exception as e:
+        failed = True
+        st.error(f"❌ 스트리밍 오류: {e}")
+    finally:
+        live_results.empty()
+    for e in errors:
+        st.error(f"상세 정보 수집 오류: {e}")
+    if not results:
+        if not failed:
+            st.warning("⚠️ 검색 결과가 0개입니다")
+        return
+    if failed:
+        st.warning(f"⚠️ 오류 전까지 스크리닝한 {len(results)}개만 표시합니다 - 다시 실행하면 전체를 검색합니다")
+    if meta.get('count', 0) > max_results:
+        st.warning(f"⚠️ 검색 결과 {meta['count']}개 중 처음 {max_results}개만 수집/스크리닝했습니다")
+
+    # 로컬 색인 및 세션 테이블 (기본 테이블 + 스크리닝 컬럼)
+    index_articles(results)
+    base = build_base_table(results)
+    columns = screening_columns(*([r[name] for r in results]
+                                  for name in ('Include', 'Confidence', 'Matched_PICO', 'Rationale')))
+    include = columns['Include']
+    st.session_state.df = with_overlay(base, **columns)
+    elapsed = time.perf_counter() - start
+    status_text.empty()
+    st.success(f"⚡ {len(results)}개 수집/스크리닝 완료 - 첫 결과 {first_result[0]:.1f}초, 전체 {elapsed:.1f}초 "
+               f"(포함 {int(include.sum())}개)")
+
+def fetch_pubmed_results(final_query, email, api_key, mindate, maxdate, server_query=None):
+    """PMID 검색 후 상세 정보 수집 - (pmids, 공유 기본 테이블, 로컬 facet 사용 여부) 반환
+
+    server_query가 있으면 final_query는 로컬 facet용 넓은 검색입니다. 넓은 검색이
+    max_results에서 잘리면 로컬 필터가 일부 결과만 보게 되므로 서버 필터
+    검색식(server_query)으로 다시 검색하고 로컬 facet은 쓰지 않습니다.
+    """
+    max_results = SEARCH_SETTINGS["max_results"]
+    local_facets = server_query is not None
+    with span("search.esearch_total"):
+        pmids = cached_pubmed_search(final_query, email, retmax_per_call=max_results,
+                                     api_key=api_key, mindate=mindate, maxdate=maxdate)
+        if local_facets and len(pmids) >= max_results:
+            local_facets = False
+            st.warning(f"⚠️ 넓은 검색 결과가 {max_results}개를 넘어 로컬 필터 대신 서버 필터로 검색합니다")
+            if server_query != final_query:
+                st.info(f"🔍 **서버 필터 검색 쿼리**: {server_query}")
+                pmids = cached_pubmed_search(server_query, email, retmax_per_call=max_results,
+                                             api_key=api_key, mindate=mindate, maxdate=maxdate)
+    if not pmids:
+        return pmids, None, local_facets
+
+    st.success(f"✅ {len(pmids)}개의 논문을 찾았습니다!")
+    if len(pmids) >= max_results:
+        st.warning(f"⚠️ 검색 결과가 최대 {max_results}개로 잘렸습니다 - 검색어, 기간이나 필터를 좁혀 주세요")
+
+    # 상세 정보 수집
+    with span("search.efetch_total"):
+        base = shared_base_table(tuple(pmids), email, api_key)
+    if len(base) < len(set(pmids)):
+        st.warning(f"⚠️ 검색된 PMID {len(set(pmids)) - len(base)}개는 상세 정보를 가져오지 못해 결과에서 빠졌습니다")
+    return pmids, base, local_facets
+
 def render_ai_tab():
     """AI 분석 탭 렌더링"""
     st.markdown("### 🤖 Gemini AI 분석")
@@ -275,8 +679,8 @@ def render_ai_tab():
     st.markdown("### 📝 분석 설정")
     analysis_mode = st.selectbox(
         "분석 모드 선택",
-        ["관련성 분석", "안전성 분석", "효과성 분석", "커스텀 분석"],
-        help="어떤 관점에서 분석할지 선택하세요"
+        ["관련성 분석", "안전성 분석", "효과성 분석", "구조화 스크리닝", "커스텀 분석"],
+        help="어떤 관점에서 분석할지 선택하세요. 구조화 스크리닝은 포함 여부/신뢰도/PICO 일치/짧은 근거를 JSON으로 받습니다."
     )
 
     if analysis_mode == "관련성 분석":
@@ -300,6 +704,10 @@ def render_ai_tab():
 이 논문에서 '{product_name}'의 효과성과 관련된 내용이 있는지 분석하고,
 치료 효과, 성공률, 개선 정도 등이 언급되었다면 핵심 내용을 한국어로 요약해주세요."""
 
+    elif analysis_mode == "구조화 스크리닝":
+        user_prompt = None
+        st.caption("🧾 포함 여부는 제품명 일치가 아니라 모델 판단(JSON 스키마 출력)으로 결정됩니다")
+
     else:  # 커스텀 분석
         user_prompt = st.text_area(
             "💬 커스텀 프롬프트",
@@ -312,15 +720,101 @@ def render_ai_tab():
     gemini_status = False
     if gemini_api_key:
         try:
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content("안녕하세요")
-            if response and response.text:
+            if check_gemini_connection(gemini_api_key):
                 gemini_status = True
                 st.success("✅ Gemini API 연결 성공!")
         except Exception as e:
             st.error(f"❌ Gemini API 오류: {e}")
 
+    # 관련도 순위 설정
+    rank_papers = st.checkbox(
+        "📈 PICO 관련도 순으로 분석",
+        value=True,
+        help="제목/초록의 PICO 관련도(BM25)가 높은 논문부터 분석하고, 컷오프 미만은 건너뜁니다"
+    )
+    if rank_papers:
+        pico = st.session_state.get('pico') or {k: st.session_state.get(f'team_{k}', '') for k in 'PICO'}
+        ranking_text = st.text_area(
+            "📋 관련도 기준 텍스트",
+            value='\n'.join(v for v in pico.values() if v),
+            height=80,
+            help="기본값은 PubMed 탭의 PICO 입력입니다. NOT 조건과 필드 태그는 무시됩니다."
+        )
+        min_relevance = st.slider(
+            "✂️ 관련도 컷오프 (최고점 대비 %)", 0, 100, 0,
+            help="이 값 미만인 논문은 Gemini 분석을 건너뜁니다"
+        )
+
+    # 중복 제거 설정
+    remove_duplicates = st.checkbox(
+        "🧹 분석 전 중복 제거",
+        value=True,
+        help="PMID/DOI 완전 일치 및 제목 유사도(정정 공지, 학회 초록 등)로 중복을 합쳐 Gemini 호출을 줄입니다"
+    )
+
+    prompt_error = prompt_format_error(user_prompt)
+    if prompt_error:
+        st.error(f"❌ 프롬프트 형식 오류: {prompt_error} - 중괄호는 {{title}}, {{abstract}}, {{product}}에만 "
+                 f"쓰고 그 밖의 중괄호는 {{{{ }}}}처럼 두 번 입력하세요")
+
+    def analysis_targets(sample):
+        """분석 실행과 같은 중복 제거/관련도 컷오프/상위 10개 선택
+
+        (대상 df, 안내 메시지 목록, 건너뛴 논문의 사유 {PMID: 사유})를 반환합니다. 중복 제거/관련도/
+        Gemini 프롬프트가 전체 초록을 보도록 대상 df에는 저장소의 전체 초록을 넣습니다.
+        """
+        targets, notes, skipped = with_full_abstracts(st.session_state.df), [], {}
+
+        def skip(kept, reason):
+            dropped = set(targets['PMID']) - set(kept['PMID'])
+            skipped.update(dict.fromkeys(dropped, reason))
+            return kept
+
+        if remove_duplicates:
+            deduped, report = deduplicate(targets)
+            targets = skip(deduped, "중복 논문 (분석 제외)")
+            removed = report['input'] - report['output']
+            if removed:
+                notes.append(f"🧹 중복 {removed}개 제거 (PMID {report['exact_pmid']}, DOI {report['exact_doi']}, "
+                             f"유사 제목 {report['fuzzy_title']}) → {report['output']}개")
+        if rank_papers:
+            targets = rank_by_relevance(targets, ranking_text, product_name)
+            below = int((targets['Relevance'] < min_relevance).sum())
+            targets = skip(targets[targets['Relevance'] >= min_relevance].reset_index(drop=True), "관련도 기준 미달")
+            if below:
+                notes.append(f"✂️ 관련도 {min_relevance} 미만 {below}개는 분석을 건너뜁니다")
+        if sample:
+            targets = skip(targets.head(10), "샘플 분석 대상 아님")
+            notes.append("🎯 상위 10개 논문을 분석합니다" + (" (관련도 순)" if rank_papers else ""))
+        else:
+            notes.append(f"🚀 전체 {len(targets)}개 논문을 분석합니다")
+        return targets, notes, skipped
+
+    # 실행 전 비용/시간 예측 - 켰을 때만 프롬프트를 만들어 계산하고, 추천 방식으로 실행
+    plan_mode = None
+    with st.expander("🧮 실행 전 비용/시간 예측"):
+        if prompt_error:
+            st.info("프롬프트 형식 오류를 고치면 예측할 수 있습니다")
+        # AI 분석 탭은 논문별 호출을 순차 또는 동시에 실행 (여러 논문을 한 호출로 묶는 방식은 없음)
+        elif st.toggle("예측 계산", value=False, key="ai_plan_enabled"):
+            sample = st.radio("예측 대상", ["전체 논문 분석", "상위 10개 샘플 분석"], horizontal=True,
+                              key="ai_plan_target") == "상위 10개 샘플 분석"
+            targets, _, _ = analysis_targets(sample)
+            pico = st.session_state.get('pico') or {k: st.session_state.get(f'team_{k}', '') for k in 'PICO'}
+            pico_text = '\n'.join(f"{k}: {v}" for k, v in pico.items() if v)
+            prompts = planner.screening_prompts(targets, product_name, user_prompt, pico_text)
+            mode = "structured" if user_prompt is None else "classic"
+            prefix = planner.shared_prefix_tokens(product_name, user_prompt, pico_text)
+            plan_mode = render_run_plan(prompts, PLANNER_SETTINGS["output_tokens"][mode], prefix,
+                                        gemini_api_key if gemini_status else None, key="ai_plan",
+                                        modes=("sequential", "concurrent"))
+
+    queue_screening = False
+    if state_store.enabled() and analysis_mode == "구조화 스크리닝":
+        queue_screening = st.checkbox("🗂️ 워커 큐로 실행", value=False, key="queue_screening",
+                                      help="worker.py 프로세스가 스크리닝합니다. 결과는 PubMed 탭 작업 목록에서 불러옵니다. "
+                                           + QUEUE_CREDENTIALS_HELP)
+
     # 분석 실행 버튼
     col1, col2 = st.columns(2)
     with col1:
@@ -334,17 +828,123 @@ def render_ai_tab():
             st.error("❌ Gemini API 키를 확인하세요!")
         elif not product_name:
             st.error("❌ 제품/기술명을 입력하세요!")
+        elif prompt_error:
+            st.error("❌ 프롬프트 형식 오류를 먼저 고치세요!")
         else:
             # 분석할 논문 선택
-            df_to_analyze = st.session_state.df.copy()
-            if analyze_sample:
-                df_to_analyze = df_to_analyze.head(10)
-                st.info("🎯 상위 10개 논문을 분석합니다")
+            source = st.session_state.df
+            df_to_analyze, notes, skipped = analysis_targets(analyze_sample)
+            for note in notes:
+                st.info(note)
+            workers = PLANNER_SETTINGS["concurrency"] if plan_mode == "concurrent" else 1
+            if plan_mode:
+                st.info(f"🧮 예측에서 추천한 방식으로 실행합니다: {'동시 실행 x' + str(workers) if workers > 1 else '순차 실행'}")
+
+            if analysis_mode == "구조화 스크리닝":
+                pico = st.session_state.get('pico') or {k: st.session_state.get(f'team_{k}', '') for k in 'PICO'}
+                pico_text = '\n'.join(f"{k}: {v}" for k, v in pico.items() if v)
+                if queue_screening:
+                    job_id = state_store.enqueue_job("screening", {
+                        'pmids': df_to_analyze['PMID'].astype(str).tolist(),
+                        'product_name': product_name,
+                        'pico_text': pico_text
+                    }, st.session_state.get('selected_team', ''))
+                    st.success(f"🗂️ 스크리닝 작업 #{job_id}을 대기열에 등록했습니다")
+                else:
+                    screen_with_gemini_structured(df_to_analyze, gemini_api_key, product_name, pico_text, workers)
             else:
-                st.info(f"🚀 전체 {len(df_to_analyze)}개 논문을 분석합니다")
+                # analysis.py의 analyze_with_gemini 함수 사용
+                analyze_with_gemini(df_to_analyze, gemini_api_key, product_name, user_prompt, workers)
+            # 분석 함수는 대상 행만 세션에 저장하므로, 결과를 PMID 기준으로 전체 표에 합치고 건너뛴 행에 사유 기록
+            if not queue_screening:
+                st.session_state.df = mark_skipped(carry_overlay(source, st.session_state.df), skipped)
+
+    # 일반 분석 결과 표 (관련 있음으로 분석된 논문이 있을 때)
+    df = st.session_state.df
+    if 'Include' not in df.columns and (df['Select'] == 'Y').any():
+        st.markdown("### 📄 분석 결과")
+        render_result_table(df, key="ai_results")
+
+    # 구조화 스크리닝 결과 필터 (컬럼 연산만 사용, 재분석 없음)
+    render_screening_results()
+
+def prompt_format_error(user_prompt):
+    """{title}/{abstract}/{product} 외의 중괄호 등으로 str.format이 실패하면 오류 메시지, 아니면 None"""
+    if user_prompt is None:
+        return None
+    try:
+        user_prompt.format(title='', abstract='', product='')
+    except (KeyError, IndexError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def render_run_plan(prompts, output_tokens_per_call, prefix_tokens, gemini_api_key=None, key="plan",
+                    modes=("sequential", "concurrent", "batch"), concurrency=None):
+    """프롬프트 목록의 토큰/시간/비용 예측표 렌더링 - 예산 안에서 추천한 방식(modes 중 하나, 없으면 None) 반환
 
-            # analysis.py의 analyze_with_gemini 함수 사용
-            analyze_with_gemini(df_to_analyze, gemini_api_key, product_name, user_prompt)
+    modes는 화면에서 실행할 수 있는 방식, concurrency는 동시 실행할 때의 호출 수입니다.
+    """
+    if not prompts:
+        st.info("호출될 프롬프트가 없습니다 (제품명과 일치하는 논문이 없음)")
+        return None
+
+    col1, col2 = st.columns(2)
+    with col1:
+        budget = st.number_input("💵 예산 (USD, 0이면 제한 없음)", min_value=0.0, value=0.0, step=0.5, key=f"{key}_budget")
+    with col2:
+        calibrate = st.checkbox("🎯 Gemini로 토큰 수 보정 (샘플 3개)", value=False, key=f"{key}_calibrate",
+                                disabled=not gemini_api_key)
+
+    token_ratio = 1.0
+    if calibrate and gemini_api_key:
+        try:
+            token_ratio = planner.calibrate_token_ratio(get_gemini_model(gemini_api_key), prompts)
+        except Exception as e:
+            st.warning(f"⚠️ 토큰 보정 실패, 로컬 추정치를 사용합니다: {e}")
+
+    plans = planner.plan_run(prompts, output_tokens_per_call, concurrency=concurrency, token_ratio=token_ratio,
+                             shared_prefix_tokens=prefix_tokens, modes=modes)
+    st.dataframe(pd.DataFrame(plans), use_container_width=True, hide_index=True)
+
+    best = planner.recommend(plans, budget or None)
+    if best is None:
+        st.warning("⚠️ 예산 안에서 가능한 방식이 없습니다")
+        return None
+    st.success(f"💡 추천: **{best['방식']}** - 약 {best['예상 시간(분)']}분, ${best['예상 비용($)']}")
+    return modes[plans.index(best)]
+
+def render_screening_results():
+    """구조화 스크리닝 결과 필터링/다운로드"""
+    df = st.session_state.get('df')
+    if df is None or 'Include' not in df.columns:
+        return
+
+    st.markdown("### 🧾 구조화 스크리닝 결과")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        include_only = st.checkbox("포함(Include)만 보기", value=True, key="screen_include_only")
+    with col2:
+        min_confidence = st.slider("최소 신뢰도", 0.0, 1.0, 0.0, 0.05, key="screen_min_confidence")
+    with col3:
+        required_pico = st.multiselect("필수 PICO 요소", ["P", "I", "C", "O"], key="screen_required_pico")
+
+    mask = df['Confidence'] >= min_confidence
+    if include_only:
+        mask &= df['Include'].fillna(False).astype(bool)
+    for element in required_pico:
+        mask &= df['Matched_PICO'].str.contains(element, regex=False)
+    filtered = df[mask]
+
+    st.success(f"🧾 {len(df)}개 중 {len(filtered)}개")
+    render_result_table(filtered, key="screening_results",
+                        columns=['PMID', 'Title', 'Include', 'Confidence', 'Matched_PICO', 'Rationale', 'Journal', 'Year'])
+    st.download_button(
+        label="📥 필터 결과 다운로드",
+        data=cached_excel_bytes(filtered),
+        file_name=f"screening_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        use_container_width=True
+    )
 
 
 
@@ -431,6 +1031,9 @@ def render_meddev_tab():
     """MEDDEV 분석 탭 렌더링"""
     st.markdown("### 📊 MEDDEV 2.7/1 Rev. 4 분석")
 
+    # 선별 논문 일괄 분석 (PMC 오픈 액세스 전문, PDF 업로드 불필요)
+    render_meddev_batch()
+
     # 세션 상태 초기화
     if 'meddev_analysis_result' not in st.session_state:
         st.session_state.meddev_analysis_result = None
@@ -444,15 +1047,15 @@ def render_meddev_tab():
         try:
             import pdfplumber
 
-            # PDF 텍스트 추출
-            with pdfplumber.open(uploaded_file) as pdf:
-                pdf_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        pdf_text += text + "\n"
+            # PDF 텍스트 추출 (같은 파일은 캐시에서 재사용)
+            with span("meddev.pdf_extract"):
+                pdf_text, page_count = cached_pdf_text(uploaded_file.getvalue())
+            with span("meddev.pdf_tables"):
+                tables_text, table_count = cached_pdf_tables(uploaded_file.getvalue())
 
-            st.success(f"✅ PDF 업로드 성공! ({len(pdf.pages)}페이지)")
+            st.success(f"✅ PDF 업로드 성공! ({page_count}페이지)")
+            if len(pdf_text.strip()) < OCR_SETTINGS["min_chars_per_page"] * page_count and not ocr_available():
+                st.warning("⚠️ 스캔 이미지 PDF로 보입니다. tesseract가 설치되어 있지 않아 OCR을 건너뛰었습니다")
 
             # 제품/기기명 입력란 추가
             product_name = st.text_input(
@@ -466,6 +1069,9 @@ def render_meddev_tab():
                 st.text_area("PDF 내용 (처음 2000자)", 
                             pdf_text[:2000] + "..." if len(pdf_text) > 2000 else pdf_text, 
                             height=200)
+            if table_count:
+                with st.expander(f"📊 추출된 표 ({table_count}개, 프롬프트 앞부분에 포함)"):
+                    st.markdown(tables_text)
 
             # Gemini API 키 입력
             gemini_key_for_meddev = st.text_input(
@@ -476,6 +1082,13 @@ def render_meddev_tab():
                 help="MEDDEV 분석에 사용할 Gemini API 키를 입력하세요"
             )
             
+            # 실행 전 비용/시간 예측
+            with st.expander("🧮 실행 전 비용/시간 예측"):
+                planned_text = pdf_text[:50000]
+                render_run_plan([get_meddev_analysis_prompt(planned_text, product_name, tables_text)],
+                                PLANNER_SETTINGS["output_tokens"]["meddev"], 0, key="meddev_plan",
+                                modes=("sequential",))
+
             # 분석 실행 버튼과 리셋 버튼
             col1, col2 = st.columns(2)
             with col1:
@@ -485,12 +1098,6 @@ def render_meddev_tab():
                     else:
                         # 분석 실행 및 세션에 저장
                         try:
-                            import google.generativeai as genai
-                            
-                            # Gemini 설정
-                            genai.configure(api_key=gemini_key_for_meddev)
-                            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
                             # 텍스트 길이 제한
                             max_length = 50000
                             processed_text = pdf_text
@@ -499,24 +1106,27 @@ def render_meddev_tab():
                                 st.warning(f"⚠️ 텍스트가 {max_length}자로 제한되어 분석됩니다")
 
                             # 분석 실행
-                            prompt = get_meddev_analysis_prompt(processed_text, product_name)
+                            model, prompt = build_meddev_request(gemini_key_for_meddev, processed_text,
+                                                                 product_name, tables_text)
                             
                             with st.spinner("📊 MEDDEV 분석 중... (2-3분 소요)"):
-                                response = model.generate_content(prompt)
+                                response = gemini_generate(model, prompt, gemini_key_for_meddev, "meddev")
 
                                 if response and response.text:
                                     # 세션에 결과 저장
                                     st.session_state.meddev_analysis_result = response.text
                                     
                                     # 엑셀 데이터 생성 및 저장
-                                    excel_data = parse_meddev_to_excel(response.text)
-                                    excel_bytes = create_meddev_excel_file(excel_data, pdf_text, processed_text, response.text)
+                                    with span("meddev.excel"):
+                                        excel_data = parse_meddev_to_excel(response.text)
+                                        excel_bytes = create_meddev_excel_file(excel_data, pdf_text, processed_text, response.text)
                                     st.session_state.meddev_excel_data = excel_bytes.getvalue()
                                     
                                     st.success("✅ 분석 완료!")
                                 else:
                                     st.error("❌ Gemini 분석 응답을 받지 못했습니다")
                         except Exception as e:
+                            incr("gemini_errors_total", stage="meddev")
                             st.error(f"❌ 분석 오류: {e}")
             
             with col2:
@@ -603,6 +1213,132 @@ def render_meddev_tab():
                 )
 # ...existing code...
 
+def render_meddev_batch():
+    """스크리닝에서 선택된 논문의 PMC 오픈 액세스 전문을 받아 MEDDEV 일괄 분석"""
+    df = st.session_state.get('df')
+    selected = None
+    if df is not None and not df.empty:
+        if 'Include' in df.columns:
+            selected = df[df['Include'].fillna(False).astype(bool)]
+        elif 'Select' in df.columns:
+            selected = df[df['Select'] == 'Y']
+
+    with st.expander("📚 선별 논문 일괄 분석 (PMC 오픈 액세스 전문)"):
+        if selected is None or selected.empty:
+            st.info("ℹ️ AI 분석 탭에서 선택(Select=Y / Include)된 논문이 있으면 PDF 없이 일괄 분석할 수 있습니다")
+        else:
+            st.caption(f"선택된 논문 {len(selected)}개 - PMC 오픈 액세스 전문(JATS)이 있는 논문만 분석합니다")
+            col1, col2 = st.columns(2)
+            with col1:
+                email = st.text_input("📧 NCBI 이메일", value=st.session_state.get('team_email', ''),
+                                      key="meddev_batch_email")
+                product_name = st.text_input("🏷️ 제품/기기명", value=st.session_state.get('team_product', ''),
+                                             key="meddev_batch_product")
+            with col2:
+                api_key = st.text_input("🔑 NCBI API 키", value=st.session_state.get('team_api_key', ''),
+                                        type="password", key="meddev_batch_api_key")
+                gemini_key = st.text_input("🤖 Gemini API 키", value=st.session_state.get('team_gemini_api_key', ''),
+                                           type="password", key="meddev_batch_gemini_key")
+            queue_batch = state_store.enabled() and st.checkbox(
+                "🗂️ 워커 큐로 실행", value=False, key="queue_meddev_batch",
+                help="worker.py 프로세스가 전문 수집/분석을 실행합니다. 결과는 PubMed 탭 작업 목록에서 불러옵니다. "
+                     + QUEUE_CREDENTIALS_HELP)
+
+            # 실행 전 비용/시간 예측 - 전문을 먼저 받아(캐시) 실제 프롬프트로 계산하고, 추천 방식으로 실행
+            workers = FULLTEXT_SETTINGS["meddev_workers"]
+            if not queue_batch and st.toggle("🧮 실행 전 비용/시간 예측 (PMC 전문 수집)", value=False,
+                                             key="meddev_batch_plan_enabled"):
+                if not email:
+                    st.info("NCBI 이메일을 입력하면 전문을 받아 예측할 수 있습니다")
+                else:
+                    docs = cached_pmc_fulltexts(tuple(selected['PMID'].astype(str)), email, api_key or None)
+                    prompts = [get_meddev_analysis_prompt(doc['text'][:FULLTEXT_SETTINGS["max_chars"]], product_name,
+                                                          tables_to_markdown(doc['tables']))
+                               for doc in docs.values() if doc is not None]
+                    if not prompts:
+                        st.info("PMC 오픈 액세스 전문이 있는 논문이 없습니다")
+                    elif render_run_plan(prompts, PLANNER_SETTINGS["output_tokens"]["meddev"], 0, gemini_key or None,
+                                         key="meddev_batch_plan", modes=("sequential", "concurrent"),
+                                         concurrency=workers) == "sequential":
+                        workers = 1
+
+            if st.button("📚 전문 수집 후 일괄 분석", use_container_width=True, key="meddev_batch_run"):
+                if not queue_batch and (not email or not gemini_key):
+                    st.error("❌ NCBI 이메일과 Gemini API 키를 입력하세요!")
+                elif queue_batch:
+                    pmids = selected['PMID'].astype(str).tolist()
+                    job_id = state_store.enqueue_job("meddev_batch", {
+                        'pmids': pmids,
+                        'titles': dict(zip(pmids, selected['Title'].astype(str))),
+                        'product_name': product_name
+                    }, st.session_state.get('selected_team', ''))
+                    st.success(f"🗂️ MEDDEV 일괄 분석 작업 #{job_id}을 대기열에 등록했습니다")
+                else:
+                    run_meddev_batch(selected, email, api_key, gemini_key, product_name, workers)
+
+        results = st.session_state.get('meddev_batch_results')
+        if results:
+            result_df = pd.DataFrame(results)
+            st.dataframe(result_df.drop(columns=['분석 결과']), use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📊 일괄 분석 엑셀 다운로드",
+                data=create_meddev_batch_excel(results),
+                file_name=f"MEDDEV_batch_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True,
+                key="meddev_batch_download"
+            )
+
+def run_meddev_batch(selected, email, api_key, gemini_key, product_name, max_workers=None):
+    """전문 수집 → MEDDEV 분석을 실행하고 결과를 세션에 저장 (max_workers개 분석을 동시에 진행)"""
+    pmids = selected['PMID'].astype(str).tolist()
+    titles = dict(zip(pmids, selected['Title'].astype(str)))
+    with st.spinner(f"📚 PMC 전문 수집 중... ({len(pmids)}개)"):
+        docs = cached_pmc_fulltexts(tuple(pmids), email, api_key or None)
+    available = {pmid: doc for pmid, doc in docs.items() if doc is not None}
+    st.info(f"📚 전문 확보 {len(available)}개 / PMC 없음·비공개 {len(pmids) - len(available)}개")
+
+    results = [{'PMID': pmid, 'PMCID': '', 'Title': titles[pmid], '상태': 'PMC 오픈 액세스 전문 없음', '분석 결과': ''}
+               for pmid in pmids if pmid not in available]
+    if available:
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        with span("meddev_batch.total"):
+            for done, (pmid, text, error) in enumerate(
+                    appraise_meddev_batch(available, gemini_key, product_name, max_workers), 1):
+                results.append({'PMID': pmid, 'PMCID': available[pmid]['pmcid'], 'Title': titles[pmid],
+                                '상태': f"오류: {error}" if error else '완료', '분석 결과': text})
+                progress_bar.progress(done / len(available))
+                status_text.text(f"📊 MEDDEV 분석 중: {done}/{len(available)}")
+        status_text.empty()
+
+    order = {pmid: i for i, pmid in enumerate(pmids)}
+    st.session_state.meddev_batch_results = sorted(results, key=lambda r: order[r['PMID']])
+    completed = sum(r['상태'] == '완료' for r in results)
+    st.success(f"✅ 일괄 분석 완료: {completed}개 분석")
+
+def create_meddev_batch_excel(results):
+    """일괄 분석 결과 엑셀 - 논문별 요약 시트와 전체 분석 결과 시트"""
+    summary = []
+    for r in results:
+        data = parse_meddev_to_excel(r['분석 결과']) if r['분석 결과'] else {'paper_info': [], 'overall': []}
+        info = dict(data['paper_info'])
+        summary.append({
+            'PMID': r['PMID'],
+            'PMCID': r['PMCID'],
+            'Title': r['Title'],
+            '상태': r['상태'],
+            'Study Type': info.get('Study Type', ''),
+            'Overall appraisal': '; '.join(row[3] for row in data['overall'][1:] if len(row) > 3 and row[3])
+        })
+
+    excel_bytes = io.BytesIO()
+    with pd.ExcelWriter(excel_bytes, engine='openpyxl') as writer:
+        pd.DataFrame(summary).to_excel(writer, sheet_name='일괄요약', index=False)
+        pd.DataFrame([{'PMID': r['PMID'], '분석 결과': r['분석 결과']} for r in results]).to_excel(
+            writer, sheet_name='분석결과', index=False)
+    return excel_bytes.getvalue()
+
 def parse_meddev_to_excel(text):
     """MEDDEV 분석 결과를 엑셀용 데이터로 파싱 - 새로운 표 형식 반영"""
     data = {
@@ -751,3 +1487,58 @@ def create_meddev_excel_file(data, pdf_text, processed_text, analysis_text):
             raw_df.to_excel(writer, sheet_name='원본데이터', index=False)
     
     return excel_bytes
+
+def render_diagnostics_tab():
+    """진단 탭 렌더링 - 단계별 소요 시간과 카운터"""
+    st.markdown("### 🩺 성능 진단")
+    st.caption("서버 프로세스 시작 이후 모든 세션의 누적 측정값입니다")
+
+    data = metrics.snapshot()
+
+    st.markdown("#### ⏱️ 단계별 소요 시간")
+    if data['stages']:
+        stage_df = pd.DataFrame([{'Stage': stage, **stats} for stage, stats in data['stages'].items()])
+        st.dataframe(stage_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("아직 측정된 단계가 없습니다. 검색이나 분석을 실행해보세요.")
+
+    st.markdown("#### 🔢 카운터")
+    if data['counters']:
+        counter_df = pd.DataFrame([{
+            'Name': c['name'],
+            'Labels': ', '.join(f"{k}={v}" for k, v in c['labels'].items()),
+            'Value': c['value']
+        } for c in data['counters']])
+        st.dataframe(counter_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("아직 기록된 카운터가 없습니다.")
+
+    st.markdown("#### 🚦 요청 속도 조절 현황")
+    limiters = limiter_status()
+    if limiters:
+        st.dataframe(pd.DataFrame(limiters), use_container_width=True, hide_index=True)
+    else:
+        st.info("아직 외부 API 요청이 없습니다.")
+
+    # 내보내기
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="📥 JSON 내보내기",
+            data=metrics.to_json(),
+            file_name=f"metrics_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            label="📥 Prometheus 내보내기",
+            data=metrics.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
+    with col3:
+        if st.button("🔄 측정값 초기화", use_container_width=True):
+            metrics.reset()
+            st.rerun()
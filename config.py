@@ -1,3 +1,4 @@
+import os
 from rnd4 import TEAM_CONFIG as RND4_CONFIG
 from rnd35 import TEAM_CONFIG as RND35_CONFIG
 
@@ -29,7 +30,10 @@ SEARCH_SETTINGS = {
     "max_results_per_call": 200,
     "default_results": 50,
     "chunk_size": 50,
-    "api_delay": 1.0
+    "search_page_size": 500,   # 비동기 클라이언트 esearch 페이지 크기
+    "max_results": 10000,      # 화면 검색 한 번에 받는 최대 PMID 수 (넘으면 잘림 경고)
+    "fetch_concurrency": 3,    # 동시에 진행할 efetch 요청 수 (속도 조절기와 별도)
+    "pages_in_flight": 2       # 비동기 검색+수집에서 efetch를 동시에 진행할 esearch 페이지 수
 }
 
 # 날짜 필터 설정 - 커스텀 방식
@@ -38,3 +42,188 @@ DATE_FILTER_OPTIONS = {
     "format_help": "YYYY/MM/DD-YYYY/MM/DD 형식으로 입력하세요",
     "placeholder": "예: 2020/01/01-2024/12/31"
 }
+
+# 캐시 설정 (TTL: 초 단위)
+CACHE_SETTINGS = {
+    "search_ttl": 3600,
+    "details_ttl": 86400,
+    "pdf_ttl": 86400,
+    "excel_ttl": 3600,
+    "gemini_check_ttl": 600,
+    "max_entries": 100
+}
+
+# Gemini 모델 설정
+GEMINI_SETTINGS = {
+    "model_name": "gemini-2.0-flash-exp"
+}
+
+# 외부 API 엔드포인트 (환경변수로 로컬 대체 서버 지정 가능)
+API_ENDPOINTS = {
+    "eutils_base": os.environ.get("EUTILS_BASE_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"),
+    "gemini_endpoint": os.environ.get("GEMINI_API_ENDPOINT", "")
+}
+
+# 요청 속도 제한 (초당 요청 수, AIMD 방식으로 min~max 사이에서 자동 조절)
+RATE_LIMITS = {
+    "ncbi": {  # API 키 없음: NCBI 허용 3회/초
+        "initial_rate": 3.0,
+        "min_rate": 0.5,
+        "max_rate": 3.0,
+        "increase_step": 0.1,
+        "decrease_factor": 0.5
+    },
+    "ncbi_with_key": {  # API 키 사용: NCBI 허용 10회/초
+        "initial_rate": 5.0,
+        "min_rate": 0.5,
+        "max_rate": 10.0,
+        "increase_step": 0.2,
+        "decrease_factor": 0.5
+    },
+    "gemini": {
+        "initial_rate": 2.0,
+        "min_rate": 0.1,
+        "max_rate": 5.0,
+        "increase_step": 0.05,
+        "decrease_factor": 0.5
+    },
+    "max_retries": 4
+}
+
+# 로컬 저장소 설정 (논문 전문 검색 색인 등)
+STORE_SETTINGS = {
+    "index_path": os.environ.get("ARTICLE_INDEX_PATH", os.path.join("data", "article_index.sqlite3")),
+    "max_articles": 100000,   # 메모리 내 전체 레코드 저장소 최대 논문 수 (오래된 것부터 제거)
+    "index_max_articles": 200000,  # 로컬 전문 검색 색인 최대 논문 수 (가장 오래전에 색인한 것부터 제거)
+    "compress_level": 6,      # 초록 zlib 압축 수준
+    "table_abstract_chars": 300  # 공유 기본 테이블에 두는 초록 앞부분 글자 수 (전체는 분석/보기/내보내기 때 저장소에서)
+}
+
+# 여러 Streamlit/워커 프로세스가 공유하는 디스크 상태 저장소 (SHARED_STATE=1일 때 사용)
+STATE_SETTINGS = {
+    "enabled": os.environ.get("SHARED_STATE", "") == "1",
+    "path": os.environ.get("STATE_DB_PATH", os.path.join("data", "state.sqlite3")),
+    "busy_timeout_ms": 10000,  # 다른 프로세스가 쓰는 중일 때 기다리는 최대 시간
+    "job_lease_s": 300,        # 워커가 이 시간 동안 heartbeat를 못 보내면 작업을 다시 대기열로
+    "max_job_attempts": 3,     # 이 횟수만큼 워커가 죽은 작업은 다시 가져가지 않고 실패 처리
+    "poll_interval_s": 1.0,    # 워커의 대기열 확인 간격
+    # 작업 실행 자격 증명 - 작업 파라미터에는 저장하지 않고 워커가 팀 설정, 없으면 아래 환경 변수에서 가져옴
+    "worker_email": os.environ.get("NCBI_EMAIL", ""),
+    "worker_api_key": os.environ.get("NCBI_API_KEY", ""),
+    "worker_gemini_api_key": os.environ.get("GEMINI_API_KEY", "")
+}
+
+# 팀별 정기 문헌 모니터링 설정 (surveillance.py)
+SURVEILLANCE_SETTINGS = {
+    "schedule": os.environ.get("SURVEILLANCE_SCHEDULE", "0 2 * * *"),  # cron 형식 (분 시 일 월 요일)
+    "teams": ["RND4", "RND35"],
+    # 팀별 저장된 검색 - 사용할 PICO 구성요소와 추가 필터 (없는 팀은 P+I)
+    "searches": {
+        "RND4": [{"name": "P+I", "components": ["P", "I"], "filters": []}],
+        "RND35": [{"name": "P+I", "components": ["P", "I"], "filters": []}]
+    },
+    "ncbi_team": "RND4",            # 모든 팀이 공유할 NCBI 클라이언트의 이메일/API 키
+    "gemini_api_key": os.environ.get("GEMINI_API_KEY", ""),  # 팀 설정에 키가 없을 때 사용
+    # 다음 실행부터는 지난 실행일 이후 PubMed에 입력된 논문(edat)만 검색
+    "lookback_days": 0,             # 첫 실행(또는 검색식 변경 후) 최근 N일 입력 논문만 (0이면 전체)
+    "max_results_per_search": 5000, # 넘으면 보고서에 잘림 표시
+    "budget_window_s": 3600,        # 전체 팀 작업이 이 시간 안의 NCBI 요청 예산에 들어가도록 제한
+    "budget_utilization": 0.5,      # 예산 중 모니터링이 쓸 비율 (나머지는 화면 사용자 몫)
+    "max_screening_per_run": 500,   # 실행당 Gemini 스크리닝 최대 논문 수 (전체 팀 합계)
+    "screen_workers": 4,
+    "baseline_first_run": True,     # 첫 실행은 기존 논문을 확인한 것으로 기록만 (스크리닝 없음)
+    "report_dir": os.path.join("data", "surveillance")
+}
+
+# 트래픽 기록/재생 설정 (replay.py)
+REPLAY_SETTINGS = {
+    "eutils_upstream": "https://eutils.ncbi.nlm.nih.gov",        # 기록용 프록시가 전달할 실제 서비스
+    "gemini_upstream": "https://generativelanguage.googleapis.com",
+    "upstream_timeout_s": 120,
+    "compress_level": 6,     # 아카이브 gzip 압축 수준
+    "default_speed": 1.0     # 재생 속도 배율 (1=기록된 응답 시간, 0=지연 없음)
+}
+
+# 중복 제거 설정 (제목 MinHash/LSH)
+DEDUP_SETTINGS = {
+    "title_threshold": 0.8,  # 추정 Jaccard 유사도 기준
+    "num_perm": 128,
+    "bands": 32,             # 32 밴드 x 4 행
+    "shingle_size": 5,       # 문자 5-gram
+    "seed": 1
+}
+
+# 관련도 순위 설정 (BM25)
+RANKING_SETTINGS = {
+    "k1": 1.5,
+    "b": 0.75,
+    "title_boost": 2  # 제목 가중치 (반복 횟수)
+}
+
+# 실행 전 비용/시간 예측 설정 (가격: USD / 100만 토큰)
+PLANNER_SETTINGS = {
+    "non_ascii_tokens_per_char": 1.0,
+    "base_latency_s": 0.8,            # 호출당 기본 지연
+    "seconds_per_output_token": 0.005,
+    "tokens_per_minute": 1000000,     # 분당 토큰 한도
+    "input_price_per_1m": 0.10,
+    "output_price_per_1m": 0.40,
+    "concurrency": 4,                 # AI 분석 탭 '동시 실행'의 Gemini 호출 수 (예측과 실행에 같이 사용)
+    "batch_size": 10,
+    "output_tokens": {                # 호출당 예상 출력 토큰
+        "classic": 150,
+        "structured": 60,
+        "meddev": 3000
+    }
+}
+
+# 결과 표 설정 (서버 측 페이지 처리 - 현재 페이지만 브라우저로 전송)
+VIEWER_SETTINGS = {
+    "page_sizes": [25, 50, 100],
+    "default_columns": ['PMID', 'Title', 'Journal', 'Year', 'Select', 'Reason',
+                        'Relevance', 'Include', 'Confidence', 'Matched_PICO', 'Rationale'],
+    "hidden_columns": ['Abstract']  # 선택한 논문만 따로 표시
+}
+
+# 스캔 PDF OCR 설정 (tesseract 필요 - packages.txt)
+OCR_SETTINGS = {
+    "min_chars_per_page": 50,   # 추출 텍스트가 이보다 짧은 페이지만 OCR
+    "resolution": 300,          # 페이지 렌더링 DPI
+    "lang": "eng",
+    "max_workers": None,        # None이면 CPU 수
+    "start_method": "spawn",    # Streamlit 스레드와 분리된 작업 프로세스
+    "cache_dir": os.getenv("OCR_CACHE_DIR", os.path.join("data", "ocr_cache")),
+    "cache_max_documents": 500  # 페이지 캐시에 남길 PDF 수 (넘으면 가장 오래 안 쓴 문서부터 삭제)
+}
+
+# PDF 표 추출 설정 (MEDDEV 프롬프트 앞부분에 배치)
+PDF_TABLE_SETTINGS = {
+    "min_rows": 2,       # 머리글 포함 최소 행 수
+    "max_chars": 4000    # 프롬프트에 넣을 표 블록 최대 길이 (본문 한도 10000자에 포함)
+}
+
+# 스트리밍 파이프라인 설정 (검색 → 상세 수집 → 스크리닝을 겹쳐 실행)
+PIPELINE_SETTINGS = {
+    "queue_size": 4,         # 단계 사이 대기열 크기 (가득 차면 앞 단계가 대기)
+    "screen_workers": 4      # 동시에 진행할 Gemini 스크리닝 호출 수
+}
+
+# PMC 오픈 액세스 전문(JATS) 수집 설정
+FULLTEXT_SETTINGS = {
+    "batch_size": 20,        # efetch(db=pmc) 한 번에 받는 논문 수 (JATS는 논문당 수백 KB)
+    "max_chars": 50000,      # MEDDEV 프롬프트에 넣는 본문 최대 길이 (PDF 분석과 동일)
+    "meddev_workers": 2      # 동시에 진행할 MEDDEV Gemini 분석 수
+}
+
+# 인용/유사 논문 확장(ELink) 설정
+EXPANSION_SETTINGS = {
+    "batch_size": 200,       # ELink 한 번에 보내는 시드 PMID 수 (POST, id 파라미터 반복)
+    "concurrency": 3,        # 동시에 진행할 ELink 요청 수 (속도 조절기와 별도)
+    "max_per_seed": 20,      # 시드당 링크 최대 수 (유사 논문은 점수 순)
+    "max_new_articles": 2000,  # 한 번의 확장으로 상세 정보를 받을 최대 논문 수
+    "link_names": {
+        "pubmed_pubmed_citedin": "이 논문을 인용한 논문",
+        "pubmed_pubmed_refs": "이 논문이 인용한 논문",
+        "pubmed_pubmed": "유사 논문"
+    }
+}
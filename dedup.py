@@ -0,0 +1,167 @@
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from config import DEDUP_SETTINGS
+from metrics import span, incr
+from result_table import with_overlay
+
+# 정정/철회 공지 등 원 논문 제목 앞에 붙는 접두어
+_NOTICE_PREFIX_RE = re.compile(
+    r'^(?:\s*(?:erratum|errata|correction|corrigendum|retraction|retracted|expression of concern)'
+    r'(?:\s+(?:to|for|of|in|notice))*\s*[:\-–]?\s*)+', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^0-9a-z가-힣]+')
+
+# MinHash 해시 파라미터 (2^32보다 큰 소수)
+_PRIME = np.uint64(4294967311)
+
+def normalize_title(title):
+    """비교용 제목 정규화 - 소문자, 공지 접두어/구두점 제거"""
+    text = str(title or '').strip()
+    text = re.sub(r'^\[(.*)\]\.?$', r'\1', text)  # [번역 제목] 형식
+    text = _NOTICE_PREFIX_RE.sub('', text)
+    text = _NON_WORD_RE.sub(' ', text.lower())
+    return ' '.join(text.split())
+
+def is_notice(title):
+    """정정/철회 공지 여부"""
+    return bool(_NOTICE_PREFIX_RE.match(str(title or '')))
+
+def _shingles(text, size):
+    if len(text) <= size:
+        return np.array([zlib.crc32(text.encode('utf-8'))], dtype=np.uint64)
+    grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+def minhash_signatures(titles, num_perm, shingle_size, seed):
+    """정규화된 제목 목록의 MinHash 서명 행렬 (문서 수 x num_perm)"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(titles), num_perm), dtype=np.uint64)
+    for i, title in enumerate(titles):
+        shingles = _shingles(title, shingle_size)
+        # (shingle 수 x num_perm) 해시를 한 번에 계산해 열별 최솟값
+        signatures[i] = ((np.outer(shingles, a) + b) % _PRIME).min(axis=0)
+    return signatures
+
+def lsh_candidate_pairs(signatures, bands, docs=None):
+    """LSH 밴딩으로 유사 후보 쌍 추출
+
+    같은 밴드 버킷에 들어간 문서를 버킷의 첫 문서와 짝지어(star) 후보 수를
+    문서 수에 선형으로 유지합니다. docs로 대상 문서를 제한할 수 있습니다.
+    """
+    num_perm = signatures.shape[1]
+    rows = num_perm // bands
+    docs = range(signatures.shape[0]) if docs is None else docs
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = signatures[:, band * rows:(band + 1) * rows]
+        for doc in docs:
+            buckets[chunk[doc].tobytes()].append(doc)
+        for members in buckets.values():
+            for other in members[1:]:
+                pairs.add((members[0], other))
+    return pairs
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x, y):
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x != root_y:
+            self.parent[max(root_x, root_y)] = min(root_x, root_y)
+            return True
+        return False
+
+def _representative_score(row):
+    """대표 레코드 선택 점수 - 공지가 아니고 초록이 긴 레코드 우선"""
+    abstract = str(row.get('Abstract', '') or '')
+    has_abstract = abstract not in ('', '초록 없음')
+    return (not is_notice(row.get('Title', '')), has_abstract, len(abstract))
+
+def deduplicate(df, threshold=None):
+    """PMID/DOI 완전 일치 + 제목 MinHash/LSH 유사도로 중복 레코드 병합
+
+    (중복 제거된 DataFrame, 보고서) 반환. 대표 레코드의 'Duplicate_PMIDs'
+    컬럼에 병합된 PMID들이 기록됩니다.
+    """
+    threshold = DEDUP_SETTINGS["title_threshold"] if threshold is None else threshold
+    report = {'input': len(df), 'exact_pmid': 0, 'exact_doi': 0, 'fuzzy_title': 0, 'output': len(df)}
+    if df.empty:
+        return df, report
+
+    with span("dedup.total"):
+        base = df.reset_index(drop=True)
+        records = base.to_dict('records')
+        uf = _UnionFind(len(records))
+
+        # 1) PMID / DOI 완전 일치
+        with span("dedup.exact"):
+            for field, counter in (('PMID', 'exact_pmid'), ('DOI', 'exact_doi')):
+                first_seen = {}
+                for i, record in enumerate(records):
+                    value = str(record.get(field, '') or '').strip().lower()
+                    if not value:
+                        continue
+                    if value in first_seen:
+                        if uf.union(first_seen[value], i):
+                            report[counter] += 1
+                    else:
+                        first_seen[value] = i
+
+        # 2) 제목 MinHash + LSH 후보 → 추정 Jaccard 유사도 검증
+        with span("dedup.minhash"):
+            titles = [normalize_title(r.get('Title', '')) for r in records]
+            signatures = minhash_signatures(titles, DEDUP_SETTINGS["num_perm"],
+                                            DEDUP_SETTINGS["shingle_size"], DEDUP_SETTINGS["seed"])
+            candidates = lsh_candidate_pairs(signatures, DEDUP_SETTINGS["bands"],
+                                             docs=[i for i, title in enumerate(titles) if title])
+        with span("dedup.verify"):
+            for i, j in candidates:
+                similarity = float(np.mean(signatures[i] == signatures[j]))
+                if similarity >= threshold and uf.union(i, j):
+                    report['fuzzy_title'] += 1
+
+        # 3) 그룹별 대표 레코드 선택
+        groups = defaultdict(list)
+        for i in range(len(records)):
+            groups[uf.find(i)].append(i)
+
+        keep = []
+        duplicates = {}
+        for members in groups.values():
+            best = max(members, key=lambda i: _representative_score(records[i]))
+            keep.append(best)
+            # 이전 병합 결과의 Duplicate_PMIDs도 이어받음
+            merged = set()
+            for i in members:
+                merged.add(str(records[i].get('PMID', '') or ''))
+                previous = records[i].get('Duplicate_PMIDs', '')
+                if isinstance(previous, str) and previous:
+                    merged.update(p.strip() for p in previous.split(','))
+            merged -= {'', str(records[best].get('PMID', '') or '')}
+            duplicates[best] = ', '.join(sorted(merged))
+
+        keep.sort()
+        result = with_overlay(base.iloc[keep], Duplicate_PMIDs=[duplicates[i] for i in keep])
+        result = result.reset_index(drop=True)
+
+    report['output'] = len(result)
+    incr("dedup_removed_total", report['input'] - report['output'])
+    return result, report
+
+def merge_results(previous_df, new_df):
+    """여러 검색 결과 DataFrame 병합 (중복 제거는 deduplicate에서 수행)"""
+    if previous_df is None or previous_df.empty:
+        return new_df
+    return pd.concat([previous_df, new_df], ignore_index=True)
@@ -1,16 +1,88 @@
 import pandas as pd
 import io
+import re
 from datetime import datetime
+from config import OCR_SETTINGS, PDF_TABLE_SETTINGS
+from metrics import incr
+from ocr import ocr_available, ocr_pages
 
-def create_excel_download(df, filename_prefix="results"):
-    """DataFrame을 엑셀 파일로 변환하여 다운로드 가능한 형태로 반환"""
+def dataframe_to_excel_bytes(df):
+    """DataFrame을 엑셀 바이트로 변환"""
     excel_bytes = io.BytesIO()
     df.to_excel(excel_bytes, index=False, engine='openpyxl')
-    
+    return excel_bytes.getvalue()
+
+def create_excel_download(df, filename_prefix="results"):
+    """DataFrame을 엑셀 파일로 변환하여 다운로드 가능한 형태로 반환"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"{filename_prefix}_{timestamp}.xlsx"
     
-    return excel_bytes.getvalue(), filename
+    return dataframe_to_excel_bytes(df), filename
+
+def extract_pdf_text(pdf_bytes):
+    """PDF 바이트에서 전체 텍스트 추출 - (텍스트, 페이지 수) 반환
+
+    추출 텍스트가 거의 없는 페이지(스캔 이미지)는 tesseract가 있으면 OCR로 보완합니다.
+    """
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        page_texts = [page.extract_text() or "" for page in pdf.pages]
+    page_count = len(page_texts)
+
+    # 텍스트가 부족한 페이지만 OCR
+    min_chars = OCR_SETTINGS["min_chars_per_page"]
+    sparse_pages = [i for i, text in enumerate(page_texts) if len(text.strip()) < min_chars]
+    if sparse_pages:
+        if ocr_available():
+            for i, text in ocr_pages(pdf_bytes, sparse_pages).items():
+                if len(text.strip()) > len(page_texts[i].strip()):
+                    page_texts[i] = text
+        else:
+            incr("ocr_unavailable_total")
+
+    pdf_text = "".join(text + "\n" for text in page_texts if text)
+    return pdf_text, page_count
+
+def _clean_cell(cell):
+    return re.sub(r"\s+", " ", str(cell or "")).strip().replace("|", "/")
+
+def extract_pdf_tables(pdf_bytes):
+    """pdfplumber 표 탐지로 PDF 표 추출 - [(페이지 번호, 행 목록)] 반환
+
+    셀의 줄바꿈/공백을 정리하고 빈 행과 빈 열은 제거합니다.
+    """
+    import pdfplumber
+
+    tables = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page_no, page in enumerate(pdf.pages, 1):
+            for table in page.extract_tables():
+                rows = [[_clean_cell(cell) for cell in row] for row in table]
+                rows = [row for row in rows if any(row)]
+                if len(rows) < PDF_TABLE_SETTINGS["min_rows"]:
+                    continue
+                keep = [j for j in range(max(len(row) for row in rows)) if any(j < len(row) and row[j] for row in rows)]
+                rows = [[row[j] if j < len(row) else "" for j in keep] for row in rows]
+                tables.append((page_no, rows))
+    return tables
+
+def tables_to_markdown(tables, max_chars=None):
+    """추출한 표를 간결한 Markdown 표 블록으로 변환 (max_chars를 넘는 표는 제외)"""
+    max_chars = PDF_TABLE_SETTINGS["max_chars"] if max_chars is None else max_chars
+    blocks = []
+    used = 0
+    for i, (page_no, rows) in enumerate(tables, 1):
+        # PDF 표는 페이지 번호, JATS 표는 라벨 문자열
+        location = f"p.{page_no}" if isinstance(page_no, int) else page_no
+        lines = [f"[표 {i} - {location}]", "|" + "|".join(rows[0]) + "|", "|" + "---|" * len(rows[0])]
+        lines += ["|" + "|".join(row) + "|" for row in rows[1:]]
+        block = "\n".join(lines)
+        if used + len(block) > max_chars:
+            continue  # 큰 표 하나 때문에 뒤의 작은 표까지 버리지 않음
+        blocks.append(block)
+        used += len(block) + 2
+    return "\n\n".join(blocks)
 
 def create_markdown_download(content, filename_prefix="analysis"):
     """텍스트 내용을 마크다운 파일로 변환하여 다운로드 가능한 형태로 반환"""
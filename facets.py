@@ -0,0 +1,97 @@
+import numpy as np
+from metrics import span, incr
+from records import article_store
+
+# 로컬에서 적용하는 필터 그룹 (그룹 안은 OR, 그룹 사이는 AND - PubMed 웹과 동일)
+LOCAL_FACET_GROUPS = ('article_type_filters', 'species', 'sex', 'age')
+
+# (그룹, 옵션) → ('pubtype' | 'mesh', UI 번호 목록)
+FACET_TERMS = {
+    ('article_type_filters', 'clinical_trial'): ('pubtype', (16430, 17426, 17427, 17428, 17429, 18848, 16449)),
+    ('article_type_filters', 'meta_analysis'): ('pubtype', (17418,)),
+    ('article_type_filters', 'rct'): ('pubtype', (16449,)),
+    ('article_type_filters', 'review'): ('pubtype', (16454, 78182, 17418)),
+    ('article_type_filters', 'systematic_review'): ('pubtype', (78182,)),
+    ('species', 'humans'): ('mesh', (6801,)),
+    ('species', 'other_animals'): ('mesh', (818,)),
+    ('sex', 'female'): ('mesh', (5260,)),
+    ('sex', 'male'): ('mesh', (8297,)),
+    ('age', 'child'): ('mesh', (7231, 7223, 2675, 2648, 293)),
+    ('age', 'adult'): ('mesh', (55815, 328, 8875, 368, 369)),
+    ('age', 'aged'): ('mesh', (368, 369)),
+}
+
+FACET_LABELS = {
+    ('article_type_filters', 'clinical_trial'): "Clinical Trial",
+    ('article_type_filters', 'meta_analysis'): "Meta-Analysis",
+    ('article_type_filters', 'rct'): "RCT",
+    ('article_type_filters', 'review'): "Review",
+    ('article_type_filters', 'systematic_review'): "Systematic Review",
+    ('species', 'humans'): "Humans",
+    ('species', 'other_animals'): "Other Animals",
+    ('sex', 'female'): "Female",
+    ('sex', 'male'): "Male",
+    ('age', 'child'): "Child",
+    ('age', 'adult'): "Adult",
+    ('age', 'aged'): "Aged",
+}
+
+def build_facet_index(pmids):
+    """행 순서(PMID 목록)대로 필터별 비트맵(bool 배열) 생성
+
+    논문 저장소의 MeSH/출판 유형 ID로 역색인을 만든 뒤 필터마다 한 번씩 OR합니다.
+    저장소에 없는 PMID는 어떤 필터에도 해당하지 않는 것으로 처리됩니다.
+    """
+    with span("facets.build"):
+        n_rows = len(pmids)
+        articles = {a.pmid: a for a in article_store.get_many(pmids)}
+        postings = {'mesh': {}, 'pubtype': {}}
+        for row, pmid in enumerate(pmids):
+            article = articles.get(pmid)
+            if article is None:
+                continue
+            for term_id in article.mesh_ids:
+                postings['mesh'].setdefault(term_id, []).append(row)
+            for term_id in article.pubtype_ids:
+                postings['pubtype'].setdefault(term_id, []).append(row)
+
+        masks = {}
+        for facet, (kind, term_ids) in FACET_TERMS.items():
+            mask = np.zeros(n_rows, dtype=bool)
+            for term_id in term_ids:
+                mask[postings[kind].get(term_id, [])] = True
+            masks[facet] = mask
+        # Other Animals = 동물 연구 중 사람 대상이 아닌 것 (PubMed 정의)
+        masks[('species', 'other_animals')] &= ~masks[('species', 'humans')]
+
+    incr("facet_index_builds_total")
+    return {'size': n_rows, 'masks': masks, 'missing': n_rows - sum(p in articles for p in pmids)}
+
+def selected_facets(filter_options):
+    """필터 옵션 중 로컬 적용 대상으로 선택된 (그룹, 옵션) 목록"""
+    return tuple(facet for facet in FACET_TERMS if filter_options.get(facet[0], {}).get(facet[1]))
+
+def _group_mask(index, selection, group):
+    masks = [index['masks'][facet] for facet in selection if facet[0] == group]
+    return np.logical_or.reduce(masks) if masks else None
+
+def facet_mask(index, selection, exclude_group=None):
+    """선택된 필터를 적용한 행 bool 배열 (exclude_group은 계산에서 제외)"""
+    mask = np.ones(index['size'], dtype=bool)
+    for group in LOCAL_FACET_GROUPS:
+        if group == exclude_group:
+            continue
+        group_mask = _group_mask(index, selection, group)
+        if group_mask is not None:
+            mask &= group_mask
+    return mask
+
+def facet_counts(index, selection):
+    """필터별 논문 수 - 다른 그룹의 선택은 적용한 상태에서 해당 필터를 켰을 때의 수"""
+    counts = {}
+    for group in LOCAL_FACET_GROUPS:
+        others = facet_mask(index, selection, exclude_group=group)
+        for facet in FACET_TERMS:
+            if facet[0] == group:
+                counts[facet] = int(np.count_nonzero(index['masks'][facet] & others))
+    return counts
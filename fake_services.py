@@ -0,0 +1,555 @@
+"""NCBI E-utilities / Gemini 로컬 대체 서버 (벤치마크·오프라인 테스트용)
+
+네트워크 없이 pubmed_api.py, analysis.py 흐름을 재현하기 위한 가짜 서버입니다.
+각 서버는 지연시간, 초당 요청 제한, 오류 주입을 설정할 수 있고
+엔드포인트별 요청 수를 집계합니다.
+
+    python fake_services.py --eutils-port 8801 --gemini-port 8802
+    EUTILS_BASE_URL=http://127.0.0.1:8801/entrez/eutils \\
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8802 streamlit run main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+# 기본 서버 설정
+DEFAULT_PROFILE = {
+    "latency": 0.05,      # 요청당 기본 지연 (초)
+    "jitter": 0.02,       # 지연 편차 (초)
+    "rate_limit": 10,     # 키(api_key 또는 IP)별 초당 허용 요청 수, 0이면 무제한
+    "error_rate": 0.0,    # 5xx 오류 주입 비율 (0~1)
+    "retry_after": 1,     # 429 응답의 Retry-After (초)
+    "seed": 0
+}
+
+# 가짜 논문 생성용 어휘
+_DEVICES = ["Melody", "SAPIEN", "Harmony", "Alterra", "transcatheter pulmonary valve",
+            "percutaneous pulmonary valve", "Venus P-valve", "homograft conduit"]
+_TOPICS = ["right ventricular outflow tract dysfunction", "tetralogy of Fallot",
+           "pulmonary regurgitation", "stent fracture", "infective endocarditis",
+           "freedom from reintervention", "hemodynamic function", "NYHA functional class"]
+_DESIGNS = ["a multicenter prospective study", "a randomized controlled trial",
+            "a retrospective cohort", "a systematic review and meta-analysis",
+            "a single-center experience", "long-term follow-up of a registry"]
+_JOURNALS = ["JACC. Cardiovascular interventions", "Circulation. Cardiovascular interventions",
+             "Catheterization and cardiovascular interventions", "EuroIntervention",
+             "The Annals of thoracic surgery", "Pediatric cardiology"]
+_LASTNAMES = ["Kim", "Lee", "Park", "McElhinney", "Bonhoeffer", "Cabalka", "Zahn",
+              "Kenny", "Hascoet", "Jones", "Armstrong", "Chatterjee", "Ewert", "Sinha"]
+_FORENAMES = ["Doff B", "Philipp", "Allison K", "Evan M", "Damien", "Sebastien",
+              "Thomas K", "Aimee K", "Peter", "Jiwon", "Minsoo", "Hyunwoo"]
+_PUBTYPES = ["Journal Article", "Clinical Trial", "Randomized Controlled Trial",
+             "Multicenter Study", "Review", "Systematic Review", "Meta-Analysis",
+             "Comparative Study"]
+_PUBTYPE_UIS = {"Journal Article": "D016428", "Clinical Trial": "D016430",
+                "Randomized Controlled Trial": "D016449", "Multicenter Study": "D016448",
+                "Review": "D016454", "Systematic Review": "D000078182", "Meta-Analysis": "D017418",
+                "Comparative Study": "D003160"}
+_MESH = [("D011664", "Pulmonary Valve"), ("D011665", "Pulmonary Valve Insufficiency"),
+         ("D013771", "Tetralogy of Fallot"), ("D006350", "Heart Valve Prosthesis"),
+         ("D019917", "Heart Valve Prosthesis Implantation"), ("D006801", "Humans"),
+         ("D002648", "Child"), ("D000328", "Adult"), ("D005260", "Female"),
+         ("D008297", "Male"), ("D000818", "Animals"), ("D016896", "Treatment Outcome"),
+         ("D062645", "Transcatheter Aortic Valve Replacement"), ("D004697", "Endocarditis, Bacterial"),
+         ("D000368", "Aged"), ("D000293", "Adolescent"), ("D007223", "Infant"), ("D008875", "Middle Aged")]
+
+
+def _rng_for(*parts):
+    """입력값으로부터 결정적인 난수 생성기 생성"""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def fake_article(pmid):
+    """PMID로부터 결정적인 가짜 논문 레코드 생성"""
+    rng = _rng_for("article", pmid)
+    device = rng.choice(_DEVICES)
+    topic = rng.choice(_TOPICS)
+    design = rng.choice(_DESIGNS)
+    n_patients = rng.randint(12, 900)
+    follow_up = rng.randint(1, 12)
+    authors = [(rng.choice(_LASTNAMES), rng.choice(_FORENAMES), f"Department of Cardiology, Hospital {rng.randint(1, 40)}")
+               for _ in range(rng.randint(1, 12))]
+    pubtypes = ["Journal Article"] + rng.sample(_PUBTYPES[1:], rng.randint(0, 2))
+    mesh = rng.sample(_MESH, rng.randint(3, 7))
+    return {
+        "pmid": str(pmid),
+        "title": f"{device} for {topic}: {design}",
+        "abstract": [
+            ("BACKGROUND", f"Outcomes of {device} in patients with {topic} remain incompletely characterized."),
+            ("METHODS", f"We report {design} including {n_patients} patients followed for a median of {follow_up} years."),
+            ("RESULTS", f"Procedural success was {rng.randint(85, 100)}%, with {rng.randint(0, 15)}% {topic} "
+                        f"and freedom from reintervention of {rng.randint(60, 98)}% at {follow_up} years."),
+            ("CONCLUSIONS", f"{device} provided durable hemodynamic function with acceptable safety."),
+        ],
+        "journal": rng.choice(_JOURNALS),
+        "year": str(rng.randint(2005, 2025)),
+        "doi": f"10.{rng.randint(1000, 9999)}/fake.{pmid}",
+        "pmc": f"PMC{int(pmid) + 1000000}" if rng.random() < 0.4 else "",
+        "authors": authors,
+        "pubtypes": pubtypes,
+        "mesh": mesh,
+    }
+
+
+def article_xml(pmid):
+    """PubmedArticle XML 조각 생성"""
+    a = fake_article(pmid)
+    abstract = "".join(f'<AbstractText Label="{label}">{escape(text)}</AbstractText>' for label, text in a["abstract"])
+    authors = "".join(
+        f'<Author ValidYN="Y"><LastName>{escape(last)}</LastName><ForeName>{escape(fore)}</ForeName>'
+        f'<AffiliationInfo><Affiliation>{escape(aff)}</Affiliation></AffiliationInfo></Author>'
+        for last, fore, aff in a["authors"])
+    pubtypes = "".join(f'<PublicationType UI="{_PUBTYPE_UIS[p]}">{escape(p)}</PublicationType>'
+                       for p in a["pubtypes"])
+    mesh = "".join(f'<MeshHeading><DescriptorName UI="{ui}" MajorTopicYN="N">{escape(name)}</DescriptorName></MeshHeading>'
+                   for ui, name in a["mesh"])
+    pmc = f'<ArticleId IdType="pmc">{a["pmc"]}</ArticleId>' if a["pmc"] else ""
+    return (
+        f'<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+        f'<PMID Version="1">{a["pmid"]}</PMID>'
+        f'<DateCompleted><Year>{a["year"]}</Year><Month>06</Month><Day>01</Day></DateCompleted>'
+        f'<Article PubModel="Print"><Journal><JournalIssue CitedMedium="Internet">'
+        f'<PubDate><Year>{a["year"]}</Year><Month>Jan</Month></PubDate></JournalIssue>'
+        f'<Title>{escape(a["journal"])}</Title></Journal>'
+        f'<ArticleTitle>{escape(a["title"])}</ArticleTitle>'
+        f'<Abstract>{abstract}</Abstract>'
+        f'<AuthorList CompleteYN="Y">{authors}</AuthorList>'
+        f'<Language>eng</Language><PublicationTypeList>{pubtypes}</PublicationTypeList></Article>'
+        f'<MedlineJournalInfo><MedlineTA>{escape(a["journal"])}</MedlineTA></MedlineJournalInfo>'
+        f'<MeshHeadingList>{mesh}</MeshHeadingList></MedlineCitation>'
+        f'<PubmedData><ArticleIdList><ArticleId IdType="pubmed">{a["pmid"]}</ArticleId>'
+        f'<ArticleId IdType="doi">{escape(a["doi"])}</ArticleId>{pmc}</ArticleIdList></PubmedData>'
+        f'</PubmedArticle>'
+    )
+
+
+def pmc_article_xml(pmc_number):
+    """PMC JATS <article> 조각 생성 (오픈 액세스가 아니면 본문 없이 front만, PMC에 없으면 빈 문자열)"""
+    pmid = str(int(pmc_number) - 1000000)
+    a = fake_article(pmid)
+    if a["pmc"] != f"PMC{pmc_number}":
+        return ""
+    front = (f'<front><article-meta><article-id pub-id-type="pmid">{pmid}</article-id>'
+             f'<article-id pub-id-type="pmc">{a["pmc"]}</article-id>'
+             f'<title-group><article-title>{escape(a["title"])}</article-title></title-group>'
+             f'<abstract>' + "".join(f'<sec><title>{label.title()}</title><p>{escape(text)}</p></sec>'
+                                    for label, text in a["abstract"]) + '</abstract></article-meta></front>')
+    if _rng_for("pmc_oa", pmid).random() >= 0.75:
+        return f'<article article-type="research-article">{front}</article>'
+    rng = _rng_for("pmc_body", pmid)
+    rows = "".join(f'<tr><td>{escape(name)}</td><td>{rng.randint(1, 99)}%</td><td>{rng.randint(1, 60)} months</td></tr>'
+                   for name in ("Procedural success", "Freedom from reintervention", "Stent fracture", "Endocarditis"))
+    paragraphs = {section: f"<p>{escape(text)} See prior work<xref ref-type=\"bibr\" rid=\"r1\">1</xref>.</p>"
+                  for section, (_, text) in zip(("Introduction", "Methods", "Results", "Discussion"), a["abstract"])}
+    table = (f'<table-wrap id="t1"><label>Table 1</label><caption><p>Outcomes</p></caption><table>'
+             f'<thead><tr><th>Outcome</th><th>Rate</th><th>Follow-up</th></tr></thead><tbody>{rows}</tbody>'
+             f'</table></table-wrap>')
+    body = "".join(f'<sec><title>{name}</title>{paragraph}{table if name == "Results" else ""}</sec>'
+                   for name, paragraph in paragraphs.items())
+    return (f'<article article-type="research-article">{front}<body>{body}</body>'
+            f'<back><ref-list><ref id="r1"><mixed-citation>Prior study.</mixed-citation></ref></ref-list></back></article>')
+
+
+def links_for(pmid, link_name):
+    """PMID와 링크 종류로부터 결정적인 링크 PMID 목록 생성 (인용은 이후, 참고문헌은 이전 PMID)"""
+    rng = _rng_for("elink", link_name, pmid)
+    base = int(pmid)
+    if link_name == "pubmed_pubmed_citedin":
+        return [str(base + rng.randint(1, 3000000)) for _ in range(rng.randint(0, 15))]
+    if link_name == "pubmed_pubmed_refs":
+        return [str(max(1, base - rng.randint(1, 8000000))) for _ in range(rng.randint(0, 40))]
+    return [str(base + rng.randint(-2000000, 2000000)) for _ in range(rng.randint(20, 60))]
+
+
+def ids_for_term(term, corpus_size):
+    """검색어로부터 결정적인 PMID 목록 생성 (검색어마다 결과 수가 다름)"""
+    rng = _rng_for("term", term)
+    count = rng.randint(corpus_size // 2, corpus_size) if corpus_size else 0
+    start = 20000000 + rng.randint(0, 5000000)
+    step = rng.randint(1, 7)
+    return [str(start + i * step) for i in range(count)]
+
+
+class FakeServiceServer(ThreadingHTTPServer):
+    """지연/요청 제한/오류 주입과 요청 통계를 공통으로 갖는 서버"""
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, profile=None):
+        super().__init__(address, handler_class)
+        self.profile = {**DEFAULT_PROFILE, **(profile or {})}
+        self.rng = random.Random(self.profile["seed"])
+        self.lock = threading.Lock()
+        self.windows = defaultdict(deque)
+        self.stats = Counter()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, key):
+        """요청 제한/오류 주입 판정 - (상태코드 또는 None) 반환"""
+        with self.lock:
+            now = time.monotonic()
+            limit = self.profile["rate_limit"]
+            if limit:
+                window = self.windows[key]
+                while window and now - window[0] >= 1.0:
+                    window.popleft()
+                if len(window) >= limit:
+                    self.stats["throttled"] += 1
+                    return 429
+                window.append(now)
+            if self.profile["error_rate"] and self.rng.random() < self.profile["error_rate"]:
+                self.stats["errors"] += 1
+                return self.rng.choice([500, 502, 503])
+            delay = self.profile["latency"] + self.rng.uniform(0, self.profile["jitter"])
+        if delay > 0:
+            time.sleep(delay)
+        return None
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
+
+
+class _BaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type, headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # 클라이언트가 요청을 취소함
+        with self.server.lock:
+            self.server.stats["bytes_sent"] += len(data)
+
+
+class EutilsHandler(_BaseHandler):
+    """esearch / efetch (history server 포함) 대체 핸들러"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self._handle(url.path, {k: v[-1] for k, v in query.items()}, query.get("id", []))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        url = urlparse(self.path)
+        query, form = parse_qs(url.query), parse_qs(body)
+        params = {k: v[-1] for k, v in query.items()}
+        params.update({k: v[-1] for k, v in form.items()})
+        self._handle(url.path, params, query.get("id", []) + form.get("id", []))
+
+    def _handle(self, path, params, id_params=()):
+        endpoint = path.rsplit("/", 1)[-1]
+        server = self.server
+        with server.lock:
+            server.stats[f"requests:{endpoint}"] += 1
+            server.stats["requests"] += 1
+        status = server.admit(params.get("api_key") or self.client_address[0])
+        if status == 429:
+            self._send(429, '{"error":"API rate limit exceeded","api-key":"","count":"","limit":""}',
+                       "application/json", {"Retry-After": str(server.profile["retry_after"])})
+            return
+        if status:
+            self._send(status, "<html><body>Service unavailable</body></html>", "text/html")
+            return
+        if endpoint == "esearch.fcgi":
+            self._esearch(params)
+        elif endpoint == "efetch.fcgi":
+            self._efetch(params)
+        elif endpoint == "elink.fcgi":
+            self._elink(params, id_params)
+        else:
+            self._send(404, "<eSearchResult><ERROR>Unknown endpoint</ERROR></eSearchResult>", "text/xml")
+
+    def _esearch(self, params):
+        server = self.server
+        term = params.get("term", "")
+        ids = ids_for_term(term, server.corpus_size) if term.strip() else []
+        retstart = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        history = ""
+        if params.get("usehistory") == "y":
+            with server.lock:
+                webenv = f"MCID_{len(server.history) + 1:08d}"
+                server.history[webenv] = ids
+            history = f"<QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv>"
+        page = ids[retstart:retstart + retmax]
+        id_list = "".join(f"<Id>{pmid}</Id>" for pmid in page)
+        body = (f'<?xml version="1.0" encoding="UTF-8" ?>\n<eSearchResult>'
+                f"<Count>{len(ids)}</Count><RetMax>{len(page)}</RetMax><RetStart>{retstart}</RetStart>"
+                f"{history}<IdList>{id_list}</IdList>"
+                f"<QueryTranslation>{escape(term)}</QueryTranslation></eSearchResult>")
+        self._send(200, body, "text/xml; charset=UTF-8")
+
+    def _efetch(self, params):
+        server = self.server
+        if params.get("id"):
+            ids = [i for i in params["id"].split(",") if i.strip()]
+        elif params.get("WebEnv"):
+            ids = server.history.get(params["WebEnv"], [])
+            retstart = int(params.get("retstart", 0))
+            ids = ids[retstart:retstart + int(params.get("retmax", 20))]
+        else:
+            self._send(400, "<eFetchResult><ERROR>Empty id list</ERROR></eFetchResult>", "text/xml")
+            return
+        if params.get("db") == "pmc":
+            body = ('<?xml version="1.0" ?>\n<!DOCTYPE pmc-articleset>\n<pmc-articleset>'
+                    + "".join(pmc_article_xml(i.removeprefix("PMC")) for i in ids if i.removeprefix("PMC").isdigit())
+                    + "</pmc-articleset>")
+            self._send(200, body, "text/xml; charset=UTF-8")
+            return
+        body = ('<?xml version="1.0" ?>\n<!DOCTYPE PubmedArticleSet>\n<PubmedArticleSet>'
+                + "".join(article_xml(pmid) for pmid in ids if pmid.isdigit())
+                + "</PubmedArticleSet>")
+        self._send(200, body, "text/xml; charset=UTF-8")
+
+    def _elink(self, params, id_params):
+        # id 파라미터 반복 → 시드별 LinkSet, 쉼표로 합친 id → LinkSet 하나
+        link_name = params.get("linkname", "pubmed_pubmed")
+        groups = [[i for i in value.split(",") if i.isdigit()] for value in id_params]
+        groups = [g for g in groups if g]
+        if not groups:
+            self._send(400, "<eLinkResult><ERROR>Empty id list</ERROR></eLinkResult>", "text/xml")
+            return
+        link_sets = []
+        for group in groups:
+            linked = []
+            for pmid in group:
+                linked.extend(p for p in links_for(pmid, link_name) if p not in linked)
+            links = "".join(f"<Link><Id>{p}</Id></Link>" for p in linked)
+            ids = "".join(f"<Id>{p}</Id>" for p in group)
+            link_db = (f"<LinkSetDb><DbTo>pubmed</DbTo><LinkName>{escape(link_name)}</LinkName>{links}</LinkSetDb>"
+                       if linked else "")
+            link_sets.append(f"<LinkSet><DbFrom>pubmed</DbFrom><IdList>{ids}</IdList>{link_db}</LinkSet>")
+        body = ('<?xml version="1.0" encoding="UTF-8" ?>\n<eLinkResult>' + "".join(link_sets) + "</eLinkResult>")
+        self._send(200, body, "text/xml; charset=UTF-8")
+
+# MEDDEV 프롬프트에 대한 가짜 응답
+_MEDDEV_RESPONSE = """## 논문 정보
+Title: Transcatheter pulmonary valve implantation: a multicenter prospective study
+Authors: Kim Jiwon, Lee Minsoo
+Journal: EuroIntervention
+Publication Year: 2021
+Study Type: Prospective multicenter study
+
+## 기기 정보
+Device Name: {product}
+Company: Medtronic
+
+## STEP 2: Methodological Appraisal
+METHODOLOGICAL_TABLE_START
+| Aspects covered | Weight | Remarks |
+|-----------------|--------|---------|
+| Information on elementary aspects | Adequate (2) | Population and device described |
+| Patients number | High (2) | 150 patients |
+| Statistical method(s) | Adequate (2) | Kaplan-Meier analysis |
+| Adequate controls | Non adequate (1) | Single arm |
+| Collection of mortality and serious adverse events data | Adequate (2) | Reported |
+| Interpretation of the authors | Good (1) | Consistent with data |
+| Study legality | Legal (1) | IRB approved |
+| Total | 11 (Excellent) | Excellent |
+METHODOLOGICAL_TABLE_END
+
+## STEP 3: Relevance Appraisal (Suitability)
+RELEVANCE_SUITABILITY_TABLE_START
+| Suitability Criteria: Description | Weight | Description |
+|-----------------------------------|--------|-------------|
+| Appropriate Device | 2 | Actual device |
+| Appropriate device application | 3 | Same use |
+| Appropriate patient group | 3 | Applicable |
+| Acceptable report/data collation | 3 | High quality |
+RELEVANCE_SUITABILITY_TABLE_END
+
+## STEP 4: Contribution Appraisal
+CONTRIBUTION_TABLE_START
+| Contribution Criteria: Description | Weight | Remarks |
+|------------------------------------|--------|---------|
+| Data source type | Yes (2) | Appropriate design |
+| Outcome measures | Yes (2) | Hemodynamic outcomes |
+| Follow up | Yes (2) | 5 years |
+| Statistical significance | Yes (2) | Provided |
+| Clinical significance | Yes (2) | Significant |
+CONTRIBUTION_TABLE_END
+
+## STEP 5: Overall Assessment
+OVERALL_TABLE_START
+| Appraisal Summary | Weight | Results | Overall appraisal |
+|-------------------|--------|---------|------------------|
+| Methodological | 11 / 12 | Excellent | |
+| Relevance | 11 / 11 | Excellent | 32 / 33 |
+| Contribution | 10 / 10 | Excellent | |
+OVERALL_TABLE_END
+
+## 결론
+The study supports the safety and performance of the device.
+"""
+
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 추정 (4글자당 1토큰)"""
+    return max(1, len(text) // 4)
+
+
+class GeminiHandler(_BaseHandler):
+    """generateContent / countTokens / cachedContents(컨텍스트 캐시) REST 대체 핸들러"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        url = urlparse(self.path)
+        method = url.path.rsplit(":", 1)[-1]
+        server = self.server
+        with server.lock:
+            server.stats[f"requests:{method}"] += 1
+            server.stats["requests"] += 1
+        key = self.headers.get("x-goog-api-key") or parse_qs(url.query).get("key", [""])[0] or self.client_address[0]
+        status = server.admit(key)
+        if status == 429:
+            self._send(429, json.dumps({"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                                  "status": "RESOURCE_EXHAUSTED",
+                                                  "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                                               "retryDelay": f"{server.profile['retry_after']}s"}]}}),
+                       "application/json", {"Retry-After": str(server.profile["retry_after"])})
+            return
+        if status:
+            self._send(status, json.dumps({"error": {"code": status, "message": "Internal error", "status": "INTERNAL"}}),
+                       "application/json")
+            return
+
+        prompt = "".join(part.get("text", "") for content in payload.get("contents", [])
+                         for part in content.get("parts", []))
+        if url.path.endswith("/cachedContents"):
+            self._create_cache(payload, prompt)
+            return
+        # 컨텍스트 캐시를 쓰면 캐시된 앞부분 + 새 contents가 실제 프롬프트
+        cached = server.cached_contents.get(payload.get("cachedContent", ""), "")
+        if method == "countTokens":
+            self._send(200, json.dumps({"totalTokens": estimate_tokens(prompt)}), "application/json")
+            return
+        if method != "generateContent":
+            self._send(404, json.dumps({"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}}),
+                       "application/json")
+            return
+
+        text = self.respond(cached + prompt, payload.get("generationConfig", {}))
+        # 캐시되지 않은 입력 토큰 / 출력 토큰 수에 비례한 지연
+        new_tokens = estimate_tokens(prompt)
+        cached_tokens = estimate_tokens(cached) if cached else 0
+        time.sleep(server.profile.get("per_input_token", 0.0) * new_tokens
+                   + server.profile.get("per_output_token", 0.0) * estimate_tokens(text))
+        with server.lock:
+            server.stats["prompt_tokens"] += new_tokens
+            server.stats["cached_tokens"] += cached_tokens
+            server.stats["output_tokens"] += estimate_tokens(text)
+        usage = {"promptTokenCount": new_tokens + cached_tokens,
+                 "candidatesTokenCount": estimate_tokens(text),
+                 "totalTokenCount": new_tokens + cached_tokens + estimate_tokens(text)}
+        if cached_tokens:
+            usage["cachedContentTokenCount"] = cached_tokens
+        body = {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": usage,
+            "modelVersion": url.path.split("/")[-1].split(":")[0]
+        }
+        self._send(200, json.dumps(body, ensure_ascii=False), "application/json; charset=UTF-8")
+
+    def _create_cache(self, payload, prompt):
+        server = self.server
+        tokens = estimate_tokens(prompt)
+        if tokens < server.profile["cache_min_tokens"]:
+            self._send(400, json.dumps({"error": {"code": 400, "status": "INVALID_ARGUMENT",
+                                                  "message": f"Cached content is too small. total_token_count={tokens}, "
+                                                             f"min_total_token_count={server.profile['cache_min_tokens']}"}}),
+                       "application/json")
+            return
+        with server.lock:
+            name = f"cachedContents/fake{len(server.cached_contents) + 1:06d}"
+            server.cached_contents[name] = prompt
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        body = {"name": name, "model": payload.get("model", ""), "createTime": now, "updateTime": now,
+                "expireTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600)),
+                "usageMetadata": {"totalTokenCount": tokens}}
+        self._send(200, json.dumps(body), "application/json")
+
+    def respond(self, prompt, generation_config):
+        """프롬프트 종류에 따른 가짜 응답 텍스트"""
+        if generation_config.get("responseMimeType") == "application/json":
+            rng = _rng_for("screening", prompt)
+            include = rng.random() < 0.6
+            return json.dumps({
+                "include": include,
+                "confidence": round(rng.uniform(0.5, 0.99), 2),
+                "matched_pico": sorted(rng.sample(["P", "I", "C", "O"], rng.randint(1, 4) if include else rng.randint(0, 1))),
+                "rationale": "Reports TPV outcomes in RVOT dysfunction." if include else "Different device/population."
+            })
+        if "METHODOLOGICAL_TABLE_START" in prompt:
+            return _MEDDEV_RESPONSE.replace("{product}", "Transcatheter Pulmonary Valve")
+        return "제목과 초록에서 해당 기기의 시술 성공률과 재중재 회피율을 보고하고 있어 관련 있음."
+
+
+def start_eutils_server(port=0, host="127.0.0.1", profile=None, corpus_size=2000):
+    """E-utilities 대체 서버를 백그라운드 스레드로 시작"""
+    server = FakeServiceServer((host, port), EutilsHandler, profile)
+    server.corpus_size = corpus_size
+    server.history = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_gemini_server(port=0, host="127.0.0.1", profile=None):
+    """Gemini REST 대체 서버를 백그라운드 스레드로 시작"""
+    profile = {"per_output_token": 0.0, "per_input_token": 0.0, "cache_min_tokens": 4096, **(profile or {})}
+    server = FakeServiceServer((host, port), GeminiHandler, profile)
+    server.cached_contents = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NCBI E-utilities / Gemini 로컬 대체 서버")
+    parser.add_argument("--eutils-port", type=int, default=8801)
+    parser.add_argument("--gemini-port", type=int, default=8802)
+    parser.add_argument("--latency", type=float, default=DEFAULT_PROFILE["latency"])
+    parser.add_argument("--rate-limit", type=int, default=DEFAULT_PROFILE["rate_limit"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_PROFILE["error_rate"])
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    profile = {"latency": args.latency, "rate_limit": args.rate_limit, "error_rate": args.error_rate}
+    eutils = start_eutils_server(args.eutils_port, profile=profile, corpus_size=args.corpus_size)
+    gemini = start_gemini_server(args.gemini_port, profile=profile)
+    print(f"EUTILS_BASE_URL={eutils.base_url}/entrez/eutils")
+    print(f"GEMINI_API_ENDPOINT={gemini.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        eutils.shutdown()
+        gemini.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""PMC 오픈 액세스 전문(JATS XML) 수집
+
+선별된 PMID의 PMCID를 논문 저장소(efetch 결과)에서 찾고, efetch(db=pmc)로 JATS XML을
+묶음 단위로 동시에 받아 섹션 구조 텍스트와 표로 변환합니다. PDF 추출(pdfplumber)이
+필요 없으며, 오픈 액세스가 아닌 논문은 본문이 없어 제외됩니다.
+"""
+from config import PDF_TABLE_SETTINGS
+from metrics import span, incr
+from records import article_store
+
+# 본문 텍스트에서 제외하는 JATS 요소 (표/그림은 따로 처리)
+_SKIP_TAGS = {'table-wrap', 'fig', 'xref', 'ref-list', 'supplementary-material'}
+
+def _text(elem):
+    return ' '.join(''.join(elem.itertext()).split()) if elem is not None else ''
+
+def _plain_text(elem):
+    """표/그림/인용 번호를 뺀 요소 텍스트"""
+    parts = [elem.text or '']
+    for child in elem:
+        if child.tag not in _SKIP_TAGS:
+            parts.append(_plain_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+def _paragraphs(sec):
+    """섹션 바로 아래 문단 텍스트"""
+    parts = []
+    for child in sec:
+        if child.tag in ('p', 'list', 'disp-quote'):
+            text = ' '.join(_plain_text(child).split())
+            if text:
+                parts.append(text)
+    return parts
+
+def _sections(parent, level=2):
+    """<sec> 트리를 Markdown 제목/문단 목록으로 변환"""
+    lines = []
+    lines.extend(_paragraphs(parent))
+    for sec in parent.findall('sec'):
+        title = _text(sec.find('title'))
+        if title:
+            lines.append(f"{'#' * min(level, 6)} {title}")
+        lines.extend(_sections(sec, level + 1))
+    return lines
+
+def _tables(body):
+    """<table-wrap>을 [(라벨, 행 목록)]으로 변환"""
+    tables = []
+    for i, wrap in enumerate(body.iter('table-wrap'), 1):
+        rows = []
+        for tr in wrap.iter('tr'):
+            cells = [_text(cell).replace('|', '/') for cell in tr if cell.tag in ('th', 'td')]
+            if any(cells):
+                rows.append(cells)
+        if len(rows) < PDF_TABLE_SETTINGS["min_rows"]:
+            continue
+        width = max(len(row) for row in rows)
+        rows = [row + [''] * (width - len(row)) for row in rows]
+        label = _text(wrap.find('label')) or f"Table {i}"
+        caption = _text(wrap.find('caption'))
+        tables.append((f"{label} {caption}".strip(), rows))
+    return tables
+
+def parse_jats(article):
+    """JATS <article> 요소 → 전문 dict (본문이 없으면 None)
+
+    {'pmcid', 'pmid', 'title', 'text', 'tables'} - text는 '## 섹션' 형식의 Markdown,
+    tables는 [(라벨, 행 목록)]입니다.
+    """
+    meta = article.find('front/article-meta')
+    body = article.find('body')
+    if meta is None or body is None or not len(body):
+        return None
+
+    ids = {e.get('pub-id-type'): (e.text or '').strip() for e in meta.findall('article-id')}
+    pmcid = ids.get('pmc', '') or ids.get('pmcid', '')
+    if pmcid and not pmcid.startswith('PMC'):
+        pmcid = f"PMC{pmcid}"
+    title = _text(meta.find('title-group/article-title'))
+
+    lines = [f"# {title}"] if title else []
+    abstract = meta.find('abstract')
+    if abstract is not None:
+        lines.append("## Abstract")
+        lines.extend(_sections(abstract, level=3) or [_text(abstract)])
+    lines.extend(_sections(body))
+    return {
+        'pmcid': pmcid,
+        'pmid': ids.get('pmid', ''),
+        'title': title,
+        'text': '\n\n'.join(lines),
+        'tables': _tables(body)
+    }
+
+def parse_jats_articles(root):
+    """efetch(db=pmc) 결과에서 본문이 있는 전문만 {PMCID: 전문 dict}로 반환"""
+    docs = {}
+    for article in root.iter('article'):
+        doc = parse_jats(article)
+        if doc is not None and doc['pmcid']:
+            docs[doc['pmcid']] = doc
+    return docs
+
+def resolve_pmcids(pmids, email, api_key=None, errors=None):
+    """PMID → PMCID (PMC에 없는 논문은 제외) - 저장소에 없는 PMID는 efetch로 먼저 수집
+
+    errors에 리스트를 넘기면 실패한 efetch 묶음의 PubMedError를 모으고 계속 진행합니다.
+    """
+    from pubmed_async import fetch_sync
+
+    missing = article_store.missing(pmids)
+    if missing:
+        article_store.put_many(fetch_sync(missing, email, api_key, errors))
+    return {a.pmid: a.pmc for a in article_store.get_many(pmids) if a.pmc}
+
+def fetch_fulltexts(pmids, email, api_key=None, errors=None):
+    """PMID 목록의 오픈 액세스 전문 - {PMID: 전문 dict 또는 None(PMC 없음/비공개)}"""
+    from pubmed_async import fetch_pmc_sync
+
+    with span("fulltext.total"):
+        pmcids = resolve_pmcids(list(pmids), email, api_key, errors)
+        docs = fetch_pmc_sync(list(dict.fromkeys(pmcids.values())), email, api_key, errors) if pmcids else {}
+    result = {pmid: docs.get(pmcids.get(pmid)) for pmid in pmids}
+    incr("fulltext_available_total", sum(doc is not None for doc in result.values()))
+    incr("fulltext_unavailable_total", sum(doc is None for doc in result.values()))
+    return result
@@ -0,0 +1,136 @@
+"""공유 작업 대기열의 작업 종류별 실행기
+
+Streamlit 화면은 state_store.enqueue_job으로 작업을 등록하고, worker.py 프로세스가
+run_job으로 실행해 결과를 state_store에 저장합니다. 결과는 어느 Streamlit
+프로세스에서든 불러올 수 있습니다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from config import FULLTEXT_SETTINGS, STATE_SETTINGS, TEAM_CONFIGS
+from metrics import span, incr
+from records import article_store
+
+# 작업 종류 → 화면 표시 이름
+JOB_LABELS = {
+    "search": "PubMed 검색",
+    "screening": "구조화 스크리닝",
+    "meddev_batch": "MEDDEV 일괄 분석"
+}
+
+def job_credentials(team):
+    """작업을 등록한 팀의 NCBI/Gemini 자격 증명 - 팀 설정에 없으면 워커 환경 변수 값
+
+    API 키는 공유 DB의 작업 파라미터에 저장하지 않고 실행 시점에 워커가 정합니다.
+    """
+    config = TEAM_CONFIGS.get(team, {})
+    return {
+        'email': config.get('email') or STATE_SETTINGS["worker_email"],
+        'api_key': config.get('api_key') or STATE_SETTINGS["worker_api_key"],
+        'gemini_api_key': config.get('gemini_api_key') or STATE_SETTINGS["worker_gemini_api_key"]
+    }
+
+def _ensure_articles(pmids, email, api_key):
+    """저장소(메모리/공유 DB)에 없는 논문만 efetch"""
+    from pubmed_async import fetch_sync
+
+    missing = article_store.missing(pmids)
+    if missing:
+        errors = []
+        article_store.put_many(fetch_sync(missing, email, api_key or None, errors))
+        if errors:
+            raise RuntimeError(f"상세 정보 수집 오류: {errors[0]}")
+
+def run_search(params, progress):
+    """PubMed 검색 + 상세 정보 수집 - {'pmids'}"""
+    from pubmed_async import search_sync
+
+    pmids = search_sync(params['query'], params['email'], params.get('api_key') or None,
+                        mindate=params.get('mindate'), maxdate=params.get('maxdate'))
+    progress(f"PMID {len(pmids)}개 - 상세 정보 수집 중")
+    _ensure_articles(pmids, params['email'], params.get('api_key'))
+    return {'pmids': pmids}
+
+def run_screening(params, progress):
+    """구조화 스크리닝 - {'rows': [{PMID, Include, Confidence, Matched_PICO, Rationale}]}"""
+    from analysis import screen_record
+    from resources import get_gemini_model
+
+    pmids = params['pmids']
+    _ensure_articles(pmids, params['email'], params.get('api_key'))
+    articles = article_store.get_many(pmids)
+    model = get_gemini_model(params['gemini_api_key'])
+
+    def screen(article):
+        include, confidence, matched, rationale = screen_record(
+            model, params['gemini_api_key'], article.title, article.abstract,
+            params['product_name'], params.get('pico_text', ''), "worker_screening")
+        return {'PMID': article.pmid, 'Include': include, 'Confidence': confidence,
+                'Matched_PICO': matched, 'Rationale': rationale}
+
+    rows = []
+    with ThreadPoolExecutor(params.get('workers') or 4) as pool:
+        for row in pool.map(screen, articles):
+            rows.append(row)
+            if len(rows) % 10 == 0:
+                progress(f"{len(rows)}/{len(articles)}")
+    return {'rows': rows}
+
+def run_meddev_batch(params, progress):
+    """PMC 전문 수집 + MEDDEV 일괄 분석 - {'results'} (components.run_meddev_batch와 같은 행 형식)"""
+    from analysis import appraise_meddev_batch
+    from fulltext import fetch_fulltexts
+
+    pmids = params['pmids']
+    titles = params.get('titles', {})
+    docs = fetch_fulltexts(pmids, params['email'], params.get('api_key') or None)
+    available = {pmid: doc for pmid, doc in docs.items() if doc is not None}
+    progress(f"전문 확보 {len(available)}/{len(pmids)}")
+
+    results = [{'PMID': pmid, 'PMCID': '', 'Title': titles.get(pmid, ''), '상태': 'PMC 오픈 액세스 전문 없음',
+                '분석 결과': ''} for pmid in pmids if pmid not in available]
+    for done, (pmid, text, error) in enumerate(
+            appraise_meddev_batch(available, params['gemini_api_key'], params.get('product_name', ''),
+                                  FULLTEXT_SETTINGS["meddev_workers"]), 1):
+        results.append({'PMID': pmid, 'PMCID': available[pmid]['pmcid'], 'Title': titles.get(pmid, ''),
+                        '상태': f"오류: {error}" if error else '완료', '분석 결과': text})
+        progress(f"MEDDEV 분석 {done}/{len(available)}")
+
+    order = {pmid: i for i, pmid in enumerate(pmids)}
+    return {'results': sorted(results, key=lambda r: order[r['PMID']])}
+
+HANDLERS = {
+    "search": run_search,
+    "screening": run_screening,
+    "meddev_batch": run_meddev_batch
+}
+
+def run_job(job, progress=lambda text: None):
+    """작업 dict(state_store.claim_job 결과)를 실행해 결과 반환"""
+    handler = HANDLERS.get(job['kind'])
+    if handler is None:
+        raise ValueError(f"알 수 없는 작업 종류: {job['kind']}")
+    params = {**job['params'], **job_credentials(job.get('team', ''))}
+    if not params['email']:
+        raise ValueError(f"'{job.get('team', '')}' 팀 설정과 NCBI_EMAIL 환경 변수에 NCBI 이메일이 없습니다")
+    if job['kind'] != 'search' and not params['gemini_api_key']:
+        raise ValueError(f"'{job.get('team', '')}' 팀 설정과 GEMINI_API_KEY 환경 변수에 Gemini API 키가 없습니다")
+    with span(f"job.{job['kind']}"):
+        result = handler(params, progress)
+    incr("jobs_executed_total", kind=job['kind'])
+    return result
+
+def job_summary(job):
+    """작업 목록 표시용 요약"""
+    params = job['params']
+    if job['kind'] == 'search':
+        target = params.get('query', '')
+    else:
+        target = f"논문 {len(params.get('pmids', []))}개"
+    return {
+        'ID': job['id'],
+        '작업': JOB_LABELS.get(job['kind'], job['kind']),
+        '대상': target[:80],
+        '상태': job['status'],
+        '진행': job['progress'] or job['error'][:80],
+        '시도': job['attempts'],
+        '워커': job['worker']
+    }
@@ -1,7 +1,7 @@
 import streamlit as st
 from config import TEAM_CONFIGS
 from ui import render_header, render_team_selector, render_footer
-from components import render_pubmed_tab, render_ai_tab, render_meddev_tab
+from components import render_pubmed_tab, render_ai_tab, render_meddev_tab, render_diagnostics_tab
 
 # 🎯 Streamlit 앱 시작
 st.set_page_config(
@@ -32,7 +32,7 @@ st.divider()
 st.markdown('<h1 class="main-header">🏥 임상평가 자동화 도구</h1>', unsafe_allow_html=True)
 
 # 📋 메인 탭 구성
-tab1, tab2, tab3 = st.tabs(["🔍 PubMed 검색", "🤖 AI 분석", "📊 MEDDEV 분석"])
+tab1, tab2, tab3, tab4 = st.tabs(["🔍 PubMed 검색", "🤖 AI 분석", "📊 MEDDEV 분석", "🩺 진단"])
 
 # 각 탭 렌더링
 with tab1:
@@ -44,5 +44,8 @@ with tab2:
 with tab3:
     render_meddev_tab()
 
+with tab4:
+    render_diagnostics_tab()
+
 # 푸터
 render_footer()
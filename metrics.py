@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 단계별로 보관할 최근 측정값 수 (p50/p99 계산용)
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+@contextmanager
+def span(stage):
+    """단계 소요 시간 측정 (프로세스 전체 집계)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_duration(stage, time.perf_counter() - start)
+
+def record_duration(stage, seconds):
+    """측정된 소요 시간 기록"""
+    with _lock:
+        entry = _spans.get(stage)
+        if entry is None:
+            entry = _spans[stage] = {"count": 0, "sum": 0.0, "samples": deque(maxlen=MAX_SAMPLES)}
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["samples"].append(seconds)
+
+def incr(name, value=1, **labels):
+    """카운터 증가 (요청, 재시도, 캐시 적중, 바이트, 토큰 등)"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * pct / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+def snapshot():
+    """현재까지의 단계별 통계와 카운터 반환"""
+    with _lock:
+        spans = {stage: (entry["count"], entry["sum"], sorted(entry["samples"]))
+                 for stage, entry in _spans.items()}
+        counters = dict(_counters)
+
+    stages = {}
+    for stage, (count, total, ordered) in sorted(spans.items()):
+        stages[stage] = {
+            "count": count,
+            "total_s": round(total, 4),
+            "mean_ms": round(total / count * 1000, 2) if count else 0.0,
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 2),
+        }
+    counter_list = [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(counters.items())]
+    return {"stages": stages, "counters": counter_list}
+
+def to_json():
+    """JSON 형식으로 내보내기"""
+    return json.dumps(snapshot(), ensure_ascii=False, indent=2)
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in labels.items()}
+    body = ",".join(f'{k}="{v}"' for k, v in sorted(escaped.items()))
+    return "{" + body + "}"
+
+def to_prometheus():
+    """Prometheus text exposition 형식으로 내보내기"""
+    data = snapshot()
+    lines = ["# HELP app_stage_duration_seconds Pipeline stage duration",
+             "# TYPE app_stage_duration_seconds summary"]
+    for stage, stats in data["stages"].items():
+        for quantile, field in (("0.5", "p50_ms"), ("0.99", "p99_ms")):
+            lines.append(f'app_stage_duration_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[field] / 1000:.6g}')
+        lines.append(f'app_stage_duration_seconds_sum{{stage="{stage}"}} {stats["total_s"]}')
+        lines.append(f'app_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+    seen = set()
+    for counter in data["counters"]:
+        name = f"app_{counter['name']}"
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_prom_labels(counter['labels'])} {counter['value']}")
+    return "\n".join(lines) + "\n"
+
+def reset():
+    """모든 측정값 초기화"""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
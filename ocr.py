@@ -0,0 +1,160 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import OCR_SETTINGS
+from metrics import span, incr
+
+# 모든 세션/문서가 함께 쓰는 OCR 작업 프로세스 풀 (처음 필요할 때 생성)
+_executor = None
+_executor_lock = threading.Lock()
+
+def ocr_available():
+    """pytesseract와 tesseract 실행 파일이 모두 있는지 확인"""
+    try:
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which("tesseract") is not None
+
+def pdf_hash(pdf_bytes):
+    """페이지 캐시 키로 쓰는 PDF 내용 해시"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def _cache_path(digest, page_no):
+    settings = OCR_SETTINGS
+    name = f"{page_no:04d}_{settings['lang']}_{settings['resolution']}.txt"
+    return os.path.join(settings["cache_dir"], digest[:2], digest, name)
+
+def _load_cached(digest, page_no):
+    try:
+        with open(_cache_path(digest, page_no), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _store_cached(digest, page_no, text):
+    path = _cache_path(digest, page_no)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)  # 다른 세션과 동시에 써도 깨지지 않도록
+
+def _touch_document(digest):
+    """문서 캐시 폴더의 수정 시각 갱신 (가장 오래 안 쓴 문서부터 정리하기 위해)"""
+    try:
+        os.utime(os.path.dirname(_cache_path(digest, 0)))
+    except FileNotFoundError:
+        pass
+
+def _prune_cache():
+    """캐시된 문서가 cache_max_documents를 넘으면 가장 오래 안 쓴 문서 폴더부터 삭제"""
+    root = OCR_SETTINGS["cache_dir"]
+    try:
+        documents = [entry.path for prefix in os.scandir(root) if prefix.is_dir()
+                     for entry in os.scandir(prefix.path) if entry.is_dir()]
+    except FileNotFoundError:
+        return
+    excess = len(documents) - OCR_SETTINGS["cache_max_documents"]
+    if excess <= 0:
+        return
+    documents.sort(key=lambda path: os.stat(path).st_mtime)
+    for path in documents[:excess]:
+        shutil.rmtree(path, ignore_errors=True)
+    incr("ocr_cache_evictions_total", excess)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            context = multiprocessing.get_context(OCR_SETTINGS["start_method"])
+            _executor = ProcessPoolExecutor(max_workers=OCR_SETTINGS["max_workers"] or os.cpu_count() or 1,
+                                            mp_context=context)
+        return _executor
+
+def _reset_executor(broken):
+    """작업 프로세스가 죽어 깨진 풀은 버리고 다음 호출에서 새로 만듦"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def _ocr_chunk(pdf_bytes, page_numbers):
+    """작업 프로세스에서 페이지 묶음을 이미지로 렌더링해 OCR - [(페이지 번호, 텍스트, 오류)]
+
+    PDF는 묶음마다 한 번만 전달/열고, 페이지별 오류는 그 페이지만 실패로 돌려줍니다.
+    """
+    import pdfplumber
+    import pytesseract
+
+    results = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page_no in page_numbers:
+            try:
+                image = pdf.pages[page_no].to_image(resolution=OCR_SETTINGS["resolution"]).original
+                results.append((page_no, pytesseract.image_to_string(image, lang=OCR_SETTINGS["lang"]), None))
+            except Exception as e:
+                results.append((page_no, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def ocr_pages(pdf_bytes, page_numbers):
+    """지정한 페이지(0부터)를 OCR - {페이지 번호: 텍스트} 반환
+
+    PDF 해시별 페이지 캐시를 먼저 확인하고, 없는 페이지만 공유 프로세스 풀에서
+    병렬로 처리합니다. 같은 문서의 OCR 비용은 한 번만 듭니다. OCR에 실패한 페이지는
+    결과에서 빠지고(호출하는 쪽은 추출 텍스트를 그대로 사용) 캐시하지 않습니다.
+    """
+    digest = pdf_hash(pdf_bytes)
+    results = {}
+    missing = []
+    for page_no in page_numbers:
+        cached = _load_cached(digest, page_no)
+        if cached is None:
+            missing.append(page_no)
+        else:
+            results[page_no] = cached
+    if len(results):
+        _touch_document(digest)
+        incr("ocr_pages_total", len(results), source="cache")
+    if not missing:
+        return results
+
+    workers = min(len(missing), OCR_SETTINGS["max_workers"] or os.cpu_count() or 1)
+    chunks = [missing[i::workers] for i in range(workers)]
+    done = failed = 0
+    pool = _get_executor()
+    with span("pdf.ocr"):
+        try:
+            futures = [(pool.submit(_ocr_chunk, pdf_bytes, chunk), chunk) for chunk in chunks]
+        except BrokenProcessPool:
+            _reset_executor(pool)
+            futures = []
+            failed = len(missing)
+        for future, chunk in futures:
+            try:
+                pages = future.result()
+            except Exception as e:
+                # 이 묶음만 실패 (PDF를 열 수 없음, 작업 프로세스 종료 등) - 다른 묶음 결과는 그대로 사용
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor(pool)
+                failed += len(chunk)
+                continue
+            for page_no, text, error in pages:
+                if error is None:
+                    _store_cached(digest, page_no, text)
+                    results[page_no] = text
+                    done += 1
+                else:
+                    failed += 1
+    if failed:
+        incr("ocr_page_errors_total", failed)
+    if done:
+        incr("ocr_pages_total", done, source="tesseract")
+        _prune_cache()
+    return results
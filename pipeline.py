@@ -0,0 +1,106 @@
+import asyncio
+import time
+from config import PIPELINE_SETTINGS
+from metrics import span, incr, record_duration
+from pubmed_async import AsyncPubMedClient
+from records import article_store
+from resources import get_gemini_model
+from analysis import screen_record
+
+_DONE = object()
+
+async def stream_screening(query, email, api_key, gemini_api_key, product_name, pico_text,
+                           retmax=None, mindate=None, maxdate=None, errors=None, meta=None):
+    """검색 → efetch → 사전 필터 → 구조화 스크리닝을 겹쳐 실행하고 결과를 도착 순서대로 yield
+
+    단계 사이는 크기가 제한된 asyncio.Queue로 연결되어, 스크리닝이 밀리면 수집도
+    멈춥니다(backpressure). 첫 efetch 묶음이 도착하면 바로 스크리닝을 시작하므로
+    첫 결과까지의 시간은 묶음 하나, 전체 시간은 가장 느린 단계에 가까워집니다.
+    yield되는 값은 레코드 dict에 Include/Confidence/Matched_PICO/Rationale을 더한 것입니다.
+    meta에 dict를 넘기면 전체 검색 결과 수를 meta['count']에 기록합니다 (retmax 초과 확인용).
+    """
+    settings = PIPELINE_SETTINGS
+    fetched = asyncio.Queue(maxsize=settings["queue_size"])
+    to_screen = asyncio.Queue(maxsize=settings["queue_size"] * settings["screen_workers"])
+    results = asyncio.Queue()
+    model = get_gemini_model(gemini_api_key)
+    workers = settings["screen_workers"]
+
+    async def fetch_stage(client):
+        try:
+            async for articles in client.iter_search_and_fetch(query, retmax, mindate, maxdate, errors, meta):
+                article_store.put_many(articles)
+                incr("pipeline_records_total", len(articles), stage="fetch")
+                await fetched.put([article.to_record() for article in articles])
+        finally:
+            await fetched.put(_DONE)
+
+    async def prefilter_stage():
+        # 같은 PMID가 여러 esearch 페이지/묶음에 나오면 한 번만 스크리닝
+        seen = set()
+        try:
+            while (batch := await fetched.get()) is not _DONE:
+                for record in batch:
+                    if record['PMID'] in seen:
+                        incr("pipeline_records_total", stage="duplicate")
+                        continue
+                    seen.add(record['PMID'])
+                    await to_screen.put(record)
+        finally:
+            for _ in range(workers):
+                await to_screen.put(_DONE)
+
+    async def screen_stage():
+        try:
+            while (record := await to_screen.get()) is not _DONE:
+                # Gemini SDK 호출은 동기 함수이므로 스레드에서 실행
+                include, confidence, matched, rationale = await asyncio.to_thread(
+                    screen_record, model, gemini_api_key, record['Title'], record['Abstract'],
+                    product_name, pico_text, "pipeline_screening")
+                incr("pipeline_records_total", stage="screen")
+                await results.put({**record, 'Include': include, 'Confidence': confidence,
+                                   'Matched_PICO': matched, 'Rationale': rationale})
+        finally:
+            await results.put(_DONE)
+
+    start = time.perf_counter()
+    first = True
+    with span("pipeline.total"):
+        async with AsyncPubMedClient(email, api_key) as client:
+            tasks = [asyncio.create_task(fetch_stage(client)), asyncio.create_task(prefilter_stage())]
+            tasks += [asyncio.create_task(screen_stage()) for _ in range(workers)]
+            try:
+                remaining = workers
+                while remaining:
+                    item = await results.get()
+                    if item is _DONE:
+                        remaining -= 1
+                        continue
+                    if first:
+                        record_duration("pipeline.first_result", time.perf_counter() - start)
+                        first = False
+                    yield item
+                await asyncio.gather(*tasks)  # 단계 예외 전달
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+def run_streaming_screening(query, email, api_key, gemini_api_key, product_name, pico_text,
+                            on_result=None, retmax=None, mindate=None, maxdate=None, errors=None, meta=None,
+                            collected=None):
+    """stream_screening의 동기 래퍼 - 결과마다 on_result(결과, 순번)를 호출하고 전체 목록 반환
+
+    collected에 list를 넘기면 결과를 거기에 모으므로, 중간에 예외가 나도 그때까지의
+    결과를 호출자가 쓸 수 있습니다.
+    """
+    collected = [] if collected is None else collected
+
+    async def consume():
+        async for item in stream_screening(query, email, api_key, gemini_api_key, product_name, pico_text,
+                                           retmax, mindate, maxdate, errors, meta):
+            collected.append(item)
+            if on_result:
+                on_result(item, len(collected))
+        return collected
+
+    return asyncio.run(consume())
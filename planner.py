@@ -0,0 +1,113 @@
+import math
+from config import PLANNER_SETTINGS, RATE_LIMITS
+from metrics import span
+from analysis import build_screening_prompt
+
+def estimate_tokens(text):
+    """로컬 토큰 수 추정 - 영문/기호는 약 4자당 1토큰, 한글 등 비ASCII는 약 1자당 1토큰"""
+    text = str(text)
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return max(1, math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) * PLANNER_SETTINGS["non_ascii_tokens_per_char"]))
+
+def calibrate_token_ratio(model, prompts, sample_size=3):
+    """Gemini count_tokens로 일부 프롬프트를 실제 측정해 추정치 보정 비율 계산"""
+    ratios = []
+    for prompt in prompts[:sample_size]:
+        actual = model.count_tokens(prompt).total_tokens
+        ratios.append(actual / estimate_tokens(prompt))
+    return sum(ratios) / len(ratios) if ratios else 1.0
+
+def screening_prompts(df, product_name, user_prompt=None, pico_text=''):
+    """AI 탭 설정과 같은 방식으로 실제 호출될 프롬프트 목록 생성"""
+    titles = df['Title'].astype(str)
+    abstracts = df['Abstract'].astype(str)
+    if user_prompt is None:  # 구조화 스크리닝 - 모든 행 호출
+        return [build_screening_prompt(t[:300], a[:1000], product_name, pico_text)
+                for t, a in zip(titles, abstracts)]
+
+    # 일반 모드 - 제품명이 제목/초록에 있는 행만 호출
+    product = product_name.lower()
+    return [user_prompt.format(title=t[:300], abstract=a[:1000], product=product_name)
+            for t, a in zip(titles, abstracts) if product in t.lower() or product in a.lower()]
+
+def shared_prefix_tokens(product_name, user_prompt=None, pico_text=''):
+    """논문마다 반복되는 지시문 부분의 토큰 수 (제목/초록을 비운 프롬프트)"""
+    if user_prompt is None:
+        return estimate_tokens(build_screening_prompt('', '', product_name, pico_text))
+    return estimate_tokens(user_prompt.format(title='', abstract='', product=product_name))
+
+def plan_run(prompts, output_tokens_per_call, concurrency=None, batch_size=None, token_ratio=1.0,
+             shared_prefix_tokens=0, modes=("sequential", "concurrent", "batch")):
+    """프롬프트 목록의 토큰/비용/소요 시간을 실행 방식별로 예측
+
+    shared_prefix_tokens는 묶음 처리 시 한 번만 보내도 되는 공통 지시문 토큰 수입니다.
+    modes로 호출하는 화면이 실제로 실행할 수 있는 방식만 고릅니다.
+    반환값은 방식별 dict 목록 (호출 수, 입력/출력 토큰, 예상 분, 예상 비용).
+    """
+    settings = PLANNER_SETTINGS
+    concurrency = concurrency or settings["concurrency"]
+    batch_size = batch_size or settings["batch_size"]
+
+    with span("planner.estimate"):
+        prompt_tokens = [estimate_tokens(p) * token_ratio for p in prompts]
+    n_calls = len(prompts)
+    input_tokens = sum(prompt_tokens)
+    output_tokens = n_calls * output_tokens_per_call
+
+    max_rps = RATE_LIMITS["gemini"]["max_rate"]
+    tpm = settings["tokens_per_minute"]
+
+    def call_seconds(out_tokens):
+        return settings["base_latency_s"] + out_tokens * settings["seconds_per_output_token"]
+
+    def wall_seconds(calls, total_tokens, per_call_s, workers):
+        # 동시 실행 한도, 초당 요청 한도, 분당 토큰 한도 중 가장 느린 쪽
+        return max(calls * per_call_s / workers,
+                   calls / max_rps if max_rps else 0,
+                   total_tokens / tpm * 60 if tpm else 0)
+
+    def cost(inp, out):
+        return inp / 1e6 * settings["input_price_per_1m"] + out / 1e6 * settings["output_price_per_1m"]
+
+    plans = {}
+    per_call = call_seconds(output_tokens_per_call)
+    total = input_tokens + output_tokens
+    plans["sequential"] = {
+        '방식': '순차 실행',
+        '호출 수': n_calls,
+        '입력 토큰': int(input_tokens),
+        '출력 토큰': int(output_tokens),
+        '예상 시간(분)': round(wall_seconds(n_calls, total, per_call, 1) / 60, 2),
+        '예상 비용($)': round(cost(input_tokens, output_tokens), 4)
+    }
+    plans["concurrent"] = {
+        '방식': f'동시 실행 x{concurrency}',
+        '호출 수': n_calls,
+        '입력 토큰': int(input_tokens),
+        '출력 토큰': int(output_tokens),
+        '예상 시간(분)': round(wall_seconds(n_calls, total, per_call, concurrency) / 60, 2),
+        '예상 비용($)': round(cost(input_tokens, output_tokens), 4)
+    }
+
+    # 묶음 실행: 공통 지시문은 묶음당 한 번만 전송
+    batch_calls = math.ceil(n_calls / batch_size) if n_calls else 0
+    saved_prefix = max(0, n_calls - batch_calls) * shared_prefix_tokens * token_ratio
+    batch_input = max(0, input_tokens - saved_prefix)
+    batch_total = batch_input + output_tokens
+    per_batch_call = call_seconds(output_tokens_per_call * batch_size)
+    plans["batch"] = {
+        '방식': f'묶음 {batch_size}개 x{concurrency}',
+        '호출 수': batch_calls,
+        '입력 토큰': int(batch_input),
+        '출력 토큰': int(output_tokens),
+        '예상 시간(분)': round(wall_seconds(batch_calls, batch_total, per_batch_call, concurrency) / 60, 2),
+        '예상 비용($)': round(cost(batch_input, output_tokens), 4)
+    }
+    return [plans[mode] for mode in modes]
+
+def recommend(plans, budget=None):
+    """예산 이하에서 가장 빠른 방식 선택 (없으면 None)"""
+    affordable = [p for p in plans if budget is None or p['예상 비용($)'] <= budget]
+    if not affordable:
+        return None
+    return min(affordable, key=lambda p: (p['예상 시간(분)'], p['예상 비용($)']))
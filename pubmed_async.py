@@ -0,0 +1,365 @@
+"""비동기 PubMed E-utilities 클라이언트
+
+Streamlit 없이도 쓸 수 있는 asyncio 기반 search/fetch/count API입니다.
+esearch 페이지를 받는 즉시 해당 PMID의 efetch를 시작하고, 여러 쿼리를 하나의
+이벤트 루프에서 동시에 실행할 수 있습니다. 요청 속도는 동기 코드와 같은
+AIMD 속도 조절기(rate_limit.get_limiter)를 공유합니다.
+
+    async with AsyncPubMedClient("me@example.com") as client:
+        total = await client.count("melody[ti]")
+        articles = await client.search_and_fetch("melody[ti]")
+
+Streamlit 스크립트에서는 search_sync / fetch_sync 같은 동기 래퍼를 사용합니다. 동기 래퍼는
+프로세스에 하나뿐인 백그라운드 이벤트 루프에서 실행되어 httpx 연결 풀을 호출 사이에 재사용합니다.
+"""
+import asyncio
+import itertools
+import threading
+import xml.etree.ElementTree as ET
+
+import httpx
+
+from config import SEARCH_SETTINGS, API_ENDPOINTS, RATE_LIMITS, EXPANSION_SETTINGS, FULLTEXT_SETTINGS
+from metrics import span, incr
+from rate_limit import get_limiter, parse_retry_after, THROTTLE_STATUS_CODES
+from records import parse_compact_articles
+
+class PubMedError(RuntimeError):
+    """E-utilities 요청/응답 오류"""
+
+    def __init__(self, message, endpoint, status=None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.status = status
+
+class AsyncPubMedClient:
+    """httpx.AsyncClient 기반 PubMed 클라이언트 (async with로 사용)"""
+
+    def __init__(self, email, api_key=None, fetch_concurrency=None, client=None):
+        self.email = email
+        self.api_key = api_key or None
+        self.base_url = API_ENDPOINTS["eutils_base"]
+        self.limiter = get_limiter("ncbi", self.api_key or "")
+        self.fetch_concurrency = fetch_concurrency or SEARCH_SETTINGS["fetch_concurrency"]
+        self._fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+        self._link_slots = asyncio.Semaphore(EXPANSION_SETTINGS["concurrency"])
+        self._client = client
+        self._owns_client = client is None
+
+    async def __aenter__(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=20))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _params(self, **params):
+        params['db'] = 'pubmed'
+        params['email'] = self.email
+        if self.api_key:
+            params['api_key'] = self.api_key
+        return params
+
+    async def _get(self, endpoint, params, timeout, post=False):
+        """속도 조절과 재시도를 적용한 GET(post=True면 POST) - 파싱한 XML 루트 반환"""
+        url = f"{self.base_url}/{endpoint}.fcgi"
+        max_retries = RATE_LIMITS["max_retries"]
+        for attempt in range(max_retries + 1):
+            await self.limiter.acquire_async()
+            try:
+                with span(f"pubmed.{endpoint}.request"):
+                    if post:
+                        r = await self._client.post(url, data=params, timeout=timeout)
+                    else:
+                        r = await self._client.get(url, params=params, timeout=timeout)
+            except httpx.HTTPError as e:
+                incr("ncbi_errors_total", endpoint=endpoint, kind="network")
+                raise PubMedError(f"네트워크 오류: {e}", endpoint) from e
+            incr("ncbi_requests_total", endpoint=endpoint)
+            incr("ncbi_response_bytes_total", len(r.content), endpoint=endpoint)
+
+            if r.status_code in THROTTLE_STATUS_CODES:
+                self.limiter.on_throttle(parse_retry_after(r.headers.get('Retry-After')))
+                if attempt < max_retries:
+                    incr("retries_total", kind="ncbi")
+                    continue
+            elif r.status_code < 400:
+                self.limiter.on_success()
+
+            if r.status_code != 200:
+                incr("ncbi_errors_total", endpoint=endpoint, kind=str(r.status_code))
+                raise PubMedError(f"HTTP 오류: {r.status_code}", endpoint, r.status_code)
+            try:
+                with span(f"pubmed.{endpoint}.parse"):
+                    return ET.fromstring(r.content)
+            except ET.ParseError as e:
+                incr("ncbi_errors_total", endpoint=endpoint, kind="parse")
+                raise PubMedError(f"XML 파싱 실패: {e}", endpoint) from e
+
+    @staticmethod
+    def _term(query, mindate, maxdate):
+        if mindate and maxdate:
+            return f"{query} AND {mindate}:{maxdate}[pdat]"
+        return query
+
+    async def count(self, query, mindate=None, maxdate=None):
+        """검색 결과 수"""
+        root = await self._get("esearch", self._params(term=self._term(query, mindate, maxdate),
+                                                        retmax=0, retmode='xml'), timeout=30)
+        return int(root.findtext('.//Count', '0'))
+
+    async def iter_search(self, query, retmax=None, mindate=None, maxdate=None, page_size=None, meta=None):
+        """esearch 페이지 단위로 PMID 목록을 순서대로 yield (retmax로 전체 개수 제한)
+
+        meta에 dict를 넘기면 전체 검색 결과 수를 meta['count']에 기록합니다.
+        """
+        page_size = page_size or SEARCH_SETTINGS["search_page_size"]
+        term = self._term(query, mindate, maxdate)
+        retstart = 0
+        total = None
+        while total is None or retstart < total:
+            size = page_size if retmax is None else min(page_size, retmax - retstart)
+            if size <= 0:
+                break
+            root = await self._get("esearch", self._params(term=term, retstart=retstart, retmax=size,
+                                                            retmode='xml'), timeout=30)
+            if total is None:
+                total = int(root.findtext('.//Count', '0'))
+                if meta is not None:
+                    meta['count'] = total
+            batch = [e.text for e in root.findall('.//Id')]
+            if not batch:
+                break
+            retstart += len(batch)
+            yield batch
+
+    async def search(self, query, retmax=None, mindate=None, maxdate=None, page_size=None, meta=None):
+        """전체 PMID 목록"""
+        ids = []
+        async for batch in self.iter_search(query, retmax, mindate, maxdate, page_size, meta):
+            ids.extend(batch)
+        return ids
+
+    async def _fetch_chunk(self, pmids):
+        async with self._fetch_slots:
+            root = await self._get("efetch", self._params(id=','.join(pmids), retmode='xml'), timeout=60)
+        with span("pubmed.efetch.extract_records"):
+            articles = parse_compact_articles(root)
+        incr("pubmed_articles_total", len(articles))
+        return articles
+
+    async def iter_fetch(self, pmids, errors=None):
+        """PMID 목록을 chunk_size씩 동시에 efetch - 완료되는 순서대로 CompactArticle 목록 yield
+
+        저장소(records.article_store)에 넣는 것은 호출하는 쪽이 합니다.
+
+        errors에 리스트를 넘기면 실패한 묶음의 PubMedError를 모으고 계속 진행합니다.
+        요청은 fetch_concurrency개까지만 띄우고 소비자가 결과를 가져갈 때 다음 묶음을
+        요청하므로, 소비가 멈추면 efetch도 멈춥니다.
+        """
+        chunk = SEARCH_SETTINGS["chunk_size"]
+        starts = iter(range(0, len(pmids), chunk))
+        pending = set()
+        try:
+            while True:
+                for i in itertools.islice(starts, self.fetch_concurrency - len(pending)):
+                    pending.add(asyncio.create_task(self._fetch_chunk(pmids[i:i + chunk])))
+                if not pending:
+                    break
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    try:
+                        yield task.result()
+                    except PubMedError as e:
+                        if errors is None:
+                            raise
+                        errors.append(e)
+        finally:
+            # 중간에 취소/오류가 나면 남은 요청도 취소
+            for task in pending:
+                task.cancel()
+
+    async def fetch(self, pmids, errors=None):
+        """PMID 목록의 CompactArticle 목록 (입력 순서 유지)"""
+        order = {pmid: i for i, pmid in enumerate(pmids)}
+        articles = []
+        async for batch in self.iter_fetch(list(pmids), errors):
+            articles.extend(batch)
+        articles.sort(key=lambda a: order.get(a.pmid, len(order)))
+        return articles
+
+    async def _fetch_pmc_chunk(self, pmcids):
+        from fulltext import parse_jats_articles
+
+        params = self._params(id=','.join(p.removeprefix('PMC') for p in pmcids), retmode='xml')
+        params['db'] = 'pmc'
+        async with self._fetch_slots:
+            root = await self._get("efetch", params, timeout=120)
+        with span("pmc.efetch.parse_jats"):
+            docs = parse_jats_articles(root)
+        incr("pmc_articles_total", len(docs))
+        return docs
+
+    async def fetch_pmc(self, pmcids, errors=None):
+        """PMCID 목록의 오픈 액세스 JATS 전문 {PMCID: 전문 dict} - batch_size씩 동시에 efetch(db=pmc)
+
+        본문을 받을 수 없는(오픈 액세스가 아닌) 논문은 결과에서 빠집니다.
+        """
+        batch = FULLTEXT_SETTINGS["batch_size"]
+        results = await asyncio.gather(*(self._fetch_pmc_chunk(pmcids[i:i + batch])
+                                         for i in range(0, len(pmcids), batch)),
+                                       return_exceptions=errors is not None)
+        docs = {}
+        for result in results:
+            if isinstance(result, PubMedError):
+                errors.append(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                docs.update(result)
+        return docs
+
+    async def iter_search_and_fetch(self, query, retmax=None, mindate=None, maxdate=None, errors=None, meta=None):
+        """esearch 페이징과 efetch를 겹쳐 실행 - CompactArticle 묶음을 도착하는 대로 yield (meta는 iter_search와 같음)
+
+        대기열과 동시에 수집하는 esearch 페이지 수가 제한되어 있어, 소비자가 늦으면
+        다음 페이지의 esearch/efetch도 기다립니다.
+        """
+        queue = asyncio.Queue(maxsize=self.fetch_concurrency)
+        page_slots = asyncio.Semaphore(SEARCH_SETTINGS["pages_in_flight"])
+        fetches = []
+        done = object()
+
+        async def produce():
+            try:
+                try:
+                    async for batch in self.iter_search(query, retmax, mindate, maxdate, meta=meta):
+                        await page_slots.acquire()
+                        fetches.append(asyncio.create_task(self._drain(batch, errors, queue, page_slots)))
+                finally:
+                    # 뒤쪽 esearch 페이지가 실패해도 이미 받은 페이지의 efetch는 마저 흘려보냄
+                    await asyncio.gather(*fetches)
+            except Exception:
+                for task in fetches:
+                    task.cancel()
+                await queue.put(done)
+                raise
+            await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not done:
+                yield item
+            await producer  # 검색 단계 예외 전달
+        finally:
+            # 소비자가 떠나면 대기열이 더 비지 않으므로 검색과 남은 efetch를 모두 취소
+            for task in (producer, *fetches):
+                task.cancel()
+
+    async def _drain(self, pmids, errors, queue, page_slots):
+        try:
+            async for batch in self.iter_fetch(pmids, errors):
+                await queue.put(batch)
+        finally:
+            page_slots.release()
+
+    async def search_and_fetch(self, query, retmax=None, mindate=None, maxdate=None, errors=None):
+        """검색 + 상세 수집을 겹쳐 실행한 전체 CompactArticle 목록"""
+        articles = []
+        async for batch in self.iter_search_and_fetch(query, retmax, mindate, maxdate, errors):
+            articles.extend(batch)
+        return articles
+
+    async def _link_batch(self, pmids, link_name):
+        # id 파라미터를 반복하면 시드별 LinkSet이 따로 돌아옴 (쉼표로 합치면 출처를 알 수 없음)
+        async with self._link_slots:
+            root = await self._get("elink", dict(self._params(dbfrom='pubmed', linkname=link_name, retmode='xml'),
+                                                 id=list(pmids)), timeout=60, post=True)
+        links = {}
+        for link_set in root.findall('LinkSet'):
+            seed = link_set.findtext('IdList/Id', default='')
+            for link_db in link_set.findall('LinkSetDb'):
+                if link_db.findtext('LinkName') == link_name:
+                    links[seed] = [e.text for e in link_db.findall('Link/Id')]
+        incr("elink_links_total", sum(len(v) for v in links.values()), link=link_name)
+        return links
+
+    async def links(self, pmids, link_name):
+        """시드 PMID별 링크 PMID 목록 {시드: [PMID, ...]} - batch_size씩 묶어 동시에 ELink 요청"""
+        batch = EXPANSION_SETTINGS["batch_size"]
+        pmids = list(dict.fromkeys(pmids))
+        with span(f"pubmed.elink.{link_name}"):
+            results = await asyncio.gather(*(self._link_batch(pmids[i:i + batch], link_name)
+                                             for i in range(0, len(pmids), batch)))
+        links = {}
+        for result in results:
+            links.update(result)
+        return links
+
+    async def expand(self, seeds, link_names, max_per_seed=None, exclude=()):
+        """시드 논문에서 한 단계 확장한 새 PMID 목록과 출처 반환
+
+        (새 PMID 목록, {PMID: [(링크 이름, 시드 PMID), ...]}) - 시드와 exclude에 있는
+        PMID는 제외하고, 시드 순서 → 링크 순서로 정렬됩니다.
+        """
+        max_per_seed = max_per_seed or EXPANSION_SETTINGS["max_per_seed"]
+        seeds = list(dict.fromkeys(seeds))
+        results = await asyncio.gather(*(self.links(seeds, name) for name in link_names))
+        known = set(seeds) | set(exclude)
+        sources = {}
+        for seed in seeds:
+            for name, links in zip(link_names, results):
+                for pmid in links.get(seed, [])[:max_per_seed]:
+                    if pmid not in known:
+                        sources.setdefault(pmid, []).append((name, seed))
+        return list(sources), sources
+
+# 동기 래퍼가 공유하는 백그라운드 이벤트 루프와 클라이언트 (루프 스레드에서만 접근)
+_loop = None
+_loop_lock = threading.Lock()
+_http_client = None
+_clients = {}
+
+def _background_loop():
+    """동기 래퍼용 이벤트 루프 (처음 호출할 때 데몬 스레드에서 시작)"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="pubmed-async", daemon=True).start()
+            _loop = loop
+    return _loop
+
+async def _with_client(email, api_key, method, *args, **kwargs):
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=20))
+    # (이메일, API 키)마다 클라이언트를 하나씩 두어 efetch 동시 실행 수도 호출 사이에 공유
+    key = (email, api_key or None)
+    if key not in _clients:
+        _clients[key] = AsyncPubMedClient(email, api_key, client=_http_client)
+    return await getattr(_clients[key], method)(*args, **kwargs)
+
+def _run(email, api_key, method, *args, **kwargs):
+    """공유 루프에서 클라이언트 메서드를 실행하고 결과를 기다림 (어느 스레드에서든 호출 가능)"""
+    coro = _with_client(email, api_key, method, *args, **kwargs)
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+def search_sync(query, email, api_key=None, retmax=None, mindate=None, maxdate=None, page_size=None, meta=None):
+    """Streamlit 등 동기 코드용 search 래퍼"""
+    return _run(email, api_key, "search", query, retmax, mindate, maxdate, page_size, meta)
+
+def fetch_sync(pmids, email, api_key=None, errors=None):
+    """Streamlit 등 동기 코드용 fetch 래퍼"""
+    return _run(email, api_key, "fetch", pmids, errors)
+
+def fetch_pmc_sync(pmcids, email, api_key=None, errors=None):
+    """Streamlit 등 동기 코드용 fetch_pmc 래퍼"""
+    return _run(email, api_key, "fetch_pmc", pmcids, errors)
+
+def expand_sync(seeds, link_names, email, api_key=None, max_per_seed=None, exclude=()):
+    """Streamlit 등 동기 코드용 expand 래퍼"""
+    return _run(email, api_key, "expand", seeds, link_names, max_per_seed, exclude)
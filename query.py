@@ -0,0 +1,199 @@
+"""PubMed 검색식 파서/정규화
+
+PICO 입력과 필터를 구문 트리로 파싱해 네트워크 요청 전에 괄호/따옴표/연산자
+오류를 잡고, 의미가 같은 검색식(공백, 대소문자, 순서, 중복 필터만 다른 경우)을
+같은 정규 문자열과 해시로 만듭니다. 검색 캐시/싱글플라이트 키는 이 정규 문자열을
+사용합니다.
+
+PubMed 규칙을 따릅니다: 불리언 연산자는 대문자 AND/OR/NOT만 인식하고 왼쪽에서
+오른쪽으로 계산하며(우선순위 없음), 따옴표 없는 연속 단어는 하나의 검색어입니다.
+"""
+import hashlib
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"\[\]]+))(\[[^\[\]]*\])?')
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+class Term(NamedTuple):
+    """검색어 - text는 소문자/공백 정규화, tag는 소문자 필드 태그('' 가능)"""
+    text: str
+    tag: str = ''
+    quoted: bool = False
+
+class Group(NamedTuple):
+    """불리언 그룹 - AND/OR은 순서 무관, NOT은 첫 항목에서 나머지를 제외"""
+    op: str
+    children: tuple
+
+class CompiledQuery(NamedTuple):
+    text: str    # 정규 검색식 (esearch term으로 그대로 사용)
+    key: str     # 정규 검색식 + 날짜 범위 해시 (캐시 키)
+    node: object
+
+def _tokenize(text):
+    if text.count('"') % 2:
+        raise ValueError("따옴표 짝이 맞지 않습니다")
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            rest = text[pos:].lstrip()
+            if rest[:1] in ('[', ']'):
+                raise ValueError(f"대괄호(필드 태그) 짝이 맞지 않습니다: {rest[:20]}")
+            raise ValueError(f"해석할 수 없는 검색식 위치: {rest[:20]}")
+        pos = match.end()
+        open_paren, close_paren, phrase, word, tag = match.groups()
+        if open_paren:
+            tokens.append(('(',))
+        elif close_paren:
+            if tag:
+                raise ValueError(f"괄호 그룹에는 필드 태그를 붙일 수 없습니다: {tag}")
+            tokens.append((')',))
+        elif word in _OPERATORS and not tag:
+            tokens.append(('op', word))
+        elif phrase is not None:
+            tokens.append(('term', phrase, tag or '', True))
+        else:
+            tokens.append(('term', word, tag or '', False))
+    return tokens
+
+def _merge_words(tokens):
+    """따옴표 없는 연속 단어를 하나의 검색어로 (마지막 단어의 태그가 전체에 적용)"""
+    merged = []
+    for token in tokens:
+        previous = merged[-1] if merged else None
+        if (token[0] == 'term' and not token[3] and previous and previous[0] == 'term'
+                and not previous[3] and not previous[2]):
+            merged[-1] = ('term', f"{previous[1]} {token[1]}", token[2], False)
+        else:
+            merged.append(token)
+    return merged
+
+def _make_term(token):
+    _, text, tag, quoted = token
+    text = ' '.join(text.lower().split())
+    if not text:
+        raise ValueError("빈 검색어(\"\")가 있습니다")
+    return Term(text, ' '.join(tag[1:-1].lower().split()) if tag else '', quoted)
+
+def _parse(tokens):
+    pos = 0
+
+    def operand():
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError("연산자 뒤에 검색어가 없습니다")
+        token = tokens[pos]
+        pos += 1
+        if token[0] == 'term':
+            return _make_term(token)
+        if token[0] == '(':
+            if pos < len(tokens) and tokens[pos][0] == ')':
+                raise ValueError("빈 괄호 ()가 있습니다")
+            node = expression()
+            if pos >= len(tokens) or tokens[pos][0] != ')':
+                raise ValueError("괄호 짝이 맞지 않습니다 (닫는 괄호 없음)")
+            pos += 1
+            return node
+        if token[0] == ')':
+            raise ValueError("닫는 괄호가 여는 괄호보다 많습니다")
+        raise ValueError(f"연산자 {token[1]} 앞에 검색어가 없습니다")
+
+    def expression():
+        nonlocal pos
+        node = operand()
+        while pos < len(tokens) and tokens[pos][0] != ')':
+            if tokens[pos][0] == 'op':
+                op = tokens[pos][1]
+                pos += 1
+            else:
+                op = 'AND'  # 연산자 없이 이어진 검색어/그룹
+            node = Group(op, (node, operand()))  # 왼쪽부터 계산
+        return node
+
+    if not tokens:
+        raise ValueError("검색어가 비어 있습니다")
+    node = expression()
+    if pos < len(tokens):
+        raise ValueError("닫는 괄호가 여는 괄호보다 많습니다")
+    return node
+
+def normalize(node):
+    """같은 연산자 중첩 펼치기, AND/OR 항목 정렬·중복 제거, NOT 제외 항목 정렬·중복 제거"""
+    if isinstance(node, Term):
+        return node
+    children = [normalize(child) for child in node.children]
+    if node.op == 'NOT':
+        first, excluded = children[0], children[1:]
+        if isinstance(first, Group) and first.op == 'NOT':  # (A NOT B) NOT C
+            first, excluded = first.children[0], list(first.children[1:]) + excluded
+        unique = {to_string(child): child for child in excluded}
+        return Group('NOT', (first, *(unique[k] for k in sorted(unique))))
+
+    flat = []
+    for child in children:
+        if isinstance(child, Group) and child.op == node.op:
+            flat.extend(child.children)
+        else:
+            flat.append(child)
+    unique = {to_string(child): child for child in flat}
+    if len(unique) == 1:
+        return next(iter(unique.values()))
+    return Group(node.op, tuple(unique[k] for k in sorted(unique)))
+
+def to_string(node, nested=False):
+    """구문 트리 → PubMed 검색식 (하위 그룹은 괄호로 감쌈)"""
+    if isinstance(node, Term):
+        text = f'"{node.text}"' if node.quoted else node.text
+        return f"{text}[{node.tag}]" if node.tag else text
+    text = f" {node.op} ".join(to_string(child, nested=True) for child in node.children)
+    return f"({text})" if nested else text
+
+@lru_cache(maxsize=1024)
+def parse_query(text):
+    """검색식 문자열 → 정규화된 구문 트리 (오류 시 ValueError)"""
+    return normalize(_parse(_merge_words(_tokenize(text))))
+
+def canonical_query(text):
+    """검색식의 정규 문자열"""
+    return to_string(parse_query(text))
+
+def query_key(text, mindate=None, maxdate=None):
+    """정규 검색식 + 날짜 범위의 캐시 키 (sha1 앞 16자리)"""
+    raw = '\n'.join([text, mindate or '', maxdate or ''])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def compile_query(components, filters=(), mindate=None, maxdate=None):
+    """PICO 구성요소({이름: 검색식})와 필터 목록을 하나의 정규 검색식으로 컴파일
+
+    구성요소와 필터는 AND로 결합하고, 'NOT '으로 시작하는 필터는 전체에서
+    제외합니다. 오류 메시지에는 문제가 된 구성요소 이름이 붙습니다.
+    """
+    included = []
+    for name, text in components.items():
+        if not text or not text.strip():
+            continue
+        try:
+            included.append(parse_query(text))
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from None
+    if not included:
+        raise ValueError("검색어가 비어 있습니다")
+
+    excluded = []
+    for text in filters:
+        target = excluded if text.startswith('NOT ') else included
+        try:
+            target.append(parse_query(text.removeprefix('NOT ')))
+        except ValueError as e:
+            raise ValueError(f"필터 {text}: {e}") from None
+
+    node = normalize(Group('AND', tuple(included)))
+    if excluded:
+        node = normalize(Group('NOT', (node, *excluded)))
+    text = to_string(node)
+    return CompiledQuery(text, query_key(text, mindate, maxdate), node)
@@ -0,0 +1,76 @@
+import re
+import numpy as np
+from config import RANKING_SETTINGS
+from metrics import span
+from result_table import with_overlay
+
+_WORD_RE = re.compile(r'[0-9a-z가-힣]+')
+_TAG_RE = re.compile(r'\[[^\]]*\]')
+# NOT 뒤의 괄호 그룹/구문/단어 (제외 조건이므로 관련도 계산에서 뺌)
+_NOT_CLAUSE_RE = re.compile(r'\bNOT\s+(?:\((?:[^()]|\([^()]*\))*\)|"[^"]*"|\S+)')
+
+STOPWORDS = {
+    'a', 'an', 'and', 'or', 'not', 'the', 'of', 'in', 'on', 'for', 'to', 'with', 'by', 'at', 'from',
+    'as', 'is', 'are', 'was', 'were', 'be', 'been', 'this', 'that', 'these', 'those', 'it', 'its',
+    'we', 'our', 'their', 'than', 'into', 'after', 'before', 'during', 'between', 'vs', 'versus',
+    'study', 'patients', 'patient', 'results', 'methods', 'conclusions', 'background'
+}
+
+def tokenize(text):
+    """소문자 단어 토큰 (불용어 제외)"""
+    return [tok for tok in _WORD_RE.findall(str(text).lower()) if tok not in STOPWORDS and len(tok) > 1]
+
+def query_terms(*texts):
+    """PICO/제품명 텍스트에서 관련도 계산용 검색어 추출 - {단어: 가중치}"""
+    weights = {}
+    for text in texts:
+        if not text:
+            continue
+        text = _NOT_CLAUSE_RE.sub(' ', _TAG_RE.sub(' ', text))
+        for tok in tokenize(text):
+            weights[tok] = weights.get(tok, 0) + 1
+    return weights
+
+def bm25_scores(docs, term_weights, k1=None, b=None):
+    """문서 목록의 BM25 점수 (NumPy 벡터 연산)"""
+    k1 = RANKING_SETTINGS["k1"] if k1 is None else k1
+    b = RANKING_SETTINGS["b"] if b is None else b
+    n_docs = len(docs)
+    if not n_docs or not term_weights:
+        return np.zeros(n_docs)
+
+    vocab = {term: j for j, term in enumerate(term_weights)}
+    counts = np.zeros((n_docs, len(vocab)), dtype=np.float32)
+    doc_len = np.zeros(n_docs, dtype=np.float32)
+    for i, text in enumerate(docs):
+        tokens = tokenize(text)
+        doc_len[i] = len(tokens)
+        for tok in tokens:
+            j = vocab.get(tok)
+            if j is not None:
+                counts[i, j] += 1
+
+    doc_freq = (counts > 0).sum(axis=0)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    avg_len = doc_len.mean() or 1.0
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    tf = counts * (k1 + 1) / (counts + norm[:, None])
+    query_weights = np.fromiter(term_weights.values(), dtype=np.float32, count=len(term_weights))
+    return (tf * idf) @ query_weights
+
+def rank_by_relevance(df, pico_text, product_name=''):
+    """Title/Abstract의 PICO 관련도(BM25) 점수를 'Relevance' 컬럼에 넣고 내림차순 정렬
+
+    제목은 RANKING_SETTINGS["title_boost"]배로 가중합니다. 점수는 최고점 대비
+    0~100으로 정규화됩니다.
+    """
+    with span("ranking.bm25"):
+        boost = RANKING_SETTINGS["title_boost"]
+        docs = ((df['Title'].astype(str) + ' ') * boost + df['Abstract'].astype(str)).tolist()
+        scores = bm25_scores(docs, query_terms(pico_text, product_name))
+        top = scores.max() if len(scores) else 0
+        relevance = np.round(scores / top * 100, 1) if top > 0 else np.zeros(len(scores))
+
+        ranked = with_overlay(df, Relevance=relevance)
+        ranked = ranked.sort_values('Relevance', ascending=False, kind='stable').reset_index(drop=True)
+    return ranked
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from config import RATE_LIMITS
+from metrics import incr, record_duration
+
+# 속도 감소 후 재시도할 응답 코드 (요청 제한 / 과부하)
+THROTTLE_STATUS_CODES = (429, 503)
+
+class AdaptiveRateLimiter:
+    """AIMD 방식 요청 속도 조절기
+
+    성공할 때마다 속도를 조금씩 올리고(additive increase), 429/쿼터 초과 시
+    속도를 절반으로 줄입니다(multiplicative decrease). Retry-After가 있으면
+    그 시간 동안 같은 키의 모든 요청을 멈춥니다. 슬롯 계산은 락 안에서,
+    대기는 락 밖에서 하므로 여러 세션/스레드가 하나의 예산을 나눠 씁니다.
+    """
+
+    def __init__(self, kind, initial_rate, min_rate, max_rate, increase_step, decrease_factor):
+        self.kind = kind
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+
+    def acquire(self):
+        """다음 요청 슬롯까지 대기 후 반환"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + 1.0 / self.rate
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        record_duration(f"ratelimit.{self.kind}.wait", max(wait, 0.0))
+
+    async def acquire_async(self):
+        """acquire의 asyncio 버전 - 같은 예산을 쓰되 이벤트 루프를 막지 않음"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + 1.0 / self.rate
+        wait = slot - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+        record_duration(f"ratelimit.{self.kind}.wait", max(wait, 0.0))
+
+    def on_success(self):
+        """성공 응답 - 속도 소폭 증가"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after=None):
+        """429/쿼터 초과 - 속도 감소 및 Retry-After 동안 차단"""
+        incr("ratelimit_throttled_total", kind=self.kind)
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def status(self):
+        with self._lock:
+            return {"kind": self.kind, "rate": round(self.rate, 3), "max_rate": self.max_rate}
+
+_registry_lock = threading.Lock()
+_limiters = {}
+
+def get_limiter(kind, key=""):
+    """kind(ncbi/gemini)와 키별로 프로세스 전체에서 공유되는 속도 조절기"""
+    registry_key = (kind, key)
+    with _registry_lock:
+        limiter = _limiters.get(registry_key)
+        if limiter is None:
+            settings = RATE_LIMITS[kind]
+            if kind == "ncbi" and key:
+                settings = RATE_LIMITS["ncbi_with_key"]
+            limiter = AdaptiveRateLimiter(
+                kind,
+                settings["initial_rate"],
+                settings["min_rate"],
+                settings["max_rate"],
+                settings["increase_step"],
+                settings["decrease_factor"]
+            )
+            _limiters[registry_key] = limiter
+        return limiter
+
+def limiter_status():
+    """등록된 속도 조절기 현황 (키는 노출하지 않음)"""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return [limiter.status() for limiter in limiters]
+
+def parse_retry_after(value):
+    """Retry-After 헤더(초 단위) 파싱 - 없거나 형식이 다르면 None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def parse_retry_info(error):
+    """Google API 예외(429 등)가 알려 준 재시도 대기 시간(초) - 없으면 None
+
+    REST 응답은 details에 {'@type': '.../google.rpc.RetryInfo', 'retryDelay': '13s'} dict로,
+    gRPC는 RetryInfo 메시지(retry_delay)로 들어옵니다. 둘 다 없으면 Retry-After 헤더를 봅니다.
+    """
+    for detail in getattr(error, 'details', None) or ():
+        if isinstance(detail, dict):
+            if detail.get('@type', '').endswith('google.rpc.RetryInfo'):
+                delay = parse_retry_after(str(detail.get('retryDelay', '')).rstrip('s'))
+                if delay is not None:
+                    return delay
+        elif hasattr(detail, 'retry_delay'):
+            return detail.retry_delay.seconds + detail.retry_delay.nanos / 1e9
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    return parse_retry_after(headers.get('Retry-After')) if headers else None
@@ -0,0 +1,267 @@
+import json
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from config import STORE_SETTINGS
+from metrics import incr
+import state_store
+
+# 공유 저장소 행 형식 버전 - CompactArticle 필드가 바뀌면 올리고, 다른 버전 행은 다시 efetch
+ROW_VERSION = 1
+
+# MeSH/출판 유형 UI 번호 → 이름 (프로세스 전체 공유 어휘)
+_vocab_lock = threading.Lock()
+MESH_NAMES = {}
+PUBTYPE_NAMES = {}
+
+def _ui_to_id(ui, names, name):
+    """'D012345' 형식 UI를 정수 ID로 바꾸고 이름을 어휘에 등록"""
+    if not ui or not ui[1:].isdigit():
+        return None
+    term_id = int(ui[1:])
+    if term_id not in names:
+        with _vocab_lock:
+            names.setdefault(term_id, sys.intern(name))
+    return term_id
+
+def _text(elem):
+    """하위 태그(<i>, <sup> 등)까지 포함한 전체 텍스트"""
+    return ' '.join(''.join(elem.itertext()).split()) if elem is not None else ''
+
+class CompactArticle:
+    """잘림 없는 전체 논문 레코드 (메모리 절약형)
+
+    저널명/연도는 intern된 문자열, 초록은 zlib 압축 바이트, MeSH와 출판 유형은
+    정수 ID 배열로 저장합니다. 초록은 abstract 속성에 접근할 때만 압축을 풉니다.
+    """
+    __slots__ = ('pmid', 'title', '_abstract', 'authors', 'affiliations', 'journal', 'year',
+                 'doi', 'pmc', 'mesh_ids', 'pubtype_ids')
+
+    def __init__(self, pmid, title, abstract, authors, affiliations, journal, year, doi, pmc,
+                 mesh_ids, pubtype_ids):
+        self.pmid = pmid
+        self.title = title
+        self._abstract = zlib.compress(abstract.encode('utf-8'), STORE_SETTINGS["compress_level"])
+        self.authors = tuple(authors)
+        self.affiliations = tuple(sys.intern(a) for a in affiliations)
+        self.journal = sys.intern(journal)
+        self.year = sys.intern(year)
+        self.doi = doi
+        self.pmc = pmc
+        self.mesh_ids = array('I', mesh_ids)
+        self.pubtype_ids = array('I', pubtype_ids)
+
+    @property
+    def abstract(self):
+        return zlib.decompress(self._abstract).decode('utf-8')
+
+    @property
+    def mesh_terms(self):
+        return [MESH_NAMES.get(i, f"D{i:06d}") for i in self.mesh_ids]
+
+    @property
+    def publication_types(self):
+        return [PUBTYPE_NAMES.get(i, f"D{i:06d}") for i in self.pubtype_ids]
+
+    def nbytes(self):
+        """대략적인 저장 크기 (문자열/배열 본문 기준)"""
+        return (len(self.title) + len(self._abstract) + sum(len(a) for a in self.authors)
+                + self.mesh_ids.itemsize * (len(self.mesh_ids) + len(self.pubtype_ids)))
+
+    def to_row(self):
+        """공유 저장소 행 (필드 JSON 문자열, zlib 압축 초록 바이트) - 형식은 ROW_VERSION"""
+        fields = {
+            'title': self.title,
+            'authors': self.authors,
+            'affiliations': self.affiliations,
+            'journal': self.journal,
+            'year': self.year,
+            'doi': self.doi,
+            'pmc': self.pmc,
+            'mesh_ids': self.mesh_ids.tolist(),
+            'pubtype_ids': self.pubtype_ids.tolist()
+        }
+        return json.dumps(fields, ensure_ascii=False), self._abstract
+
+    @classmethod
+    def from_row(cls, pmid, fields, abstract):
+        """to_row로 저장한 행에서 복원 (초록은 압축된 채로 보관)"""
+        data = json.loads(fields)
+        article = cls(pmid, data['title'], '', data['authors'], data['affiliations'], data['journal'],
+                      data['year'], data['doi'], data['pmc'], data['mesh_ids'], data['pubtype_ids'])
+        article._abstract = bytes(abstract)
+        return article
+
+    def to_record(self):
+        """화면/DataFrame용 레코드 dict (전체 필드, 잘림 없음)"""
+        return {
+            'PMID': self.pmid,
+            'Title': self.title or f"제목 없음 (PMID: {self.pmid})",
+            'Abstract': self.abstract or '초록 없음',
+            'Authors': ', '.join(self.authors) if self.authors else '저자 없음',
+            'Journal': self.journal or '저널 없음',
+            'Year': self.year or '년도 없음',
+            'DOI': self.doi,
+            'PMCID': self.pmc,
+            'MeSH': '; '.join(self.mesh_terms),
+            'Publication_Types': '; '.join(self.publication_types),
+            'URL': f"https://pubmed.ncbi.nlm.nih.gov/{self.pmid}/",
+            'Select': '',
+            'Reason': ''
+        }
+
+def parse_compact_articles(root):
+    """efetch XML에서 CompactArticle 목록 추출"""
+    articles = []
+    for article in root.findall('.//PubmedArticle'):
+        citation = article.find('MedlineCitation')
+        if citation is None:
+            continue
+        pmid = citation.findtext('PMID', default='')
+
+        # 초록 (구조화 초록은 'LABEL: 내용' 형식)
+        abstract_parts = []
+        for part in citation.findall('.//Abstract/AbstractText'):
+            text = _text(part)
+            if text:
+                label = part.get('Label', '')
+                abstract_parts.append(f"{label}: {text}" if label else text)
+
+        # 저자 전체 + 소속
+        authors = []
+        affiliations = []
+        for author in citation.findall('.//AuthorList/Author'):
+            lastname = author.findtext('LastName', '')
+            if lastname:
+                authors.append(f"{lastname} {author.findtext('ForeName', '')}".strip())
+            elif author.findtext('CollectiveName'):
+                authors.append(author.findtext('CollectiveName'))
+            for affiliation in author.findall('AffiliationInfo/Affiliation'):
+                if affiliation.text:
+                    affiliations.append(affiliation.text.strip())
+
+        journal = citation.findtext('.//Journal/Title', default='') or citation.findtext('.//MedlineTA', default='')
+        year = (citation.findtext('.//PubDate/Year', default='')
+                or citation.findtext('.//PubDate/MedlineDate', default='')[:4]
+                or citation.findtext('.//DateCompleted/Year', default=''))
+
+        # 논문 자체 ID (참고문헌 목록의 ArticleId는 제외)
+        ids = {e.get('IdType'): (e.text or '').strip()
+               for e in article.findall('PubmedData/ArticleIdList/ArticleId')}
+
+        mesh_ids = []
+        for descriptor in citation.findall('MeshHeadingList/MeshHeading/DescriptorName'):
+            term_id = _ui_to_id(descriptor.get('UI', ''), MESH_NAMES, _text(descriptor))
+            if term_id is not None:
+                mesh_ids.append(term_id)
+        pubtype_ids = []
+        for pubtype in citation.findall('.//PublicationTypeList/PublicationType'):
+            term_id = _ui_to_id(pubtype.get('UI', ''), PUBTYPE_NAMES, _text(pubtype))
+            if term_id is not None:
+                pubtype_ids.append(term_id)
+
+        articles.append(CompactArticle(
+            pmid=pmid,
+            title=_text(citation.find('.//ArticleTitle')),
+            abstract=' '.join(abstract_parts),
+            authors=authors,
+            affiliations=list(dict.fromkeys(affiliations)),
+            journal=journal,
+            year=year,
+            doi=ids.get('doi', ''),
+            pmc=ids.get('pmc', ''),
+            mesh_ids=mesh_ids,
+            pubtype_ids=pubtype_ids
+        ))
+    return articles
+
+def _terms_of(articles):
+    """논문들의 MeSH/출판 유형 (종류, ID, 이름) 목록 - 공유 저장소용"""
+    terms = set()
+    for article in articles:
+        terms.update(('mesh', i, MESH_NAMES[i]) for i in article.mesh_ids if i in MESH_NAMES)
+        terms.update(('pubtype', i, PUBTYPE_NAMES[i]) for i in article.pubtype_ids if i in PUBTYPE_NAMES)
+    return sorted(terms)
+
+class ArticleStore:
+    """PMID별 CompactArticle 저장소 (프로세스 전체 공유, 최대 개수 초과 시 가장 오래 안 쓴 것부터 제거)
+
+    검색이 달라도 이미 받은 PMID는 다시 efetch하지 않습니다. 공유 상태 저장소
+    (SHARED_STATE=1)가 켜져 있으면 디스크에도 기록해 다른 프로세스/재시작 후에도
+    재사용합니다.
+    """
+
+    def __init__(self, max_articles):
+        self.max_articles = max_articles
+        self._lock = threading.Lock()
+        self._articles = OrderedDict()
+
+    def put_many(self, articles, persist=True):
+        if persist and articles and state_store.enabled():
+            state_store.save_articles([(a.pmid, *a.to_row()) for a in articles], _terms_of(articles), ROW_VERSION)
+        with self._lock:
+            for article in articles:
+                self._articles[article.pmid] = article
+                self._articles.move_to_end(article.pmid)
+            while len(self._articles) > self.max_articles:
+                self._articles.popitem(last=False)
+                incr("article_store_evictions_total")
+
+    def get(self, pmid):
+        with self._lock:
+            article = self._articles.get(pmid)
+            if article is not None:
+                self._articles.move_to_end(pmid)
+            return article
+
+    def _load_shared(self, pmids):
+        """메모리에 없는 PMID를 공유 저장소에서 불러옴"""
+        if not state_store.enabled():
+            return
+        with self._lock:
+            absent = [p for p in pmids if p not in self._articles]
+        loaded = state_store.load_articles(absent, ROW_VERSION)
+        if not loaded:
+            return
+        articles = [CompactArticle.from_row(pmid, fields, abstract) for pmid, (fields, abstract) in loaded.items()]
+        # 다른 프로세스가 등록한 용어 이름도 가져옴
+        for kind, names in (('mesh', MESH_NAMES), ('pubtype', PUBTYPE_NAMES)):
+            ids = {i for a in articles for i in (a.mesh_ids if kind == 'mesh' else a.pubtype_ids)}
+            if not ids <= names.keys():
+                with _vocab_lock:
+                    for term_id, name in state_store.load_terms(kind).items():
+                        names.setdefault(term_id, sys.intern(name))
+        self.put_many(articles, persist=False)
+
+    def get_many(self, pmids):
+        """저장된 논문만 입력 순서대로 반환 (읽은 논문은 최근 사용으로 표시)"""
+        self._load_shared(pmids)
+        with self._lock:
+            found = [self._articles[p] for p in pmids if p in self._articles]
+            for article in found:
+                self._articles.move_to_end(article.pmid)
+            return found
+
+    def missing(self, pmids):
+        self._load_shared(pmids)
+        with self._lock:
+            return [p for p in pmids if p not in self._articles]
+
+    def records(self, pmids):
+        return [article.to_record() for article in self.get_many(pmids)]
+
+    def clear(self):
+        with self._lock:
+            self._articles.clear()
+
+    def __len__(self):
+        return len(self._articles)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(article.nbytes() for article in self._articles.values())
+
+# 프로세스 전체에서 공유하는 논문 저장소
+article_store = ArticleStore(STORE_SETTINGS["max_articles"])
@@ -0,0 +1,376 @@
+"""NCBI E-utilities / Gemini 트래픽 기록·재생 (실제 작업량 오프라인 벤치마크용)
+
+기록: 실제 서비스 앞에 기록용 프록시를 띄우고 앱(또는 worker.py)의 엔드포인트를
+프록시로 돌리면 모든 요청/응답(XML 본문, Gemini 프롬프트와 출력, 응답 시간)이
+gzip JSON Lines 아카이브에 저장됩니다. API 키/이메일은 저장하지 않습니다.
+
+    python replay.py record rnd4.jsonl.gz
+    EUTILS_BASE_URL=http://127.0.0.1:8811/entrez/eutils \\
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8812 streamlit run main.py
+
+재생: 아카이브의 응답을 기록된 응답 시간(또는 --speed배 빠르게)으로 돌려주는
+서버를 띄웁니다. efetch(db=pubmed)는 논문 단위로 다시 조립하므로 묶음 크기가
+바뀌어도 재생됩니다. 벤치마크는 benchmark.py --replay rnd4.jsonl.gz를 사용합니다.
+
+    python replay.py serve rnd4.jsonl.gz --speed 10
+    python replay.py info rnd4.jsonl.gz
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+
+from config import REPLAY_SETTINGS
+
+ARCHIVE_VERSION = 1
+
+# 아카이브/매칭 키에서 제외하는 파라미터 (자격 증명 등)
+_SECRET_PARAMS = {'api_key', 'email', 'key', 'tool'}
+# 프록시가 전달하지 않는 헤더
+_HOP_HEADERS = {'host', 'content-length', 'connection', 'accept-encoding', 'keep-alive', 'transfer-encoding'}
+# 응답에서 보관하는 헤더
+_KEPT_HEADERS = ('Retry-After',)
+
+def describe_request(service, path, query, body, content_type):
+    """요청 → 보관용 요청 dict (자격 증명 제외)
+
+    E-utilities는 정렬된 파라미터 목록, Gemini는 프롬프트 텍스트/캐시 이름/
+    생성 설정을 보관합니다. GET과 POST(form)는 같은 요청으로 취급합니다.
+    """
+    if service == 'gemini':
+        payload = json.loads(body or b'{}')
+        prompt = ''.join(part.get('text', '') for content in payload.get('contents', [])
+                         for part in content.get('parts', []))
+        return {'path': path, 'prompt': prompt, 'cachedContent': payload.get('cachedContent', ''),
+                'generationConfig': payload.get('generationConfig', {})}
+
+    params = parse_qs(query)
+    if body and 'x-www-form-urlencoded' in content_type:
+        for name, values in parse_qs(body.decode('utf-8')).items():
+            params.setdefault(name, []).extend(values)
+    return {'path': path,
+            'params': sorted([name, value] for name, values in params.items()
+                             if name not in _SECRET_PARAMS for value in values)}
+
+def request_key(service, request):
+    """재생 시 응답을 찾는 키 - Gemini는 생성 설정을 빼고 경로/프롬프트/캐시 이름만 사용"""
+    if service == 'gemini':
+        parts = [service, request['path'], request['prompt'], request['cachedContent']]
+    else:
+        parts = [service, request['path'], request['params']]
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def save_archive(path, entries, meta=None):
+    """기록 목록을 gzip JSON Lines로 저장 (첫 줄은 헤더)"""
+    header = {'version': ARCHIVE_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'entries': len(entries), **(meta or {})}
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=REPLAY_SETTINGS["compress_level"]) as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+def load_archive(path):
+    """(헤더, 기록 목록)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"지원하지 않는 아카이브 버전입니다: {header.get('version')}")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET', b'')
+
+    def do_POST(self):
+        self._handle('POST', self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def _send(self, status, body, content_type, headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # 클라이언트가 요청을 취소함
+        with self.server.lock:
+            self.server.stats["bytes_sent"] += len(data)
+
+    def _count(self, path):
+        endpoint = path.rsplit('/', 1)[-1].rsplit(':', 1)[-1]
+        with self.server.lock:
+            self.server.stats[f"requests:{endpoint}"] += 1
+            self.server.stats["requests"] += 1
+
+class _RecordingHandler(_Handler):
+    """실제 서비스로 요청을 전달하고 요청/응답을 기록"""
+
+    def _handle(self, method, body):
+        server = self.server
+        self._count(urlparse(self.path).path)
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in _HOP_HEADERS}
+        start = time.perf_counter()
+        try:
+            r = server.client.request(method, server.upstream + self.path, content=body or None, headers=headers)
+        except httpx.HTTPError as e:
+            self._send(502, f"upstream error: {e}", "text/plain")
+            return
+        elapsed = time.perf_counter() - start
+
+        url = urlparse(self.path)
+        server.recorder.add(server.service, method,
+                            describe_request(server.service, url.path, url.query, body,
+                                             self.headers.get('Content-Type', '')),
+                            r, start, elapsed)
+        kept = {name: r.headers[name] for name in _KEPT_HEADERS if name in r.headers}
+        self._send(r.status_code, r.content, r.headers.get('Content-Type', 'application/octet-stream'), kept)
+
+class Recorder:
+    """여러 기록용 프록시가 공유하는 기록 목록"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.started = time.perf_counter()
+
+    def add(self, service, method, request, response, start, elapsed):
+        entry = {
+            'service': service,
+            'method': method,
+            'request': request,
+            'status': response.status_code,
+            'content_type': response.headers.get('Content-Type', ''),
+            'headers': {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers},
+            'body': response.content.decode('utf-8', errors='replace'),
+            't': round(start - self.started, 4),
+            'elapsed': round(elapsed, 4)
+        }
+        with self.lock:
+            self.entries.append(entry)
+
+    def save(self, path):
+        with self.lock:
+            entries = sorted(self.entries, key=lambda e: e['t'])
+        save_archive(path, entries)
+        return len(entries)
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class):
+        super().__init__(address, handler_class)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_recording_proxy(service, recorder, upstream, port=0, host="127.0.0.1"):
+    """실제 서비스(upstream) 앞의 기록용 프록시를 백그라운드 스레드로 시작"""
+    server = _Server((host, port), _RecordingHandler)
+    server.service = service
+    server.recorder = recorder
+    server.upstream = upstream.rstrip('/')
+    server.client = httpx.Client(timeout=REPLAY_SETTINGS["upstream_timeout_s"])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _split_pubmed_articles(body):
+    """efetch XML → {PMID: PubmedArticle XML 문자열}"""
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        return {}
+    articles = {}
+    for article in root.iter('PubmedArticle'):
+        pmid = article.findtext('MedlineCitation/PMID')
+        if pmid:
+            articles[pmid] = ET.tostring(article, encoding='unicode')
+    return articles
+
+class _ReplayHandler(_Handler):
+    """기록된 응답을 기록된 응답 시간(/speed)만큼 기다렸다가 반환"""
+
+    def _handle(self, method, body):
+        server = self.server
+        url = urlparse(self.path)
+        self._count(url.path)
+        request = describe_request(server.service, url.path, url.query, body, self.headers.get('Content-Type', ''))
+        entry = server.next_entry(request_key(server.service, request))
+        if entry is None and server.service == 'eutils' and url.path.endswith('efetch.fcgi'):
+            entry = server.assemble_efetch(request)
+        if entry is None:
+            with server.lock:
+                server.stats["unmatched"] += 1
+            self._send(404, "no recorded response", "text/plain")
+            return
+
+        if server.speed > 0:
+            time.sleep(entry['elapsed'] / server.speed)
+        self._send(entry['status'], entry['body'], entry['content_type'] or 'text/plain', entry['headers'])
+
+class ReplayServer(_Server):
+    """한 서비스(eutils/gemini)의 기록을 재생하는 서버
+
+    같은 요청이 여러 번 기록되었으면 기록 순서대로 돌려주고, 다 쓰면 마지막
+    응답을 반복합니다.
+    """
+
+    def __init__(self, address, service, entries, speed):
+        super().__init__(address, _ReplayHandler)
+        self.service = service
+        self.speed = speed
+        self.responses = defaultdict(list)
+        self._positions = Counter()
+        self.articles = {}
+        self.article_elapsed = []
+        for entry in entries:
+            if entry['service'] != service:
+                continue
+            self.responses[request_key(service, entry['request'])].append(entry)
+            params = dict(entry['request'].get('params', []))
+            if (entry['request']['path'].endswith('efetch.fcgi') and params.get('db', 'pubmed') == 'pubmed'
+                    and entry['status'] == 200):
+                found = _split_pubmed_articles(entry['body'])
+                self.articles.update(found)
+                if found:
+                    self.article_elapsed.append(entry['elapsed'] / len(found))
+
+    def next_entry(self, key):
+        with self.lock:
+            entries = self.responses.get(key)
+            if not entries:
+                return None
+            position = self._positions[key]
+            self._positions[key] += 1
+        return entries[min(position, len(entries) - 1)]
+
+    def assemble_efetch(self, request):
+        """기록된 efetch 응답들의 논문을 모아 요청한 PMID 묶음 응답 생성 (묶음 크기가 달라도 재생)"""
+        params = request['params']
+        if dict(params).get('db', 'pubmed') != 'pubmed':
+            return None
+        ids = [i for name, value in params if name == 'id' for i in value.split(',') if i]
+        found = [self.articles[pmid] for pmid in ids if pmid in self.articles]
+        if not found:
+            return None
+        with self.lock:
+            self.stats["assembled"] += 1
+            self.stats["assembled_missing"] += len(ids) - len(found)
+        per_article = sum(self.article_elapsed) / len(self.article_elapsed) if self.article_elapsed else 0.0
+        body = '<?xml version="1.0" ?>\n<PubmedArticleSet>' + ''.join(found) + '</PubmedArticleSet>'
+        return {'status': 200, 'body': body, 'content_type': 'text/xml; charset=UTF-8', 'headers': {},
+                'elapsed': per_article * len(found)}
+
+def start_replay_servers(archive_path, speed=None, host="127.0.0.1", eutils_port=0, gemini_port=0):
+    """아카이브를 재생하는 E-utilities / Gemini 서버 (백그라운드 스레드) - (eutils, gemini, 헤더)"""
+    header, entries = load_archive(archive_path)
+    speed = REPLAY_SETTINGS["default_speed"] if speed is None else speed
+    servers = []
+    for service, port in (('eutils', eutils_port), ('gemini', gemini_port)):
+        server = ReplayServer((host, port), service, entries, speed)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers[0], servers[1], header
+
+def recorded_workload(entries):
+    """아카이브에서 벤치마크로 다시 실행할 작업량 추출
+
+    searches: 첫 페이지 esearch의 (검색어, retmax) 목록 (기록 순서, 중복 제거)
+    prompts: 컨텍스트 캐시를 쓰지 않은 generateContent의 (모델, 프롬프트, 응답 형식) 목록
+    """
+    searches = []
+    prompts = []
+    for entry in entries:
+        request = entry['request']
+        path = request['path']
+        if entry['service'] == 'eutils' and path.endswith('esearch.fcgi'):
+            params = dict(request['params'])
+            if int(params.get('retstart', 0)) == 0 and int(params.get('retmax', 20)) > 0:
+                search = (params.get('term', ''), int(params.get('retmax', 20)))
+                if search not in searches:
+                    searches.append(search)
+        elif entry['service'] == 'gemini' and path.endswith(':generateContent') and not request['cachedContent']:
+            model = path.rsplit('/', 1)[-1].split(':')[0]
+            prompts.append((model, request['prompt'], request['generationConfig'].get('responseMimeType', '')))
+    return {'searches': searches, 'prompts': prompts}
+
+def summarize(entries):
+    """엔드포인트별 요청 수, 응답 크기, 기록된 응답 시간 합계"""
+    summary = defaultdict(lambda: {'requests': 0, 'bytes': 0, 'elapsed_s': 0.0, 'errors': 0})
+    for entry in entries:
+        endpoint = entry['request']['path'].rsplit('/', 1)[-1]
+        row = summary[f"{entry['service']}:{endpoint}"]
+        row['requests'] += 1
+        row['bytes'] += len(entry['body'].encode('utf-8'))
+        row['elapsed_s'] = round(row['elapsed_s'] + entry['elapsed'], 3)
+        row['errors'] += entry['status'] >= 400
+    return dict(summary)
+
+def main():
+    parser = argparse.ArgumentParser(description="NCBI E-utilities / Gemini 트래픽 기록·재생")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="실제 서비스 앞에 기록용 프록시 실행 (Ctrl+C로 저장)")
+    record.add_argument("archive")
+    record.add_argument("--eutils-port", type=int, default=8811)
+    record.add_argument("--gemini-port", type=int, default=8812)
+    record.add_argument("--eutils-upstream", default=REPLAY_SETTINGS["eutils_upstream"])
+    record.add_argument("--gemini-upstream", default=REPLAY_SETTINGS["gemini_upstream"])
+    serve = commands.add_parser("serve", help="아카이브 재생 서버 실행")
+    serve.add_argument("archive")
+    serve.add_argument("--eutils-port", type=int, default=8801)
+    serve.add_argument("--gemini-port", type=int, default=8802)
+    serve.add_argument("--speed", type=float, default=REPLAY_SETTINGS["default_speed"],
+                       help="재생 속도 배율 (1=기록 속도, 0=지연 없음)")
+    info = commands.add_parser("info", help="아카이브 요약")
+    info.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        header, entries = load_archive(args.archive)
+        workload = recorded_workload(entries)
+        print(json.dumps({'header': header, 'endpoints': summarize(entries),
+                          'searches': len(workload['searches']), 'prompts': len(workload['prompts'])},
+                         ensure_ascii=False, indent=2))
+        return
+
+    if args.command == "record":
+        recorder = Recorder()
+        servers = [start_recording_proxy('eutils', recorder, args.eutils_upstream, args.eutils_port),
+                   start_recording_proxy('gemini', recorder, args.gemini_upstream, args.gemini_port)]
+    else:
+        eutils, gemini, header = start_replay_servers(args.archive, args.speed,
+                                                      eutils_port=args.eutils_port, gemini_port=args.gemini_port)
+        servers = [eutils, gemini]
+        print(f"기록 {header['entries']}개 ({header['created']}) - 속도 x{args.speed}")
+    print(f"EUTILS_BASE_URL={servers[0].base_url}/entrez/eutils")
+    print(f"GEMINI_API_ENDPOINT={servers[1].base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+        if args.command == "record":
+            print(f"💾 {recorder.save(args.archive)}개 기록 저장: {args.archive}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import streamlit as st
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from config import GEMINI_SETTINGS, API_ENDPOINTS
+
+@st.cache_resource
+def get_gemini_client(api_key):
+    """API 키별로 공유하는 Gemini 생성 서비스 클라이언트
+
+    genai.configure는 프로세스 전역 설정이라 여러 키를 쓰면 마지막에 설정한 키로
+    호출되므로, 키마다 별도 클라이언트를 만들어 모델에 직접 연결합니다.
+    """
+    options = {'api_key': api_key}
+    transport = {}
+    if API_ENDPOINTS["gemini_endpoint"]:
+        # 로컬 대체 서버 등 사용자 지정 엔드포인트는 REST 전송만 지원
+        options['api_endpoint'] = API_ENDPOINTS["gemini_endpoint"]
+        transport['transport'] = 'rest'
+    return glm.GenerativeServiceClient(client_options=options, **transport)
+
+@st.cache_resource
+def get_gemini_model(api_key, model_name=GEMINI_SETTINGS["model_name"]):
+    """API 키/모델명별로 공유하는 Gemini 모델 (해당 키의 클라이언트에 고정)"""
+    model = genai.GenerativeModel(model_name)
+    model._client = get_gemini_client(api_key)
+    return model
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from config import STORE_SETTINGS
+from records import article_store
+
+# 세션마다 달라지는 결과 컬럼 (공유 기본 테이블에는 두지 않음)
+OVERLAY_COLUMNS = ['Select', 'Reason']
+
+def build_base_table(records):
+    """pubmed_details 레코드로 세션 간 공유할 기본 테이블 생성
+
+    세션별 컬럼(Select/Reason)은 빼고, 반복이 많은 저널명은 category로 저장합니다.
+    초록은 앞부분(STORE_SETTINGS["table_abstract_chars"])만 두고, 전체 초록은 필요할 때
+    full_abstracts로 논문 저장소에서 압축을 풀어 씁니다.
+    이 테이블은 여러 세션이 같은 객체를 참조하므로 직접 수정하면 안 됩니다.
+    """
+    base = pd.DataFrame(records)
+    base = base.drop(columns=[c for c in OVERLAY_COLUMNS if c in base.columns])
+    if 'Journal' in base.columns:
+        base['Journal'] = base['Journal'].astype('category')
+    if 'Abstract' in base.columns:
+        base['Abstract'] = base['Abstract'].str.slice(0, STORE_SETTINGS["table_abstract_chars"])
+    return base
+
+def full_abstracts(df):
+    """df 행 순서의 전체 초록 Series - 논문 저장소에서 압축을 풀고, 저장소에 없는 논문은 표의 값 사용
+
+    풀어낸 초록은 반환값에만 있고 기본 테이블에는 남지 않습니다.
+    """
+    pmids = df['PMID'].astype(str).tolist()
+    articles = {article.pmid: article for article in article_store.get_many(pmids)}
+    return pd.Series([articles[pmid].abstract or '초록 없음' if pmid in articles else abstract
+                      for pmid, abstract in zip(pmids, df['Abstract'])], index=df.index, dtype=object)
+
+def with_full_abstracts(df):
+    """초록을 전체 초록으로 바꾼 DataFrame (분석/내보내기용, 다른 컬럼은 복사하지 않음)"""
+    if 'Abstract' not in df.columns or df.empty:
+        return df
+    return with_overlay(df, Abstract=full_abstracts(df))
+
+def with_overlay(base, **columns):
+    """기본 테이블을 복사하지 않고 세션별 컬럼만 얹은 DataFrame 반환
+
+    얕은 복사라 기존 컬럼 데이터(초록 등)는 기본 테이블과 공유되고,
+    전달한 컬럼(값 목록 또는 스칼라)만 새로 할당됩니다.
+    """
+    view = base.copy(deep=False)
+    for name, values in columns.items():
+        view[name] = values
+    return view
+
+def session_table(base):
+    """검색 직후 세션에 저장할 테이블 - 빈 Select/Reason 컬럼 추가"""
+    return with_overlay(base, **{name: '' for name in OVERLAY_COLUMNS})
+
+def screening_columns(include, confidence, matched, rationale, index=None):
+    """구조화 스크리닝 결과 → with_overlay에 넘길 컬럼 dict
+
+    Include는 True/False/<NA>(Gemini 오류로 판정 못 함)이고, 호환용 Select/Reason도 채웁니다.
+    """
+    include = pd.Series(include, index=index, dtype='boolean')
+    rationale = pd.Series(rationale, index=index, dtype=str)
+    return {
+        'Include': include,
+        'Confidence': pd.Series(confidence, index=index, dtype='float32'),
+        'Matched_PICO': pd.Series(matched, index=index, dtype=str),
+        'Rationale': rationale,
+        'Select': np.where(include.fillna(False), 'Y', ''),
+        'Reason': rationale
+    }
+
+def carry_overlay(source, current):
+    """current(source의 일부 행)의 세션별 컬럼(Select/Reason, 스크리닝 결과 등)을 PMID 기준으로 source에 반영
+
+    current에 없는 행은 source의 기존 값을 유지하고, 새 컬럼은 빈 값(NaN)으로 둡니다.
+    """
+    columns = [c for c in current.columns if c in OVERLAY_COLUMNS or c not in source.columns]
+    if not columns or current.empty:
+        return source
+    latest = current.drop_duplicates('PMID', keep='last').set_index('PMID')
+    shown = source['PMID'].isin(latest.index)
+    updates = {}
+    for name in columns:
+        values = source['PMID'].map(latest[name])
+        updates[name] = values.where(shown, source[name]) if name in source.columns else values
+    return with_overlay(source, **updates)
+
+def mark_skipped(df, reasons):
+    """분석하지 않은 행의 Select를 비우고 Reason(구조화 스크리닝 결과가 있으면 Rationale도)에 사유 기록
+
+    reasons는 {PMID: 사유}이며, 해당하는 행이 없으면 df를 그대로 반환합니다.
+    """
+    skipped = df['PMID'].map(reasons)
+    hit = skipped.notna()
+    if not hit.any():
+        return df
+    updates = {'Select': df['Select'].where(~hit, ''), 'Reason': df['Reason'].where(~hit, skipped)}
+    if 'Rationale' in df.columns:
+        updates['Rationale'] = df['Rationale'].where(~hit, skipped)
+    return with_overlay(df, **updates)
+
+def select_rows(df, query='', query_column='Title', sort_by=None, ascending=True):
+    """필터/정렬 결과의 행 위치 배열 (데이터는 복사하지 않음)"""
+    positions = np.arange(len(df))
+    if query and query_column in df.columns:
+        mask = df[query_column].astype(str).str.contains(query, case=False, regex=False).to_numpy()
+        positions = positions[mask]
+    if sort_by and sort_by in df.columns and len(positions):
+        keys = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+def page_rows(df, positions, page, page_size, columns):
+    """현재 페이지의 행/컬럼만 잘라낸 DataFrame"""
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]][columns]
@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import STORE_SETTINGS
+from metrics import span, incr
+
+# PubMed 필드 태그 → FTS5 컬럼
+FIELD_COLUMNS = {
+    'ti': '{title}',
+    'title': '{title}',
+    'tiab': '{title abstract}',
+    'title/abstract': '{title abstract}',
+    'ab': '{abstract}',
+    'abstract': '{abstract}',
+    'au': '{authors}',
+    'author': '{authors}',
+    'ta': '{journal}',
+    'journal': '{journal}',
+    'all fields': '',
+    'all': ''
+}
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"\[]+))(\[[^\]]*\])?')
+
+_lock = threading.Lock()
+_conn = None
+
+# 논문은 PMID(정수)를 rowid로 쓰는 일반 테이블에 두고, FTS5는 그 위의 외부 콘텐츠 색인으로
+# 트리거가 동기화합니다. 갱신/삭제가 rowid로 바로 찾아가므로 색인 크기와 무관하게 빠릅니다.
+_SCHEMA = """
+-- 이전 형식(pmid UNINDEXED 컬럼의 FTS5 테이블) 색인은 버리고 새로 채움
+DROP TABLE IF EXISTS articles;
+CREATE TABLE IF NOT EXISTS docs (
+    pmid INTEGER PRIMARY KEY,
+    title TEXT, abstract TEXT, journal TEXT, authors TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_indexed_at ON docs (indexed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    title, abstract, journal, authors,
+    content = 'docs', content_rowid = 'pmid',
+    tokenize = 'porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts (rowid, title, abstract, journal, authors)
+    VALUES (new.pmid, new.title, new.abstract, new.journal, new.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, title, abstract, journal, authors)
+    VALUES ('delete', old.pmid, old.title, old.abstract, old.journal, old.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, title, abstract, journal, authors)
+    VALUES ('delete', old.pmid, old.title, old.abstract, old.journal, old.authors);
+    INSERT INTO docs_fts (rowid, title, abstract, journal, authors)
+    VALUES (new.pmid, new.title, new.abstract, new.journal, new.authors);
+END;
+"""
+
+def _connect():
+    """프로세스 전체에서 공유하는 색인 DB 연결 (최초 호출 시 생성)"""
+    global _conn
+    if _conn is None:
+        path = STORE_SETTINGS["index_path"]
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+def index_articles(records):
+    """논문 레코드(pubmed_details 결과)를 색인에 추가/갱신
+
+    색인이 STORE_SETTINGS["index_max_articles"]를 넘으면 가장 오래전에 색인한 논문부터 지웁니다.
+    """
+    if not records:
+        return
+    now = time.time()
+    rows = [(int(r['PMID']), r.get('Title', ''), r.get('Abstract', ''), r.get('Journal', ''), r.get('Authors', ''), now)
+            for r in records if str(r.get('PMID', '')).isdigit()]
+    with _lock, span("index.write"):
+        conn = _connect()
+        with conn:
+            conn.executemany("INSERT INTO docs (pmid, title, abstract, journal, authors, indexed_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (pmid) DO UPDATE SET title = excluded.title, "
+                             "abstract = excluded.abstract, journal = excluded.journal, authors = excluded.authors, "
+                             "indexed_at = excluded.indexed_at", rows)
+            excess = conn.execute("SELECT count(*) FROM docs").fetchone()[0] - STORE_SETTINGS["index_max_articles"]
+            if excess > 0:
+                conn.execute("DELETE FROM docs WHERE pmid IN (SELECT pmid FROM docs ORDER BY indexed_at LIMIT ?)",
+                             (excess,))
+                incr("index_articles_evicted_total", excess)
+    incr("index_articles_written_total", len(rows))
+
+def indexed_count():
+    """색인된 논문 수"""
+    with _lock:
+        return _connect().execute("SELECT count(*) FROM docs").fetchone()[0]
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+def to_fts_query(query):
+    """build_query 형식의 PubMed 쿼리를 FTS5 MATCH 구문으로 변환
+
+    괄호, AND/OR/NOT, "구문", 접두 와일드카드(valv*), 필드 태그([ti], [tiab],
+    [au], [ta])를 지원합니다. [Filter], [pdat], [MeSH Terms] 같이 로컬 색인에
+    없는 필드는 ValueError를 발생시킵니다.
+    """
+    query = query.strip()
+    if query.count('"') % 2:
+        raise ValueError("따옴표 짝이 맞지 않습니다")
+
+    parts = []
+    depth = 0
+    pos = 0
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"해석할 수 없는 쿼리 위치: {query[pos:pos + 20]}")
+        pos = match.end()
+        open_paren, close_paren, phrase, word, tag = match.groups()
+
+        if open_paren:
+            depth += 1
+            parts.append('(')
+            continue
+        if close_paren:
+            depth -= 1
+            if depth < 0:
+                raise ValueError("닫는 괄호가 여는 괄호보다 많습니다")
+            parts.append(')')
+            continue
+        if word in ('AND', 'OR', 'NOT') and not tag:
+            parts.append(word)
+            continue
+
+        # 검색어/구문 → FTS5 구문
+        if phrase is not None:
+            term = _quote(phrase)
+        elif word.endswith('*'):
+            term = _quote(word.rstrip('*')) + ' *'
+        else:
+            term = _quote(word)
+
+        if tag:
+            field = tag[1:-1].strip().lower()
+            if field not in FIELD_COLUMNS:
+                raise ValueError(f"로컬 색인에서 지원하지 않는 필드입니다: {tag}")
+            column = FIELD_COLUMNS[field]
+            if column:
+                term = f"{column} : {term}"
+        parts.append(term)
+
+    if depth != 0:
+        raise ValueError("괄호 짝이 맞지 않습니다")
+
+    return ' '.join(parts).replace('( ', '(').replace(' )', ')')
+
+def search_local(query, pmids=None, limit=None):
+    """로컬 색인 검색 - BM25 순으로 정렬된 PMID 목록 반환 (pmids로 대상 제한 가능)"""
+    fts_query = to_fts_query(query)
+    sql = "SELECT rowid FROM docs_fts WHERE docs_fts MATCH ?"
+    params = [fts_query]
+    if pmids is not None:
+        sql += " AND rowid IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps([int(p) for p in pmids if str(p).isdigit()]))
+    sql += " ORDER BY bm25(docs_fts)"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+
+    with _lock, span("index.search"):
+        try:
+            rows = _connect().execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"로컬 검색 구문 오류: {e}") from e
+    incr("index_searches_total")
+    return [str(pmid) for (pmid,) in rows]
@@ -0,0 +1,65 @@
+import threading
+from metrics import incr
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.aborted = False  # leader가 예외가 아닌 중단(BaseException)으로 끝남
+
+class SingleFlight:
+    """같은 키의 동시 호출을 하나로 합치는 실행기
+
+    먼저 들어온 호출(leader)만 실제로 실행하고, 실행 중에 들어온 같은 키의
+    호출(follower)은 그 결과(또는 예외)를 그대로 공유받습니다. leader가 결과 없이
+    중단되면(Streamlit 재실행/중지 등 BaseException) follower가 다시 실행합니다.
+    실행이 끝나면 키가 해제되므로 결과 캐시는 별도 계층이 담당합니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """fn()을 키별로 한 번만 실행 - (결과, 공유 여부) 반환"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+
+            incr("singleflight_shared_total", flight=self.name)
+            call.done.wait()
+            if call.aborted:
+                incr("singleflight_aborted_total", flight=self.name)
+                continue  # 공유할 결과가 없음 - 새 leader로 다시 시도
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        incr("singleflight_executed_total", flight=self.name)
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.aborted = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+# 프로세스 전체에서 공유하는 PubMed 검색 실행기 (query.compile_query의 정규 검색식 + 날짜 범위 키 기준)
+pubmed_search_flight = SingleFlight("pubmed_search")
@@ -0,0 +1,300 @@
+"""여러 프로세스가 공유하는 SQLite 상태 저장소
+
+Streamlit 서버 여러 개와 worker.py 프로세스가 같은 파일(STATE_SETTINGS["path"])을
+열어 논문 레코드, 검색 결과, 작업 대기열과 결과를 공유합니다. WAL 모드라 읽기는
+쓰기와 동시에 진행되고, 재시작해도 내용이 남습니다.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import STATE_SETTINGS
+from metrics import span, incr
+
+# 작업 상태
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_lock = threading.Lock()
+_conn = None
+
+# articles/results는 pickle로 저장하던 이전 형식 - 다른 프로세스가 쓴 pickle은 읽지 않음
+_SCHEMA = """
+DROP TABLE IF EXISTS articles;
+DROP TABLE IF EXISTS results;
+CREATE TABLE IF NOT EXISTS article_rows (
+    pmid TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fields TEXT NOT NULL,
+    abstract BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    pmids TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    team TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    progress TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS surveillance_seen (
+    team TEXT NOT NULL,
+    pmid TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (team, pmid)
+);
+CREATE TABLE IF NOT EXISTS surveillance_searches (
+    team TEXT NOT NULL,
+    name TEXT NOT NULL,
+    query TEXT NOT NULL,
+    pmids TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (team, name)
+);
+CREATE TABLE IF NOT EXISTS surveillance_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    report TEXT NOT NULL
+);
+"""
+
+def enabled():
+    """공유 상태 저장소 사용 여부 (SHARED_STATE=1)"""
+    return STATE_SETTINGS["enabled"]
+
+def _connect():
+    """프로세스 전체에서 공유하는 저장소 연결 (최초 호출 시 생성)"""
+    global _conn
+    if _conn is None:
+        path = STATE_SETTINGS["path"]
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # isolation_level=None: 트랜잭션은 _transaction()에서 직접 시작
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                               timeout=STATE_SETTINGS["busy_timeout_ms"] / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+@contextmanager
+def _transaction(immediate=False):
+    """쓰기 트랜잭션 - immediate=True면 시작 시점에 쓰기 잠금 획득 (작업 가져오기 경쟁 방지)"""
+    with _lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+def _read(sql, params=()):
+    with _lock:
+        return _connect().execute(sql, params).fetchall()
+
+# ---- 논문 레코드 / 용어 ----
+
+def save_articles(rows, terms, version):
+    """논문 레코드 저장 - rows는 [(PMID, 필드 JSON, 압축 초록)], terms는 [(종류, ID, 이름)], version은 행 형식 버전"""
+    if not rows:
+        return
+    now = time.time()
+    with span("state.save_articles"), _transaction() as conn:
+        conn.executemany("INSERT OR REPLACE INTO article_rows (pmid, version, fields, abstract, updated_at) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         [(pmid, version, fields, abstract, now) for pmid, fields, abstract in rows])
+        conn.executemany("INSERT OR IGNORE INTO terms (kind, id, name) VALUES (?, ?, ?)", terms)
+    incr("state_articles_written_total", len(rows))
+
+def load_articles(pmids, version):
+    """저장된 논문 레코드 {PMID: (필드 JSON, 압축 초록)} - 형식 버전이 다른 행은 없는 것으로 취급"""
+    if not pmids:
+        return {}
+    with span("state.load_articles"):
+        rows = _read("SELECT pmid, fields, abstract FROM article_rows "
+                     "WHERE pmid IN (SELECT value FROM json_each(?)) AND version = ?",
+                     (json.dumps(list(pmids)), version))
+    incr("state_articles_read_total", len(rows))
+    return {pmid: (fields, abstract) for pmid, fields, abstract in rows}
+
+def load_terms(kind):
+    """용어 어휘 {ID: 이름}"""
+    return dict(_read("SELECT id, name FROM terms WHERE kind = ?", (kind,)))
+
+# ---- 검색 결과 ----
+
+def save_search(key, pmids, ttl):
+    with _transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO searches (key, pmids, expires_at) VALUES (?, ?, ?)",
+                     (key, json.dumps(pmids), time.time() + ttl))
+
+def load_search(key):
+    """만료되지 않은 검색 결과 PMID 목록 (없으면 None)"""
+    rows = _read("SELECT pmids FROM searches WHERE key = ? AND expires_at > ?", (key, time.time()))
+    return json.loads(rows[0][0]) if rows else None
+
+# ---- 작업 대기열 ----
+
+def enqueue_job(kind, params, team=''):
+    """작업 등록 - 작업 ID 반환"""
+    with _transaction() as conn:
+        cursor = conn.execute("INSERT INTO jobs (kind, team, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                              (kind, team, json.dumps(params, ensure_ascii=False), QUEUED, time.time()))
+    incr("state_jobs_enqueued_total", kind=kind)
+    return cursor.lastrowid
+
+def worker_id():
+    """작업자 식별자 (호스트명:PID)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_job(worker, kinds=None):
+    """가장 오래된 대기 작업 하나를 가져와 실행 중으로 표시 - 작업 dict (없으면 None)
+
+    heartbeat가 job_lease_s보다 오래 끊긴 실행 중 작업(죽은 워커)도 다시 가져갑니다.
+    이미 max_job_attempts번 시도한 작업은 워커를 계속 죽이는 작업으로 보고 실패 처리합니다.
+    """
+    now = time.time()
+    stale = now - STATE_SETTINGS["job_lease_s"]
+    max_attempts = STATE_SETTINGS["max_job_attempts"]
+    sql = ("SELECT id FROM jobs WHERE (status = ? OR (status = ? AND heartbeat_at < ? AND attempts < ?))")
+    params = [QUEUED, RUNNING, stale, max_attempts]
+    if kinds:
+        sql += " AND kind IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(list(kinds)))
+    sql += " ORDER BY id LIMIT 1"
+
+    with _transaction(immediate=True) as conn:
+        abandoned = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+            "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+            (FAILED, now, f"워커가 {max_attempts}번 응답 없이 중단되어 실패 처리했습니다",
+             RUNNING, stale, max_attempts)).rowcount
+        row = conn.execute(sql, params).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, "
+                         "heartbeat_at = ?, error = '' WHERE id = ?", (RUNNING, worker, now, now, row[0]))
+    if abandoned:
+        incr("state_jobs_finished_total", abandoned, status=FAILED)
+    if row is None:
+        return None
+    incr("state_jobs_claimed_total")
+    return get_job(row[0])
+
+# heartbeat/complete_job/fail_job은 작업을 아직 그 워커가 갖고 있을 때만 반영합니다.
+# lease가 끊겨 다른 워커가 다시 가져간 작업을 늦게 끝난 이전 워커가 덮어쓰지 않도록.
+_OWNED = "WHERE id = ? AND status = ? AND worker = ?"
+
+def heartbeat(job_id, worker, progress=''):
+    """실행 중 작업의 생존 신호와 진행 상황 기록 - 작업을 잃었으면 False"""
+    with _transaction() as conn:
+        return conn.execute(f"UPDATE jobs SET heartbeat_at = ?, progress = ? {_OWNED}",
+                            (time.time(), progress, job_id, RUNNING, worker)).rowcount > 0
+
+def complete_job(job_id, worker, result):
+    """작업 완료 - 결과(JSON으로 저장 가능한 dict) 저장, 작업을 잃었으면 저장하지 않고 False"""
+    with _transaction() as conn:
+        owned = conn.execute(f"UPDATE jobs SET status = ?, finished_at = ?, progress = '' {_OWNED}",
+                             (DONE, time.time(), job_id, RUNNING, worker)).rowcount > 0
+        if owned:
+            conn.execute("INSERT OR REPLACE INTO job_results (job_id, data) VALUES (?, ?)",
+                         (job_id, json.dumps(result, ensure_ascii=False)))
+    incr("state_jobs_finished_total", status=DONE if owned else "lost")
+    return owned
+
+def fail_job(job_id, worker, error):
+    """작업 실패 기록 - 작업을 잃었으면 False"""
+    with _transaction() as conn:
+        owned = conn.execute(f"UPDATE jobs SET status = ?, finished_at = ?, error = ? {_OWNED}",
+                             (FAILED, time.time(), str(error)[:2000], job_id, RUNNING, worker)).rowcount > 0
+    incr("state_jobs_finished_total", status=FAILED if owned else "lost")
+    return owned
+
+def _job_dict(row):
+    keys = ('id', 'kind', 'team', 'params', 'status', 'worker', 'attempts', 'error', 'progress',
+            'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    job = dict(zip(keys, row))
+    job['params'] = json.loads(job['params'])
+    return job
+
+def get_job(job_id):
+    rows = _read("SELECT id, kind, team, params, status, worker, attempts, error, progress, created_at, "
+                 "started_at, heartbeat_at, finished_at FROM jobs WHERE id = ?", (job_id,))
+    return _job_dict(rows[0]) if rows else None
+
+def list_jobs(team=None, limit=50):
+    """최근 작업 목록 (team을 주면 해당 팀만)"""
+    sql = ("SELECT id, kind, team, params, status, worker, attempts, error, progress, created_at, "
+           "started_at, heartbeat_at, finished_at FROM jobs")
+    params = []
+    if team is not None:
+        sql += " WHERE team = ?"
+        params.append(team)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    return [_job_dict(row) for row in _read(sql, params)]
+
+def load_result(job_id):
+    rows = _read("SELECT data FROM job_results WHERE job_id = ?", (job_id,))
+    return json.loads(rows[0][0]) if rows else None
+
+# ---- 정기 문헌 모니터링 (surveillance.py) ----
+
+def seen_pmids(team):
+    """팀이 이미 확인한 PMID 집합"""
+    return {pmid for (pmid,) in _read("SELECT pmid FROM surveillance_seen WHERE team = ?", (team,))}
+
+def mark_seen(team, pmids):
+    now = time.time()
+    with _transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO surveillance_seen (team, pmid, first_seen) VALUES (?, ?, ?)",
+                         [(team, pmid, now) for pmid in pmids])
+
+def last_search(team, name):
+    """저장된 검색의 지난 실행 - {'query', 'pmids'(지금까지 나온 PMID), 'updated_at'} (처음이면 None)"""
+    rows = _read("SELECT query, pmids, updated_at FROM surveillance_searches WHERE team = ? AND name = ?",
+                 (team, name))
+    if not rows:
+        return None
+    query, pmids, updated_at = rows[0]
+    return {'query': query, 'pmids': json.loads(pmids), 'updated_at': updated_at}
+
+def save_search_pmids(team, name, query, pmids):
+    with _transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO surveillance_searches (team, name, query, pmids, updated_at) "
+                     "VALUES (?, ?, ?, ?, ?)", (team, name, query, json.dumps(pmids), time.time()))
+
+def save_surveillance_run(started_at, finished_at, report):
+    """모니터링 실행 보고서 저장 - 실행 ID 반환"""
+    with _transaction() as conn:
+        cursor = conn.execute("INSERT INTO surveillance_runs (started_at, finished_at, report) VALUES (?, ?, ?)",
+                              (started_at, finished_at, json.dumps(report, ensure_ascii=False)))
+    return cursor.lastrowid
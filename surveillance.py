@@ -0,0 +1,347 @@
+"""팀별 정기 문헌 모니터링 (화면 없이 실행)
+
+SURVEILLANCE_SETTINGS의 cron 일정에 따라 각 팀의 저장된 검색(TEAM_CONFIGS의
+PICO)을 실행하고, 지난 실행 이후 새로 나온 논문만 구조화 스크리닝한 뒤 팀별
+변경 보고서(엑셀)를 만듭니다.
+
+- 모든 팀이 하나의 NCBI 클라이언트(같은 속도 조절기)와 논문 저장소를 공유하므로
+  여러 팀 검색에 나온 논문은 한 번만 efetch합니다.
+- esearch/efetch/스크리닝 요청은 팀별로 번갈아(round-robin) 배치해 한 팀의 큰
+  검색이 다른 팀을 밀어내지 않습니다.
+- 전체 작업이 budget_window_s 동안의 NCBI 요청 예산 안에 들어가도록 수집량을
+  제한하고, 넘친 논문은 확인하지 않은 것으로 남겨 다음 실행에서 처리합니다.
+- 지난 실행이 있으면 그날 이후 PubMed에 입력된 논문(edat)만 검색하므로 검색당
+  최대 수(max_results_per_search)에 걸리지 않고, 걸리면 보고서에 표시합니다.
+- 확인한 PMID와 검색별 미확인 PMID/마지막 실행 시각은 state_store(SQLite)에 저장됩니다.
+
+    python surveillance.py --once
+    python surveillance.py --teams RND4        # 일정에 따라 반복 실행
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# 확인 기록/논문 캐시를 워커·화면과 공유 (config 로드 전에 설정)
+os.environ.setdefault("SHARED_STATE", "1")
+
+from config import TEAM_CONFIGS, SURVEILLANCE_SETTINGS, SEARCH_SETTINGS, RATE_LIMITS
+from metrics import span, incr
+from query import compile_query
+from records import article_store
+import state_store
+
+_SKIP = object()
+
+# ---- cron 일정 ----
+
+def _cron_field(spec, low, high):
+    values = set()
+    for part in spec.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"cron 범위 오류: {spec}")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expr):
+    """'분 시 일 월 요일' 형식 (*, 목록, 범위, /간격 지원, 요일 0=일요일) → 필드별 허용 값 집합"""
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"cron 형식은 '분 시 일 월 요일'입니다: {expr}")
+    minute, hour, day, month, weekday = fields
+    weekdays = {d % 7 for d in _cron_field(weekday, 0, 7)}
+    return (_cron_field(minute, 0, 59), _cron_field(hour, 0, 23), _cron_field(day, 1, 31),
+            _cron_field(month, 1, 12), weekdays)
+
+def next_run(expr, after):
+    """after 이후 처음으로 일정에 맞는 시각 (분 단위, 일과 요일은 모두 만족해야 함)"""
+    minutes, hours, days, months, weekdays = parse_cron(expr)
+    t = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+    limit = t + datetime.timedelta(days=366)
+    while t < limit:
+        if t.month not in months or t.day not in days or (t.weekday() + 1) % 7 not in weekdays:
+            t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+        elif t.hour not in hours:
+            t = t.replace(minute=0) + datetime.timedelta(hours=1)
+        elif t.minute not in minutes:
+            t += datetime.timedelta(minutes=1)
+        else:
+            return t
+    raise ValueError(f"1년 안에 실행 시각이 없는 일정입니다: {expr}")
+
+# ---- 실행 ----
+
+def interleave(lists):
+    """여러 목록을 번갈아 하나로 (a1, b1, a2, b2, ...) - 긴 목록이 뒤로 밀림"""
+    return [item for group in itertools.zip_longest(*lists, fillvalue=_SKIP)
+            for item in group if item is not _SKIP]
+
+def saved_searches(team):
+    """팀의 저장된 검색 [(이름, PICO 구성요소 dict, 필터 목록)] - 검색식 오류는 ValueError"""
+    config = TEAM_CONFIGS[team]
+    searches = SURVEILLANCE_SETTINGS["searches"].get(team) or [{"name": "P+I", "components": ["P", "I"]}]
+    result = []
+    for search in searches:
+        components = {name: config.get(name, '') for name in search["components"]}
+        filters = list(search.get("filters", ()))
+        try:
+            compile_query(components, filters)
+        except ValueError as e:
+            raise ValueError(f"{team} / {search['name']}: {e}") from None
+        result.append((search["name"], components, filters))
+    return result
+
+def entry_since(previous, query, today):
+    """검색할 PubMed 입력일(edat) 시작일 - 같은 검색식의 지난 실행일 (없으면 lookback_days, 0이면 None=전체)
+
+    지난 실행일 당일도 다시 포함해 그날 늦게 입력된 논문을 놓치지 않습니다 (중복은 확인 기록으로 제외).
+    """
+    if previous and previous['query'] == query:
+        return datetime.date.fromtimestamp(previous['updated_at'])
+    days = SURVEILLANCE_SETTINGS["lookback_days"]
+    return today - datetime.timedelta(days=days) if days else None
+
+def compile_search(components, filters, since, today):
+    """저장된 검색의 이번 실행 검색식 (since가 있으면 입력일 범위 필터 추가)"""
+    if since:
+        filters = [*filters, f"{since:%Y/%m/%d}:{today:%Y/%m/%d}[edat]"]
+    return compile_query(components, filters)
+
+def request_budget(api_key):
+    """budget_window_s 동안 모니터링이 쓸 수 있는 NCBI 요청 수"""
+    limits = RATE_LIMITS["ncbi_with_key" if api_key else "ncbi"]
+    return int(limits["max_rate"] * SURVEILLANCE_SETTINGS["budget_window_s"] * SURVEILLANCE_SETTINGS["budget_utilization"])
+
+async def _collect(searches, email, api_key, new_pmids_for):
+    """검색 전체 실행 후 새 논문 efetch (하나의 클라이언트 공유, 예산 안에서)
+
+    (검색 결과, 검색별 전체 결과 수, 예산 보고)를 반환합니다.
+    """
+    from pubmed_async import AsyncPubMedClient
+
+    page_size = SEARCH_SETTINGS["search_page_size"]
+    max_results = SURVEILLANCE_SETTINGS["max_results_per_search"]
+    metas = [{} for _ in searches]
+    async with AsyncPubMedClient(email, api_key) as client:
+        with span("surveillance.esearch"):
+            results = await asyncio.gather(*(client.search(compiled.text, max_results, meta=meta)
+                                             for (_, _, compiled), meta in zip(searches, metas)),
+                                           return_exceptions=True)
+        keys = [(team, name) for team, name, _ in searches]
+        search_results = dict(zip(keys, results))
+        counts = {key: meta.get('count', 0) for key, meta in zip(keys, metas)}
+
+        budget = request_budget(api_key)
+        used = sum(max(1, math.ceil(len(r) / page_size)) for r in results if not isinstance(r, BaseException))
+        missing = article_store.missing(new_pmids_for(search_results))
+        capacity = max(0, budget - used) * SEARCH_SETTINGS["chunk_size"]
+        to_fetch = missing[:capacity]
+        errors = []
+        if to_fetch:
+            with span("surveillance.efetch"):
+                article_store.put_many(await client.fetch(to_fetch, errors))
+        used += math.ceil(len(to_fetch) / SEARCH_SETTINGS["chunk_size"])
+    return search_results, counts, {'requests_budget': budget, 'requests_used': used, 'fetched': len(to_fetch),
+                            'fetch_deferred': len(missing) - len(to_fetch), 'fetch_errors': [str(e) for e in errors]}
+
+def _screen(items, product_names, pico_texts, gemini_keys):
+    """(팀, 논문) 목록을 번갈아 스크리닝 - {(팀, PMID): (include, confidence, matched, rationale)}"""
+    from analysis import screen_record
+    from resources import get_gemini_model
+
+    def screen(item):
+        team, article = item
+        key = gemini_keys[team]
+        return (team, article.pmid), screen_record(get_gemini_model(key), key, article.title, article.abstract,
+                                                   product_names[team], pico_texts[team], "surveillance_screening")
+
+    with span("surveillance.screening"), ThreadPoolExecutor(SURVEILLANCE_SETTINGS["screen_workers"]) as pool:
+        return dict(pool.map(screen, items))
+
+def _write_team_report(path, team, summary, new_rows):
+    """팀별 변경 보고서 엑셀 (요약 / 신규 논문)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(list(summary.items()), columns=['항목', '값']).to_excel(writer, sheet_name='요약', index=False)
+        pd.DataFrame(new_rows, columns=['PMID', 'Title', 'Journal', 'Year', 'Search', 'Include', 'Confidence',
+                                        'Matched_PICO', 'Rationale', 'URL']).to_excel(
+            writer, sheet_name='신규 논문', index=False)
+
+def run_surveillance(teams=None, now=None):
+    """모든(또는 지정한) 팀의 저장된 검색을 한 번 실행 - 실행 보고서 dict 반환"""
+    settings = SURVEILLANCE_SETTINGS
+    teams = teams or settings["teams"]
+    now = now or datetime.datetime.now()
+    started = time.time()
+    today = now.date()
+    seen = {team: state_store.seen_pmids(team) for team in teams}
+    baseline = {team: settings["baseline_first_run"] and not seen[team] for team in teams}
+
+    # 검색별 이번 입력일 범위와 지난 실행에서 넘어온 미확인 PMID (예산 초과/스크리닝 오류)
+    per_team = []
+    history = {}  # (팀, 검색 이름) → (기본 검색식, 입력일 시작일, 넘어온 PMID)
+    for team in teams:
+        items = []
+        for name, components, filters in saved_searches(team):
+            query = compile_query(components, filters).text
+            previous = state_store.last_search(team, name)
+            since = entry_since(previous, query, today)
+            carried = previous['pmids'] if previous and previous['query'] == query else []
+            history[(team, name)] = (query, since, [p for p in carried if p not in seen[team]])
+            items.append((team, name, compile_search(components, filters, since, today)))
+        per_team.append(items)
+    searches = interleave(per_team)  # 팀별 검색을 번갈아 배치
+
+    found_by = {team: {} for team in teams}  # 팀별 {PMID: [검색 이름]} (넘어온 PMID, 검색 결과 순서)
+    new = {}
+
+    def new_pmids_for(search_results):
+        for team, name, _ in searches:
+            result = search_results[(team, name)]
+            found = history[(team, name)][2] + ([] if isinstance(result, BaseException) else result)
+            for pmid in dict.fromkeys(found):
+                found_by[team].setdefault(pmid, []).append(name)
+        for team in teams:
+            new[team] = [] if baseline[team] else [p for p in found_by[team] if p not in seen[team]]
+        # 여러 팀에 나온 논문은 한 번만, 팀별로 번갈아 수집
+        return list(dict.fromkeys(interleave([new[team] for team in teams])))
+
+    ncbi = TEAM_CONFIGS[settings["ncbi_team"]]
+    with span("surveillance.total"):
+        search_results, counts, budget = asyncio.run(_collect(searches, ncbi["email"], ncbi.get("api_key") or None,
+                                                              new_pmids_for))
+
+        # 스크리닝 대상: 수집된 새 논문, Gemini 키와 제품명이 있는 팀만
+        gemini_keys = {team: TEAM_CONFIGS[team].get("gemini_api_key") or settings["gemini_api_key"] for team in teams}
+        product_names = {team: TEAM_CONFIGS[team].get("product", '') for team in teams}
+        pico_texts = {team: '\n'.join(f"{k}: {TEAM_CONFIGS[team].get(k, '')}" for k in 'PICO'
+                                      if TEAM_CONFIGS[team].get(k)) for team in teams}
+        articles = {team: article_store.get_many(new[team]) for team in teams}
+        screenable = [[(team, a) for a in articles[team]] if gemini_keys[team] and product_names[team] else []
+                      for team in teams]
+        queue = interleave(screenable)
+        screen_limit = settings["max_screening_per_run"]
+        screened = _screen(queue[:screen_limit], product_names, pico_texts, gemini_keys) if queue else {}
+        screen_deferred = {(team, a.pmid) for team, a in queue[screen_limit:]}
+
+    report_dir = os.path.join(settings["report_dir"], now.strftime('%Y%m%d_%H%M'))
+    team_reports = {}
+    for team in teams:
+        team_searches = [(name, search_results[(t, name)]) for t, name, _ in searches if t == team]
+        failed = [f"{name}: {result}" for name, result in team_searches if isinstance(result, BaseException)]
+        results = [(name, result) for name, result in team_searches if not isinstance(result, BaseException)]
+        truncated = [f"{name}: {counts[(team, name)]}개 중 {len(result)}개" for name, result in results
+                     if counts[(team, name)] > len(result)]
+        windows = [f"{name}: {history[(team, name)][1]:%Y/%m/%d}~" if history[(team, name)][1] else f"{name}: 전체"
+                   for name, _ in team_searches]
+
+        new_rows = []
+        checked = []
+        screen_failed = 0
+        for article in articles[team]:
+            if (team, article.pmid) in screen_deferred:
+                continue  # 다음 실행에서 스크리닝
+            include, confidence, matched, rationale = screened.get((team, article.pmid), ('', '', '', ''))
+            if include is None:
+                screen_failed += 1  # Gemini 오류 - 확인하지 않은 것으로 남겨 다음 실행에서 다시 스크리닝
+                continue
+            record = article.to_record()
+            new_rows.append([article.pmid, record['Title'], record['Journal'], record['Year'],
+                             ', '.join(found_by[team][article.pmid]), include, confidence, matched, rationale,
+                             record['URL']])
+            checked.append(article.pmid)
+        deferred = len(new[team]) - len(checked) - screen_failed
+        marked = list(found_by[team]) if baseline[team] else checked
+        state_store.mark_seen(team, marked)
+
+        # 검색별 마지막 실행 시각(다음 입력일 범위 시작)과 아직 확인하지 않은 PMID 저장 - 실패한 검색은 그대로
+        now_seen = seen[team] | set(marked)
+        for name, result in results:
+            query, _, carried = history[(team, name)]
+            pending = [p for p in dict.fromkeys(carried + result) if p not in now_seen]
+            state_store.save_search_pmids(team, name, query, pending)
+
+        summary = {
+            '팀': TEAM_CONFIGS[team]["name"],
+            '실행 시각': now.strftime('%Y-%m-%d %H:%M'),
+            '검색 (입력일 범위)': ', '.join(windows),
+            '검색 결과 (중복 제외)': len({pmid for _, result in results for pmid in result}),
+            '지난 실행에서 넘어온 논문': len({p for name, _ in team_searches for p in history[(team, name)][2]}),
+            '기준선 기록 (첫 실행)': len(found_by[team]) if baseline[team] else 0,
+            '신규 논문': len(new_rows),
+            '스크리닝': sum((team, pmid) in screened for pmid in checked),
+            '포함 판정': sum(row[5] is True for row in new_rows),
+            '잘린 검색 (max_results_per_search 초과)': '; '.join(truncated),
+            '다음 실행으로 미룸 (예산 초과)': deferred,
+            '스크리닝 오류 (다음 실행에서 재시도)': screen_failed,
+            '검색 오류': '; '.join(failed)
+        }
+        path = os.path.join(report_dir, f"{team}.xlsx")
+        _write_team_report(path, team, summary, new_rows)
+        incr("surveillance_new_articles_total", len(new_rows), team=team)
+        team_reports[team] = {**summary, 'report': path}
+
+    report = {'started': datetime.datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+              'elapsed_s': round(time.time() - started, 1), 'budget': budget, 'teams': team_reports}
+    report['run_id'] = state_store.save_surveillance_run(started, time.time(), report)
+    with open(os.path.join(report_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+def print_report(report):
+    budget = report['budget']
+    print(f"🗓️ 실행 #{report['run_id']} - {report['elapsed_s']}초, NCBI 요청 {budget['requests_used']}/"
+          f"{budget['requests_budget']} (미룸 {budget['fetch_deferred']}개)", flush=True)
+    for team, summary in report['teams'].items():
+        print(f"  {team}: 결과 {summary['검색 결과 (중복 제외)']}개, 신규 {summary['신규 논문']}개 "
+              f"(포함 {summary['포함 판정']}개), "
+              f"미룸 {summary['다음 실행으로 미룸 (예산 초과)']}개, "
+              f"스크리닝 오류 {summary['스크리닝 오류 (다음 실행에서 재시도)']}개 → {summary['report']}", flush=True)
+        if summary['잘린 검색 (max_results_per_search 초과)']:
+            print(f"  ⚠️ {team} 잘린 검색: {summary['잘린 검색 (max_results_per_search 초과)']}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="팀별 정기 문헌 모니터링")
+    parser.add_argument("--once", action="store_true", help="일정과 관계없이 지금 한 번 실행")
+    parser.add_argument("--teams", nargs="*", choices=sorted(TEAM_CONFIGS), help="실행할 팀 (기본: 설정의 전체 팀)")
+    parser.add_argument("--schedule", default=SURVEILLANCE_SETTINGS["schedule"], help="cron 일정 (분 시 일 월 요일)")
+    args = parser.parse_args()
+
+    if args.once:
+        print_report(run_surveillance(args.teams))
+        return 0
+
+    parse_cron(args.schedule)  # 일정 형식 먼저 확인
+    try:
+        while True:
+            scheduled = next_run(args.schedule, datetime.datetime.now())
+            print(f"⏰ 다음 실행: {scheduled:%Y-%m-%d %H:%M}", flush=True)
+            time.sleep(max(0.0, (scheduled - datetime.datetime.now()).total_seconds()))
+            try:
+                print_report(run_surveillance(args.teams, scheduled))
+            except Exception as e:
+                print(f"❌ 모니터링 실행 실패: {e}", flush=True)
+    except KeyboardInterrupt:
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,6 @@
 import streamlit as st
+from config import VIEWER_SETTINGS
+from result_table import select_rows, page_rows, full_abstracts
 
 def render_header():
     """상단 헤더 렌더링"""
@@ -79,3 +81,52 @@ def render_search_options():
                                type="password")
     
     return email, api_key
+
+def render_result_table(df, key, columns=None):
+    """서버 측 페이지 처리 결과 표 - 필터/정렬은 서버에서, 현재 페이지만 전송
+
+    초록처럼 긴 컬럼은 표에서 빼고 선택한 논문만 따로 보여줍니다.
+    """
+    hidden = VIEWER_SETTINGS["hidden_columns"]
+    available = [c for c in df.columns if c not in hidden]
+    default = [c for c in (columns or VIEWER_SETTINGS["default_columns"]) if c in available]
+
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    with col1:
+        query = st.text_input("🔎 표 내 검색", key=f"{key}_query", placeholder="포함된 문자열")
+    with col2:
+        query_column = st.selectbox("검색 컬럼", available,
+                                    index=available.index('Title') if 'Title' in available else 0,
+                                    key=f"{key}_query_column")
+    with col3:
+        sort_by = st.selectbox("정렬", ["(기본 순서)"] + available, key=f"{key}_sort")
+    with col4:
+        descending = st.checkbox("내림차순", key=f"{key}_desc")
+    shown_columns = st.multiselect("표시 컬럼", available, default=default, key=f"{key}_columns") or default
+
+    positions = select_rows(df, query, query_column,
+                            None if sort_by == "(기본 순서)" else sort_by, not descending)
+    total = len(positions)
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("페이지 크기", VIEWER_SETTINGS["page_sizes"], key=f"{key}_page_size")
+    pages = max(1, -(-total // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = 1
+    with col2:
+        page = st.number_input(f"페이지 (총 {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    page_df = page_rows(df, positions, page, page_size, shown_columns)
+    start = (page - 1) * page_size
+    st.caption(f"📄 {len(df)}개 중 {total}개 일치 · {start + 1 if total else 0}-{start + len(page_df)} 표시")
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
+    # 초록은 선택한 논문만 불러옴
+    if 'Abstract' in df.columns and len(page_df):
+        rows = positions[start:start + len(page_df)]
+        titles = df['Title'].astype(str).to_numpy()
+        choice = st.selectbox("📖 초록 보기", [None] + rows.tolist(), key=f"{key}_abstract",
+                              format_func=lambda i: "선택 안 함" if i is None else titles[i][:100])
+        if choice is not None:
+            st.info(str(full_abstracts(df.iloc[[choice]]).iat[0]))
@@ -0,0 +1,90 @@
+"""공유 작업 대기열 워커
+
+SHARED_STATE=1로 실행한 Streamlit 서버들이 등록한 작업(검색, 구조화 스크리닝,
+MEDDEV 일괄 분석)을 가져와 실행합니다. 워커는 여러 개를 띄울 수 있고, 죽은
+워커의 작업은 STATE_SETTINGS["job_lease_s"] 후 다른 워커가 다시 가져갑니다
+(max_job_attempts번 시도한 작업은 실패 처리).
+
+    SHARED_STATE=1 STATE_DB_PATH=data/state.sqlite3 python worker.py --kinds search screening
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# 워커는 항상 공유 저장소를 사용 (config 로드 전에 설정)
+os.environ.setdefault("SHARED_STATE", "1")
+
+from config import STATE_SETTINGS
+import state_store
+from jobs import HANDLERS, run_job
+
+def _heartbeat_loop(job_id, worker, status, stop):
+    """작업이 끝날 때까지 주기적으로 생존 신호/진행 상황 기록"""
+    interval = max(1.0, STATE_SETTINGS["job_lease_s"] / 3)
+    while not stop.wait(interval):
+        if not state_store.heartbeat(job_id, worker, status['progress']):
+            print(f"⚠️ 작업 {job_id}의 lease를 잃었습니다 (다른 워커가 가져감)", flush=True)
+            return
+
+def process_job(job, worker):
+    """작업 하나 실행 후 결과/오류 저장"""
+    status = {'progress': ''}
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat_loop, args=(job['id'], worker, status, stop), daemon=True)
+    beat.start()
+
+    def progress(text):
+        status['progress'] = text
+
+    start = time.perf_counter()
+    try:
+        result = run_job(job, progress)
+    except Exception as e:
+        if state_store.fail_job(job['id'], worker, e):
+            print(f"❌ 작업 {job['id']} ({job['kind']}) 실패: {e}", flush=True)
+        else:
+            print(f"⚠️ 작업 {job['id']} ({job['kind']}) 실패했지만 lease를 잃어 기록하지 않습니다: {e}", flush=True)
+        return False
+    finally:
+        stop.set()
+        beat.join()
+    if not state_store.complete_job(job['id'], worker, result):
+        print(f"⚠️ 작업 {job['id']} ({job['kind']}) lease를 잃어 결과를 버립니다", flush=True)
+        return False
+    print(f"✅ 작업 {job['id']} ({job['kind']}) 완료 - {time.perf_counter() - start:.1f}초", flush=True)
+    return True
+
+def run(kinds=None, once=False, poll_interval=None):
+    """대기열을 계속 확인하며 작업 실행 (once=True면 대기 작업이 없을 때 종료)"""
+    poll_interval = poll_interval or STATE_SETTINGS["poll_interval_s"]
+    worker = state_store.worker_id()
+    print(f"🗂️ 워커 {worker} 시작 - 저장소 {STATE_SETTINGS['path']}", flush=True)
+    processed = 0
+    while True:
+        job = state_store.claim_job(worker, kinds)
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        process_job(job, worker)
+        processed += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="공유 작업 대기열 워커")
+    parser.add_argument("--kinds", nargs="*", choices=sorted(HANDLERS), help="처리할 작업 종류 (기본: 전체)")
+    parser.add_argument("--once", action="store_true", help="대기 작업을 모두 처리하면 종료")
+    parser.add_argument("--poll", type=float, default=None, help="대기열 확인 간격 (초)")
+    args = parser.parse_args()
+
+    try:
+        processed = run(args.kinds or None, args.once, args.poll)
+    except KeyboardInterrupt:
+        return 0
+    print(f"처리한 작업 {processed}개", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())